@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: CPU por página de /api/evaluations
+---------------------------------------------
+    cd backend && python bench/serialization.py [--rows 200] [--iterations 300]
+
+Crea una base SQLite temporal con db.synthetic y compara, para la misma
+página, el tiempo de CPU (time.process_time) de consulta + serialización:
+- ruta normal: objetos ORM -> validación del response_model
+  (fastapi.routing.serialize_response) -> JSONResponse
+- ruta rápida: tuplas de columnas -> RowSerializer -> FastJSONResponse
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200, help="filas por página")
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-serialization-")
+    url = f"sqlite:///{tmp}/bench.db"
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("DEBUG", "false")
+
+    from db import synthetic
+
+    synthetic.main(["--database-url", url, "--create-schema", "--sedes", "5", "--children", "500",
+                    "--measurements", str(max(args.rows * 5, 2000)), "--staff", "0"])
+
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from api.evaluations import EvaluationOut, _evaluation_rows
+    from db.models import Evaluation
+
+    engine = create_engine(url, future=True)
+    field = create_response_field(name="Response", type_=List[EvaluationOut])
+
+    def page(db: Session):
+        return db.query(Evaluation).order_by(Evaluation.fecha.desc(), Evaluation.id.desc()).limit(args.rows)
+
+    async def standard(db: Session) -> bytes:
+        content = await serialize_response(field=field, response_content=page(db).all(), is_coroutine=True)
+        return JSONResponse(content).body
+
+    async def fast(db: Session) -> bytes:
+        return _evaluation_rows.response(page(db).with_entities(*_evaluation_rows.columns).all()).body
+
+    async def measure(fn) -> float:
+        with Session(engine) as db:
+            await fn(db)  # calentamiento
+            start = time.process_time()
+            for _ in range(args.iterations):
+                await fn(db)
+                db.expunge_all()
+            return (time.process_time() - start) / args.iterations * 1000
+
+    with Session(engine) as db:
+        same = asyncio.run(standard(db)) == asyncio.run(fast(db))
+    slow_ms = asyncio.run(measure(standard))
+    fast_ms = asyncio.run(measure(fast))
+    print(f"página de {args.rows} filas, {args.iterations} iteraciones (respuestas idénticas: {same})")
+    print(f"  ruta normal : {slow_ms:7.2f} ms CPU/página")
+    print(f"  ruta rápida : {fast_ms:7.2f} ms CPU/página")
+    print(f"  reducción   : {(1 - fast_ms / slow_ms) * 100:5.1f} %")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from core.request_profiler import PROFILE_HEADER, PROFILES, sign_profile_token
+from core.security import require_roles
+from db.pool_metrics import pool_report
+from db.session import replicas
+
+# Endpoints de diagnóstico; todos exigen rol admin
+router = APIRouter(tags=["admin"], dependencies=[Depends(require_roles("admin"))])
+
+@router.get("/metrics/db-pool")
+def db_pool_metrics() -> Dict[str, Any]:
+    """Espera de checkout, tiempo de uso y estado de los pools de este worker."""
+    return {"metrics": pool_report(), "replicas": replicas.status()}
+
+
+@router.get("/profiles")
+def list_profiles() -> List[Dict[str, Any]]:
+    """Perfiles guardados en este worker, del más reciente al más antiguo."""
+    return PROFILES.list()
+
+
+@router.post("/profiles/token")
+def profile_token(ttl_seconds: int = Query(3600, ge=60, le=86400)) -> Dict[str, Any]:
+    """Valor firmado para la cabecera X-Profile: la petición que lo lleve se perfila."""
+    token, expires = sign_profile_token(ttl_seconds)
+    return {"header": PROFILE_HEADER, "token": token, "expires_at": expires}
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, format: str = Query("speedscope", pattern="^(speedscope|flamegraph)$")) -> Dict[str, Any]:
+    """Perfil en JSON de speedscope (por defecto) o árbol de flamegraph."""
+    profile = PROFILES.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado (puede estar en otro worker)")
+    return profile.speedscope() if format == "speedscope" else profile.flamegraph()
+
+
+@router.delete("/profiles", status_code=204)
+def clear_profiles() -> None:
+    PROFILES.clear()
@@ -7,73 +7,50 @@ Registro de usuarios, login con JWT y perfil (/me).
 - Usa modelo SQLAlchemy: db.models.Usuario
 - Usa Pydantic: db.schemas.UsuarioCreate, UsuarioResponse
 - DB session: db.session.get_db
-- JWT: jose (python-jose)
-- Hash: passlib (bcrypt) con normalización a 72 bytes
+- JWT y usuario actual: core.security (snapshot en caché)
+- Hash: core.security (bcrypt en executor acotado, rehash en el login)
 """
 
-from datetime import datetime, timedelta
-import os
-from typing import Optional
+import logging
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from pydantic import BaseModel, EmailStr
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
 
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import BaseModel, EmailStr
+from sqlalchemy.orm import Session, joinedload
+
+from core.executors import get_password_executor
+from core.response_cache import RESPONSES
+from core.security import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    UserSnapshot,
+    build_access_claims,
+    create_access_token,
+    current_user_dep,
+    hash_password as get_password_hash,
+    require_roles,
+    revoke_token,
+    revoke_user_tokens,
+    token_claims_dep,
+    verify_and_update_password,
+)
+from core.refresh_tokens import (
+    issue_refresh_token,
+    revoke_refresh_token,
+    revoke_user_refresh_tokens,
+    rotate_refresh_token,
+)
 from db.session import get_db
 from db.models import Usuario
 from db.schemas import UsuarioCreate, UsuarioResponse
 
-# ------------------------------------------------------------
-# Configuración
-# ------------------------------------------------------------
-# Estos valores vienen del .env; se usan defaults seguros si no están.
-SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
-
-# IMPORTANT: el tokenUrl debe coincidir con el prefijo que pone main.py
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["auth"])  # el prefijo /api/auth lo añade main.py
 
 
-# ------------------------------------------------------------
-# Utilidades de password y JWT
-# ------------------------------------------------------------
-def _bcrypt_normalize(password: str) -> str:
-    """
-    Bcrypt solo usa los primeros 72 bytes.
-    Normalizamos a utf-8, truncamos a 72 bytes y devolvemos str.
-    """
-    if not isinstance(password, str):
-        raise ValueError("La contraseña debe ser texto.")
-    pw_bytes = password.strip().encode("utf-8")
-    if len(pw_bytes) > 72:
-        pw_bytes = pw_bytes[:72]
-    return pw_bytes.decode("utf-8", "ignore")
-
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(_bcrypt_normalize(password))
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(_bcrypt_normalize(plain_password), hashed_password)
-
-
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    to_encode = data.copy()
-    now = datetime.utcnow()
-    expire = now + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"iat": now, "exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-
-
 # ------------------------------------------------------------
 # Esquemas auxiliares para Auth
 # ------------------------------------------------------------
@@ -86,6 +63,16 @@ class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
     expires_in: int  # segundos
+    refresh_token: Optional[str] = None
+    refresh_expires_in: Optional[int] = None  # segundos
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
 
 
 class MeResponse(BaseModel):
@@ -118,6 +105,7 @@ def register(usuario: UsuarioCreate, db: Session = Depends(get_db)):
     )
     db.add(nuevo)
     db.commit()
+    RESPONSES.invalidate("users")
     db.refresh(nuevo)
 
     # Respuesta segura (sin devolver hash)
@@ -130,6 +118,45 @@ def register(usuario: UsuarioCreate, db: Session = Depends(get_db)):
     )
 
 
+# ------------------------------------------------------------
+# Autenticación común a /login y /token
+# ------------------------------------------------------------
+def _authenticate(db: Session, correo: str, contrasena: str) -> Usuario:
+    """
+    Verifica credenciales (401 si no son válidas). Si el hash guardado usa un
+    coste de bcrypt distinto de BCRYPT_ROUNDS se reemplaza por uno nuevo.
+    """
+    user = db.query(Usuario).filter(Usuario.correo == correo).first()
+    if not user:
+        raise HTTPException(status_code=401, detail="Credenciales inválidas")
+    # Cierra la transacción de lectura: la conexión vuelve al pool mientras
+    # corre bcrypt (expire_on_commit=False mantiene `user` cargado)
+    db.commit()
+    valid, new_hash = verify_and_update_password(contrasena, user.contrasena)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Credenciales inválidas")
+    if new_hash:
+        user.contrasena = new_hash
+        db.commit()
+        logger.info("Contraseña rehasheada con el coste actual (usuario %s)", user.id_usuario)
+    return user
+
+
+def _token_response(db: Session, user: Usuario, refresh_token: str, refresh_expira: datetime) -> TokenResponse:
+    access = create_access_token(build_access_claims(db, user))
+    return TokenResponse(
+        access_token=access,
+        expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        refresh_token=refresh_token,
+        refresh_expires_in=int((refresh_expira - datetime.now(timezone.utc)).total_seconds()),
+    )
+
+
+def _login_response(db: Session, user: Usuario) -> TokenResponse:
+    refresh_token, refresh_expira = issue_refresh_token(db, user.id_usuario)
+    return _token_response(db, user, refresh_token, refresh_expira)
+
+
 # ------------------------------------------------------------
 # Login (JSON) - más cómodo para Postman
 # ------------------------------------------------------------
@@ -142,12 +169,8 @@ def login(payload: LoginRequest, db: Session = Depends(get_db)):
       "contrasena": "12345678"
     }
     """
-    user = db.query(Usuario).filter(Usuario.correo == payload.correo).first()
-    if not user or not verify_password(payload.contrasena, user.contrasena):
-        raise HTTPException(status_code=401, detail="Credenciales inválidas")
-
-    token = create_access_token({"sub": user.correo, "uid": user.id_usuario})
-    return TokenResponse(access_token=token, expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    user = _authenticate(db, payload.correo, payload.contrasena)
+    return _login_response(db, user)
 
 
 # ------------------------------------------------------------
@@ -160,43 +183,64 @@ def token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
       username = correo
       password = contrasena
     """
-    user = db.query(Usuario).filter(Usuario.correo == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.contrasena):
-        raise HTTPException(status_code=401, detail="Credenciales inválidas")
-
-    token = create_access_token({"sub": user.correo, "uid": user.id_usuario})
-    return TokenResponse(access_token=token, expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    user = _authenticate(db, form_data.username, form_data.password)
+    return _login_response(db, user)
 
 
 # ------------------------------------------------------------
-# Perfil actual (/me) protegido por Bearer Token
+# Refresh: rota el refresh token y emite un access token nuevo
+# (sin bcrypt; el rol y las sedes se vuelven a leer de la BD)
 # ------------------------------------------------------------
-def _get_current_user(db: Session, token: str) -> Usuario:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="No autenticado o token inválido",
-        headers={"WWW-Authenticate": "Bearer"},
+@router.post("/refresh", response_model=TokenResponse)
+def refresh(payload: RefreshRequest, db: Session = Depends(get_db)):
+    user_id, refresh_token, refresh_expira = rotate_refresh_token(db, payload.refresh_token)
+    user = (
+        db.query(Usuario)
+        .options(joinedload(Usuario.rol))
+        .filter(Usuario.id_usuario == user_id)
+        .first()
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        correo: str = payload.get("sub")  # email del usuario
-        if correo is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    user = db.query(Usuario).filter(Usuario.correo == correo).first()
     if not user:
-        raise credentials_exception
-    return user
+        raise HTTPException(status_code=401, detail="Refresh token inválido o expirado")
+    return _token_response(db, user, refresh_token, refresh_expira)
 
 
+# ------------------------------------------------------------
+# Perfil actual (/me) protegido por Bearer Token
+# ------------------------------------------------------------
 @router.get("/me", response_model=MeResponse)
-def me(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
-    user = _get_current_user(db, token)
+def me(user: UserSnapshot = Depends(current_user_dep)):
     return MeResponse(
         id_usuario=user.id_usuario,
         nombre=user.nombre,
         correo=user.correo,
         telefono=user.telefono,
     )
+
+
+# ------------------------------------------------------------
+# Logout: revoca el token actual y su refresh token (o todos los del usuario)
+# ------------------------------------------------------------
+@router.post("/logout")
+def logout(
+    payload: Optional[LogoutRequest] = None,
+    all_sessions: bool = Query(False, description="Revocar todos los tokens del usuario"),
+    claims: Dict[str, Any] = Depends(token_claims_dep),
+    db: Session = Depends(get_db),
+):
+    if all_sessions and claims.get("uid") is not None:
+        revoke_user_tokens(db, claims["uid"])
+        revoke_user_refresh_tokens(db, claims["uid"])
+    else:
+        revoke_token(db, claims)
+        if payload and payload.refresh_token:
+            revoke_refresh_token(db, payload.refresh_token)
+    return {"ok": True}
+
+
+# ------------------------------------------------------------
+# Métricas del executor de contraseñas (solo admin)
+# ------------------------------------------------------------
+@router.get("/hashing/stats")
+def hashing_stats(_: UserSnapshot = Depends(require_roles("admin"))):
+    return get_password_executor().stats()
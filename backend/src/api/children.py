@@ -1,7 +1,9 @@
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel, Field
 
+from core.etags import conditional
+
 router = APIRouter(tags=["children"])
 
 # ====== Schemas ======
@@ -48,16 +50,18 @@ def ping():
 
 @router.get("/", response_model=List[ChildOut])
 def list_children(
+    request: Request,
     limit: int = Query(50, ge=1, le=500),
     offset: int = Query(0, ge=0),
 ):
     items = list(_DB.items())
     items.sort(key=lambda kv: kv[0])
     slice_ = items[offset : offset + limit]
-    return [
-        ChildOut(id=cid, **data)  # type: ignore[arg-type]
+    # En memoria no hay versión de fila: ETag = hash del cuerpo
+    return conditional(request, lambda: [
+        ChildOut(id=cid, **data).model_dump()  # type: ignore[arg-type]
         for cid, data in slice_
-    ]
+    ])
 
 @router.post("/", response_model=ChildOut, status_code=201)
 def create_child(payload: ChildCreate):
@@ -67,11 +71,11 @@ def create_child(payload: ChildCreate):
     return ChildOut(id=new_id, **data)  # type: ignore[arg-type]
 
 @router.get("/{child_id}", response_model=ChildOut)
-def get_child(child_id: int):
+def get_child(child_id: int, request: Request):
     data = _DB.get(child_id)
     if not data:
         raise HTTPException(status_code=404, detail="Child not found")
-    return ChildOut(id=child_id, **data)  # type: ignore[arg-type]
+    return conditional(request, lambda: ChildOut(id=child_id, **data).model_dump())  # type: ignore[arg-type]
 
 @router.put("/{child_id}", response_model=ChildOut)
 def update_child(child_id: int, payload: ChildUpdate):
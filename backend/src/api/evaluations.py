@@ -8,38 +8,19 @@ from datetime import datetime, date, timezone
 from decimal import Decimal, ROUND_HALF_UP
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from pydantic import BaseModel, Field
-from sqlalchemy import Column, Integer, Date, DateTime, DECIMAL, String, Text, ForeignKey
-from sqlalchemy.orm import Session, relationship
+from sqlalchemy import func
+from sqlalchemy.orm import Session
 
 # Asegúrate de que estos imports apunten a tus archivos reales
-from db.session import get_db
-from db.base import Base
-from db.models import Alerta 
-
-
-# -------------------------------------------------------------------
-# Modelo ORM local (mapea a la tabla 'evaluaciones')
-# -------------------------------------------------------------------
-class Evaluation(Base):
-    __tablename__ = "evaluaciones"
-    __table_args__ = {"extend_existing": True}
-
-    id = Column(Integer, primary_key=True, index=True)
-    # CLAVE CORREGIDA: Apunta a la PK real en la tabla infantes
-    child_id = Column(Integer, ForeignKey("infantes.id_infante"), nullable=False) 
-    
-    # La relación usa la clave foránea correcta para evitar el error 500
-    infante = relationship("Infante", back_populates="evaluaciones", foreign_keys=[child_id]) 
-    
-    fecha = Column(Date, nullable=False)
-    peso_kg = Column(DECIMAL(5, 2), nullable=False)
-    talla_cm = Column(DECIMAL(5, 2), nullable=False)
-    imc = Column(DECIMAL(5, 2), nullable=False)
-    estado_nutricional = Column(String(32), nullable=False)
-    observaciones = Column(Text)
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+from core.config import settings
+from core.etags import conditional, versioned, weak_etag
+from core.fast_json import RowSerializer, fast_json_enabled
+from core.metrics import REGISTRY
+from core.response_cache import RESPONSES, response_cache_enabled
+from db.session import SessionLocal, get_routed_db
+from db.models import Alerta, Evaluation
 
 
 # -------------------------------------------------------------------
@@ -89,6 +70,40 @@ class AlertaOut(BaseModel):
         from_attributes = True
 
 
+# Listados: columnas como tuplas + orjson, sin validar cada fila
+_evaluation_rows = RowSerializer(
+    EvaluationOut,
+    Evaluation.id, Evaluation.child_id, Evaluation.fecha, Evaluation.peso_kg, Evaluation.talla_cm,
+    Evaluation.imc, Evaluation.estado_nutricional, Evaluation.observaciones, Evaluation.created_at,
+)
+_alerta_rows = RowSerializer(
+    AlertaOut,
+    Alerta.id_alerta, Alerta.infante_id, Alerta.seguimiento_id, Alerta.tipo_alerta, Alerta.mensaje,
+    Alerta.estado_alerta, Alerta.fecha_creacion, Alerta.fecha_resuelta,
+)
+
+
+# Versión de una evaluación para su ETag: updated_at (NULL solo en filas
+# escritas fuera del ORM) con created_at de respaldo
+_evaluation_version = func.coalesce(Evaluation.updated_at, Evaluation.created_at)
+
+
+def _page_etag(pairs) -> str:
+    """ETag de una página de evaluaciones a partir de sus (id, versión)."""
+    return weak_etag("evaluations", *(f"{ev_id}:{version}" for ev_id, version in pairs))
+
+
+def _count_pending_alerts() -> int:
+    with SessionLocal() as db:
+        return db.query(func.count(Alerta.id_alerta)).filter(Alerta.estado_alerta == "pendiente").scalar()
+
+
+# En /metrics; el COUNT (índice parcial de pendientes) se repite como mucho cada TTL
+REGISTRY.gauge("alerts_pending", "Alertas nutricionales pendientes de revisar").set_function(
+    _count_pending_alerts, ttl=getattr(settings, "METRICS_DB_GAUGE_TTL_SECONDS", 30)
+)
+
+
 # -------------------------------------------------------------------
 # Lógica de negocio (IMC + estado + alertas) - Funciones auxiliares
 # -------------------------------------------------------------------
@@ -166,7 +181,7 @@ router = APIRouter()
 
 @router.post("/", response_model=EvaluationOut, status_code=status.HTTP_201_CREATED)
 # Asume que un Depends(get_current_active_user) está implícito o en un wrapper
-def create_evaluation(payload: EvaluationCreate, db: Session = Depends(get_db)): 
+def create_evaluation(payload: EvaluationCreate, db: Session = Depends(get_routed_db)): 
     try:
         imc = _calc_imc(payload.peso_kg, payload.talla_cm)
         estado = _clasificar_estado(imc)
@@ -187,6 +202,7 @@ def create_evaluation(payload: EvaluationCreate, db: Session = Depends(get_db)):
             _crear_alerta_si_aplica(db, payload.child_id, estado, imc)
 
         db.commit()
+        RESPONSES.invalidate("evaluations", f"child:{payload.child_id}")
         db.refresh(ev)
         return ev
     except HTTPException:
@@ -198,31 +214,64 @@ def create_evaluation(payload: EvaluationCreate, db: Session = Depends(get_db)):
 
 @router.get("/", response_model=List[EvaluationOut])
 def list_evaluations(
+    request: Request,
     child_id: Optional[int] = Query(None),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_routed_db),
 ):
-    q = db.query(Evaluation)
-    if child_id is not None:
-        q = q.filter(Evaluation.child_id == child_id)
-    q = q.order_by(Evaluation.fecha.desc(), Evaluation.id.desc()).limit(limit).offset(offset)
-    return q.all()
+    def query():
+        q = db.query(Evaluation)
+        if child_id is not None:
+            q = q.filter(Evaluation.child_id == child_id)
+        return q.order_by(Evaluation.fecha.desc(), Evaluation.id.desc()).limit(limit).offset(offset)
+
+    def load():
+        # La versión va como columna extra (serialize la ignora): el ETag sale
+        # de las mismas filas, sin otra consulta
+        rows = query().with_entities(*_evaluation_rows.columns, _evaluation_version).all()
+        return versioned(_evaluation_rows.serialize(rows), _page_etag((row[0], row[-1]) for row in rows))
+
+    def etag():
+        # Solo con If-None-Match. Recorre la misma página pero solo lee
+        # (id, versión): cambia si entra, sale o se edita alguna fila
+        return _page_etag(query().with_entities(Evaluation.id, _evaluation_version).all())
+
+    if response_cache_enabled():
+        return RESPONSES.cached(request, ["evaluations"], load, etag=etag)
+    if fast_json_enabled():
+        return conditional(request, load, etag)
+    return query().all()
 
 
 @router.get("/{evaluation_id}", response_model=EvaluationOut)
-def get_evaluation(evaluation_id: int, db: Session = Depends(get_db)):
-    ev = db.query(Evaluation).filter(Evaluation.id == evaluation_id).first()
-    if not ev:
-        raise HTTPException(status_code=404, detail="Evaluación no encontrada")
-    return ev
+def get_evaluation(evaluation_id: int, request: Request, db: Session = Depends(get_routed_db)):
+    def load():
+        row = (
+            db.query(Evaluation)
+            .filter(Evaluation.id == evaluation_id)
+            .with_entities(*_evaluation_rows.columns, _evaluation_version)
+            .first()
+        )
+        if not row:
+            raise HTTPException(status_code=404, detail="Evaluación no encontrada")
+        return versioned(_evaluation_rows.serialize([row])[0], weak_etag("evaluation", evaluation_id, row[-1]))
+
+    def etag():
+        version = db.query(_evaluation_version).filter(Evaluation.id == evaluation_id).scalar()
+        # Inexistente: sin ETag, load() contesta 404
+        return weak_etag("evaluation", evaluation_id, version) if version is not None else None
+
+    if response_cache_enabled():
+        return RESPONSES.cached(request, [f"evaluation:{evaluation_id}"], load, etag=etag)
+    return conditional(request, load, etag)
 
 
 @router.put("/{evaluation_id}", response_model=EvaluationOut)
 def update_evaluation(
     evaluation_id: int,
     payload: EvaluationUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_routed_db),
 ):
     ev = db.query(Evaluation).filter(Evaluation.id == evaluation_id).first()
     if not ev:
@@ -250,6 +299,7 @@ def update_evaluation(
                 _crear_alerta_si_aplica(db, ev.child_id, estado, imc)
 
         db.commit()
+        RESPONSES.invalidate(f"evaluation:{evaluation_id}", "evaluations", f"child:{ev.child_id}")
         db.refresh(ev)
         return ev
     except HTTPException:
@@ -260,27 +310,45 @@ def update_evaluation(
 
 
 @router.delete("/{evaluation_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_evaluation(evaluation_id: int, db: Session = Depends(get_db)):
+def delete_evaluation(evaluation_id: int, db: Session = Depends(get_routed_db)):
     ev = db.query(Evaluation).filter(Evaluation.id == evaluation_id).first()
     if not ev:
         return
+    child_id = ev.child_id
     db.delete(ev)
     db.commit()
+    RESPONSES.invalidate(f"evaluation:{evaluation_id}", "evaluations", f"child:{child_id}")
     return
 
 
 @router.get("/alerts/{child_id}", response_model=List[AlertaOut])
-def active_alerts(child_id: int, db: Session = Depends(get_db)):
-    q = (
-        db.query(Alerta)
-        .filter(
-            Alerta.infante_id == child_id,
-            Alerta.estado_alerta == "pendiente",
-            Alerta.tipo_alerta.in_(
-                ["imc_bajo", "imc_riesgo", "imc_sobrepeso", "imc_obesidad", "imc_fuera_rango"]
-            ),
+def active_alerts(child_id: int, request: Request, db: Session = Depends(get_routed_db)):
+    def query():
+        return (
+            db.query(Alerta)
+            .filter(
+                Alerta.infante_id == child_id,
+                Alerta.estado_alerta == "pendiente",
+                Alerta.tipo_alerta.in_(
+                    ["imc_bajo", "imc_riesgo", "imc_sobrepeso", "imc_obesidad", "imc_fuera_rango"]
+                ),
+            )
+            .order_by(Alerta.fecha_creacion.desc(), Alerta.id_alerta.desc())
         )
-        .order_by(Alerta.fecha_creacion.desc(), Alerta.id_alerta.desc())
-        .all()
-    )
-    return q
\ No newline at end of file
+
+    # Una alerta pendiente no se modifica (solo se resuelve y sale de la
+    # lista): su versión son los ids
+    def load():
+        rows = query().with_entities(*_alerta_rows.columns).all()
+        return versioned(_alerta_rows.serialize(rows), weak_etag("alerts", child_id, *(row[0] for row in rows)))
+
+    def etag():
+        # Solo con If-None-Match
+        return weak_etag("alerts", child_id, *(row[0] for row in query().with_entities(Alerta.id_alerta).all()))
+
+    # Las alertas cambian al crear, editar o borrar evaluaciones del niño
+    if response_cache_enabled():
+        return RESPONSES.cached(request, [f"child:{child_id}"], load, etag=etag)
+    if fast_json_enabled():
+        return conditional(request, load, etag)
+    return query().all()
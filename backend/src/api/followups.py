@@ -2,6 +2,8 @@ from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, Field
 
+from core.response_cache import RESPONSES
+
 router = APIRouter(tags=["followups"])
 
 # ====== Schemas ======
@@ -79,6 +81,8 @@ def create_followup(payload: FollowupCreate):
     data = _sanitize_f(payload.model_dump())
     new_id = _next_id_f()
     _DB_F[new_id] = data
+    # Un control nuevo cambia la ficha del niño: invalida lo cacheado por niño (alertas)
+    RESPONSES.invalidate(f"child:{data['child_id']}")
     return FollowupOut(id=new_id, **data)  # type: ignore[arg-type]
 
 @router.get("/{followup_id}", response_model=FollowupOut)
@@ -95,13 +99,15 @@ def update_followup(followup_id: int, payload: FollowupUpdate):
     cur = _DB_F[followup_id]
     updates = _sanitize_f(payload.model_dump(exclude_unset=True))
     cur.update({k: v for k, v in updates.items() if v is not None})
+    RESPONSES.invalidate(f"child:{cur['child_id']}")
     return FollowupOut(id=followup_id, **cur)  # type: ignore[arg-type]
 
 @router.delete("/{followup_id}", status_code=204)
 def delete_followup(followup_id: int):
     if followup_id not in _DB_F:
         raise HTTPException(status_code=404, detail="Followup not found")
-    del _DB_F[followup_id]
+    data = _DB_F.pop(followup_id)
+    RESPONSES.invalidate(f"child:{data['child_id']}")
     # 204: sin cuerpo
 
 @router.post("/{followup_id}/symptoms", response_model=SymptomOut, status_code=201)
@@ -1,5 +1,16 @@
-from fastapi import APIRouter, UploadFile, File
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, UploadFile, File
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from core.cache import create_cache
+from core.config import settings
+from core.metrics import REGISTRY
+from core.uploads import EXCEL_MIMES, save_upload
+from services.excel_service import ExcelService
 
 router = APIRouter(tags=["import"])
 
@@ -10,10 +21,77 @@ class ImportStatusResponse(BaseModel):
 class MessageResponse(BaseModel):
     message: str
 
-@router.post("/excel", response_model=MessageResponse)
+class SheetSummary(BaseModel):
+    sheet: str
+    rows: int
+    processed: int
+    errors: int
+
+class ImportReportResponse(BaseModel):
+    import_id: str
+    status: str
+    message: str
+    processed_count: int = 0
+    error_count: int = 0
+    sheets: List[SheetSummary] = []
+    errors: List[Dict[str, Any]] = []
+    errors_truncated: bool = False
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+# ====== Registro de importaciones ======
+# TTL + LRU (core.cache): los informes caducan a los IMPORT_JOB_TTL_SECONDS y,
+# con CACHE_BACKEND=redis, /status y /report los ve cualquier worker
+_JOBS = create_cache(
+    "import-jobs",
+    ttl=getattr(settings, "IMPORT_JOB_TTL_SECONDS", 3600),
+    max_entries=getattr(settings, "IMPORT_JOB_MAX_ENTRIES", 1000),
+)
+MAX_REPORT_ERRORS = getattr(settings, "IMPORT_REPORT_MAX_ERRORS", 200)
+
+jobs_in_progress = REGISTRY.gauge("import_jobs_in_progress", "Importaciones de Excel en curso en este worker")
+
+
+def _now() -> str:
+    # Texto ISO: el mismo valor en memoria y en Redis (JSON)
+    return datetime.now(timezone.utc).isoformat()
+
+@router.post("/excel", response_model=ImportReportResponse)
 async def upload_excel(file: UploadFile = File(...)):
-    _ = await file.read()
-    return MessageResponse(message=f"File {file.filename} processed successfully")
+    stored = await save_upload(file, allowed_types=EXCEL_MIMES)
+    job = {
+        "import_id": uuid.uuid4().hex,
+        "status": "processing",
+        "message": f"Processing {file.filename}",
+        "created_at": _now(),
+    }
+    _JOBS.set(job["import_id"], job)
+
+    # El parseo bloquea esperando al process pool: fuera del event loop.
+    # Los workers leen el archivo desde disco.
+    jobs_in_progress.inc()
+    try:
+        result = await run_in_threadpool(ExcelService.process_children_excel, stored.path)
+    finally:
+        jobs_in_progress.dec()
+        stored.remove()
+
+    job["finished_at"] = _now()
+    if result.get("success"):
+        errors = result["errors"]
+        job.update(
+            status="completed",
+            message=f"File {file.filename} processed successfully",
+            processed_count=result["processed_count"],
+            error_count=result["error_count"],
+            sheets=result["sheets"],
+            errors=errors[:MAX_REPORT_ERRORS],
+            errors_truncated=len(errors) > MAX_REPORT_ERRORS,
+        )
+    else:
+        job.update(status="failed", message=f"File {file.filename} could not be processed: {result.get('error')}")
+    _JOBS.set(job["import_id"], job)
+    return ImportReportResponse(**job)
 
 @router.get("/template", response_model=MessageResponse)
 def download_template():
@@ -21,7 +99,17 @@ def download_template():
 
 @router.get("/status/{import_id}", response_model=ImportStatusResponse)
 def import_status(import_id: str):
-    return ImportStatusResponse(import_id=import_id, status="completed")
+    job = _JOBS.get(import_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return ImportStatusResponse(import_id=import_id, status=job["status"])
+
+@router.get("/report/{import_id}", response_model=ImportReportResponse)
+def import_report(import_id: str):
+    job = _JOBS.get(import_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return ImportReportResponse(**job)
 
 @router.get("/ping")
 def ping():
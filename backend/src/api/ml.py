@@ -0,0 +1,117 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from core.config import settings
+from core.security import require_roles
+from core.uploads import IMAGE_MIMES, StoredUpload, save_upload
+from db.models import PronosticoCrecimiento
+from db.session import get_routed_db
+from services.image_store import get_image_store
+from services.ml_service import MLService
+from services.model_registry import get_model_registry
+
+router = APIRouter(tags=["ml"])
+
+# ====== Schemas ======
+class ImageAnalysis(BaseModel):
+    filename: Optional[str] = None
+    result: Dict[str, Any]
+
+class BatchAnalysisResponse(BaseModel):
+    count: int
+    results: List[ImageAnalysis]
+
+class GrowthForecastOut(BaseModel):
+    child_id: int
+    target_age_months: float
+    predicted_weight: float
+    predicted_height: float
+    trend: str
+    confidence: float
+    measurements: int
+    computed_at: Optional[datetime] = None
+
+# ====== Helpers ======
+async def _save_batch(files: List[UploadFile]) -> List[StoredUpload]:
+    if len(files) > settings.ML_MAX_BATCH_IMAGES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many images (max {settings.ML_MAX_BATCH_IMAGES} per batch)",
+        )
+    uploads: List[StoredUpload] = []
+    try:
+        for f in files:
+            uploads.append(await save_upload(f, allowed_types=IMAGE_MIMES, max_size=settings.ML_MAX_IMAGE_SIZE))
+    except BaseException:
+        _cleanup(uploads)
+        raise
+    return uploads
+
+def _cleanup(uploads: List[StoredUpload]) -> None:
+    # Las imágenes analizadas ya se movieron al store; esto borra el resto
+    for u in uploads:
+        u.remove()
+
+async def _analyze(kind: str, files: List[UploadFile]) -> BatchAnalysisResponse:
+    uploads = await _save_batch(files)
+    try:
+        results = await run_in_threadpool(MLService.analyze_stored, kind, uploads)
+    finally:
+        _cleanup(uploads)
+    return BatchAnalysisResponse(
+        count=len(results),
+        results=[ImageAnalysis(filename=f.filename, result=r) for f, r in zip(files, results)],
+    )
+
+# ====== Endpoints ======
+@router.get("/ping")
+def ping():
+    return {"ok": True, "service": "ml"}
+
+@router.get("/models", dependencies=[Depends(require_roles("admin"))])
+def models_report():
+    """Modelos cargados, tiempo de arranque en frío y memoria del worker."""
+    return get_model_registry().report()
+
+@router.post("/eye/batch", response_model=BatchAnalysisResponse)
+async def analyze_eye_batch(files: List[UploadFile] = File(...)):
+    return await _analyze("eye", files)
+
+@router.post("/gum/batch", response_model=BatchAnalysisResponse)
+async def analyze_gum_batch(files: List[UploadFile] = File(...)):
+    return await _analyze("gum", files)
+
+# Fotos clínicas de niños: solo personal autenticado
+@router.get("/images/{sha256}/thumbnail", dependencies=[Depends(require_roles("admin", "nutricionista"))])
+async def image_thumbnail(sha256: str):
+    if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+        raise HTTPException(status_code=404, detail="Image not found")
+    path = await run_in_threadpool(get_image_store().thumbnail, sha256)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    # Contenido direccionado por hash: nunca cambia. "private": solo la caché
+    # del navegador, nunca nginx, proxies ni CDN
+    return FileResponse(path, media_type="image/jpeg", headers={"Cache-Control": "private, max-age=86400, immutable"})
+
+@router.get("/forecast/{child_id}", response_model=GrowthForecastOut)
+def growth_forecast(child_id: int, db: Session = Depends(get_routed_db)):
+    """Pronóstico precalculado por el job nocturno (services.growth_forecast)."""
+    f = db.get(PronosticoCrecimiento, child_id)
+    if not f:
+        raise HTTPException(status_code=404, detail="Forecast not found")
+    return GrowthForecastOut(
+        child_id=f.infante_id,
+        target_age_months=round(f.edad_meses_objetivo, 1),
+        predicted_weight=float(f.peso_predicho),
+        predicted_height=float(f.talla_predicha),
+        trend=f.tendencia,
+        confidence=f.confianza,
+        measurements=f.mediciones,
+        computed_at=f.fecha_calculo,
+    )
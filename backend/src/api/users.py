@@ -13,10 +13,10 @@ from __future__ import annotations
 
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 
-from db.session import get_db
+from db.session import get_routed_db
 from db.models import Usuario, Rol
 from db.schemas import (
     UsuarioCreate,
@@ -24,8 +24,14 @@ from db.schemas import (
     UsuarioUpdate,
     PasswordChangeRequest,
 )
+from core.fast_json import RowSerializer, fast_json_enabled
+from core.refresh_tokens import revoke_user_refresh_tokens
+from core.response_cache import RESPONSES, response_cache_enabled, user_scope
 from core.security import (
+    UserSnapshot,
     current_user_dep,
+    invalidate_user,
+    revoke_user_tokens,
     require_roles,
     is_admin,
     hash_password,
@@ -34,6 +40,11 @@ from core.security import (
 
 router = APIRouter()
 
+_user_rows = RowSerializer(
+    UsuarioResponse,
+    Usuario.nombre, Usuario.correo, Usuario.telefono, Usuario.id_usuario, Usuario.fecha_creado, Usuario.rol_id,
+)
+
 
 # ----------------------------------------
 # Helpers
@@ -83,22 +94,33 @@ def ping():
 
 @router.get("/", response_model=List[UsuarioResponse], dependencies=[Depends(require_roles("admin"))])
 def list_users(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_routed_db),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
 ):
-    users = (
-        db.query(Usuario)
-        .order_by(Usuario.id_usuario.asc())
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
-    return [_user_to_schema(u) for u in users]
+    def query():
+        return (
+            db.query(Usuario)
+            .order_by(Usuario.id_usuario.asc())
+            .offset(offset)
+            .limit(limit)
+        )
+
+    # Solo admins llegan aquí (dependencia del decorador): comparten entrada
+    if response_cache_enabled():
+        return RESPONSES.cached(
+            request, ["users"],
+            lambda: _user_rows.serialize(query().with_entities(*_user_rows.columns).all()),
+            scope="admin",
+        )
+    if fast_json_enabled():
+        return _user_rows.response(query().with_entities(*_user_rows.columns).all())
+    return [_user_to_schema(u) for u in query().all()]
 
 
 @router.post("/", response_model=UsuarioResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_roles("admin"))])
-def create_user(payload: UsuarioCreate, db: Session = Depends(get_db)):
+def create_user(payload: UsuarioCreate, db: Session = Depends(get_routed_db)):
     _ensure_unique_fields(db, correo=payload.correo, telefono=payload.telefono)
     _validate_role(db, payload.rol_id)
 
@@ -111,6 +133,7 @@ def create_user(payload: UsuarioCreate, db: Session = Depends(get_db)):
     )
     db.add(nuevo)
     db.commit()
+    RESPONSES.invalidate("users")
     db.refresh(nuevo)
     return _user_to_schema(nuevo)
 
@@ -118,24 +141,31 @@ def create_user(payload: UsuarioCreate, db: Session = Depends(get_db)):
 @router.get("/{user_id}", response_model=UsuarioResponse)
 def get_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    me: Usuario = Depends(current_user_dep),
+    request: Request,
+    db: Session = Depends(get_routed_db),
+    me: UserSnapshot = Depends(current_user_dep),
 ):
-    u = db.query(Usuario).filter(Usuario.id_usuario == user_id).first()
-    if not u:
-        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    def load():
+        u = db.query(Usuario).filter(Usuario.id_usuario == user_id).first()
+        if not u:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
-    if me.id_usuario != u.id_usuario and not is_admin(me):
-        raise HTTPException(status_code=403, detail="Operación no permitida")
-    return _user_to_schema(u)
+        if me.id_usuario != u.id_usuario and not is_admin(me):
+            raise HTTPException(status_code=403, detail="Operación no permitida")
+        return _user_to_schema(u)
+
+    # Clave por usuario y rol: solo se reutiliza lo que este mismo llamante ya pudo ver
+    if response_cache_enabled():
+        return RESPONSES.cached(request, [f"user:{user_id}"], lambda: load().model_dump(mode="json"), scope=user_scope(me))
+    return load()
 
 
 @router.put("/{user_id}", response_model=UsuarioResponse)
 def update_user(
     user_id: int,
     payload: UsuarioUpdate,
-    db: Session = Depends(get_db),
-    me: Usuario = Depends(current_user_dep),
+    db: Session = Depends(get_routed_db),
+    me: UserSnapshot = Depends(current_user_dep),
 ):
     u = db.query(Usuario).filter(Usuario.id_usuario == user_id).first()
     if not u:
@@ -156,13 +186,20 @@ def update_user(
         u.telefono = payload.telefono
 
     # Solo admin puede cambiar rol
+    role_changed = False
     if payload.rol_id is not None:
         if not is_admin(me):
             raise HTTPException(status_code=403, detail="Solo un admin puede cambiar el rol")
         _validate_role(db, payload.rol_id)
+        role_changed = payload.rol_id != u.rol_id
         u.rol_id = payload.rol_id
 
     db.commit()
+    invalidate_user(u.id_usuario)
+    RESPONSES.invalidate(f"user:{u.id_usuario}", "users")
+    # El rol va firmado en el token: los emitidos antes dejan de valer
+    if role_changed:
+        revoke_user_tokens(db, u.id_usuario)
     db.refresh(u)
     return _user_to_schema(u)
 
@@ -170,13 +207,15 @@ def update_user(
 @router.delete("/{user_id}", status_code=status.HTTP_200_OK, dependencies=[Depends(require_roles("admin"))])
 def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_routed_db),
 ):
     u = db.query(Usuario).filter(Usuario.id_usuario == user_id).first()
     if not u:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     db.delete(u)
     db.commit()
+    RESPONSES.invalidate(f"user:{user_id}", "users")
+    revoke_user_tokens(db, user_id)
     return {"deleted": user_id}
 
 
@@ -184,8 +223,8 @@ def delete_user(
 def change_password(
     user_id: int,
     payload: PasswordChangeRequest,
-    db: Session = Depends(get_db),
-    me: Usuario = Depends(current_user_dep),
+    db: Session = Depends(get_routed_db),
+    me: UserSnapshot = Depends(current_user_dep),
 ):
     u = db.query(Usuario).filter(Usuario.id_usuario == user_id).first()
     if not u:
@@ -207,4 +246,7 @@ def change_password(
 
     u.contrasena = hash_password(payload.nueva_contrasena)
     db.commit()
+    invalidate_user(u.id_usuario)
+    # Las sesiones de otros dispositivos no pueden renovarse con la contraseña anterior
+    revoke_user_refresh_tokens(db, u.id_usuario)
     return {"id_usuario": u.id_usuario}
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+core.cache
+----------
+Caché clave → valor con TTL y backends intercambiables:
+- MemoryCache: TTL + LRU en el proceso (por defecto).
+- RedisCache: compartida entre workers (CACHE_BACKEND=redis, usa REDIS_URL).
+
+Los valores deben ser serializables a JSON (dict, list, str, números) para
+que ambos backends se comporten igual. Un fallo de Redis se trata como
+"miss": quien llama vuelve a la fuente original (la base de datos).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from core.config import settings
+from core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# La tasa de aciertos se calcula en Prometheus con rate() sobre este contador
+cache_lookups_total = REGISTRY.counter("cache_lookups_total", "Consultas a cada caché por resultado", ("cache", "result"))
+
+
+class CacheBackend(ABC):
+    """Interfaz común. `ttl` en segundos (None = TTL por defecto del backend)."""
+
+    def __init__(self, namespace: str, ttl: float):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    def _count(self, value: Optional[Any]) -> Optional[Any]:
+        if value is None:
+            self.misses += 1
+            cache_lookups_total.inc(cache=self.namespace, result="miss")
+        else:
+            self.hits += 1
+            cache_lookups_total.inc(cache=self.namespace, result="hit")
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class MemoryCache(CacheBackend):
+    """TTL + LRU en memoria, segura entre hilos."""
+
+    def __init__(self, namespace: str, ttl: float, max_entries: int):
+        super().__init__(namespace, ttl)
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return self._count(None)
+            expires, value = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return self._count(None)
+            self._data.move_to_end(key)
+            return self._count(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        data = super().stats()
+        data.update(entries=len(self._data), max_entries=self.max_entries)
+        return data
+
+
+class RedisCache(CacheBackend):
+    """Backend Redis (o compatible); las claves llevan el prefijo del namespace."""
+
+    def __init__(self, namespace: str, ttl: float, client: Any):
+        super().__init__(namespace, ttl)
+        self._client = client
+        self._prefix = f"cache:{namespace}:"
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = self._client.get(self._prefix + key)
+        except Exception as e:
+            logger.warning("Redis no disponible (%s): %s", self.namespace, e)
+            return self._count(None)
+        return self._count(json.loads(raw) if raw is not None else None)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        seconds = max(1, int(self.ttl if ttl is None else ttl))
+        try:
+            self._client.set(self._prefix + key, json.dumps(value, default=str), ex=seconds)
+        except Exception as e:
+            logger.warning("Redis no disponible (%s): %s", self.namespace, e)
+
+    def delete(self, key: str) -> None:
+        try:
+            self._client.delete(self._prefix + key)
+        except Exception as e:
+            logger.warning("No se pudo invalidar %s%s en Redis: %s", self._prefix, key, e)
+
+    def clear(self) -> None:
+        try:
+            keys = list(self._client.scan_iter(match=self._prefix + "*"))
+            if keys:
+                self._client.delete(*keys)
+        except Exception as e:
+            logger.warning("No se pudo limpiar %s en Redis: %s", self.namespace, e)
+
+
+_redis_client: Any = None
+_redis_lock = threading.Lock()
+
+
+def get_redis_client() -> Any:
+    global _redis_client
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                import redis  # opcional: solo con backends "redis"
+
+                _redis_client = redis.Redis.from_url(
+                    settings.REDIS_URL,
+                    password=settings.REDIS_PASSWORD,
+                    socket_timeout=settings.CACHE_REDIS_TIMEOUT,
+                    socket_connect_timeout=settings.CACHE_REDIS_TIMEOUT,
+                )
+    return _redis_client
+
+
+def create_cache(namespace: str, ttl: float, max_entries: int) -> CacheBackend:
+    """
+    Crea una caché según settings.CACHE_BACKEND ("memory" | "redis").
+    Si Redis no está instalado se usa memoria y se avisa en el log.
+    Sus aciertos y fallos se exponen en /metrics (cache_lookups_total).
+    """
+    if settings.CACHE_BACKEND.lower() == "redis":
+        try:
+            return RedisCache(namespace, ttl, get_redis_client())
+        except ImportError:
+            logger.warning("CACHE_BACKEND=redis pero el paquete 'redis' no está instalado; se usa memoria")
+    return MemoryCache(namespace, ttl, max_entries)
+
+
+__all__ = ["CacheBackend", "MemoryCache", "RedisCache", "create_cache", "get_redis_client"]
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+core.compression
+----------------
+Compresión de respuestas (ASGI), pensada para las tabletas de campo en redes
+móviles lentas:
+- brotli si el paquete `brotli` está instalado y el cliente lo acepta; si
+  no, gzip. Sin Accept-Encoding compatible la respuesta sale tal cual.
+- Solo por encima de COMPRESSION_MIN_SIZE bytes y nunca para tipos ya
+  comprimidos (PDF, XLSX/ZIP, imágenes, audio, vídeo).
+- Respuestas de cuerpo único que se pueden cachear (sin `Cache-Control:
+  no-store`) se guardan ya comprimidas en un LRU acotado por bytes, con
+  clave (codificación, hash del cuerpo): una respuesta repetida solo cuesta
+  el hash. Las respuestas en streaming se comprimen por trozos.
+- Un ETag fuerte pasa a débil (W/...) al comprimir, como hace nginx.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.metrics import REGISTRY
+
+try:
+    import brotli
+except ImportError:  # opcional: sin brotli solo gzip
+    brotli = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Prefijos de Content-Type que no se comprimen (ya lo están)
+EXCLUDED_TYPES: Tuple[str, ...] = (
+    "application/pdf",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-7z-compressed",
+    "application/octet-stream",
+    "application/vnd.openxmlformats-officedocument",  # xlsx, docx, pptx
+    "application/vnd.ms-excel",
+    "image/",
+    "audio/",
+    "video/",
+    "font/woff",
+)
+# Excepciones dentro de los excluidos (texto)
+INCLUDED_TYPES: Tuple[str, ...] = ("image/svg+xml",)
+
+compressed_responses = REGISTRY.counter(
+    "http_compressed_responses_total", "Respuestas comprimidas", ("encoding", "source")
+)
+compression_bytes = REGISTRY.counter(
+    "http_compression_bytes_total", "Bytes antes y después de comprimir", ("direction",)
+)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """'br' o 'gzip' según Accept-Encoding (respetando q=0); None si ninguna."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            accepted[token] = q
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+class CompressedCache:
+    """LRU de cuerpos ya comprimidos, acotado por el total de bytes guardados."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, bytes]) -> Optional[bytes]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Tuple[str, bytes], value: bytes) -> None:
+        if len(value) > self.max_bytes // 4:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._data[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes and self._data:
+                _, evicted = self._data.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._data), "bytes": self._size, "max_bytes": self.max_bytes}
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=brotli_quality)
+            self._compress, self._finish = self._obj.process, self._obj.finish
+        else:
+            self._obj = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress, self._finish = self._obj.compress, self._obj.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compress(data)
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class CompressionMiddleware:
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+        cache_max_bytes: int = 32 * 1024 * 1024,
+        excluded_types: Sequence[str] = EXCLUDED_TYPES,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.excluded_types = tuple(excluded_types)
+        self.cache = CompressedCache(cache_max_bytes) if cache_max_bytes > 0 else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _Responder(self, encoding, send)(self.app, scope, receive)
+
+    # ------------------------------------------------------------------
+    def compressible_type(self, content_type: str) -> bool:
+        content_type = content_type.lower()
+        if not content_type:
+            return False
+        if content_type.startswith(INCLUDED_TYPES):
+            return True
+        return not content_type.startswith(self.excluded_types)
+
+    def compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+
+class _Responder:
+    """Estado de una respuesta: retiene el inicio hasta ver el primer trozo del cuerpo."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.mw = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.streamer: Optional[_StreamCompressor] = None
+        self.passthrough = False
+
+    async def __call__(self, app: ASGIApp, scope: Scope, receive: Receive) -> None:
+        await app(scope, receive, self.on_send)
+
+    def _eligible(self, headers: MutableHeaders) -> bool:
+        status = self.start["status"] if self.start else 200
+        if status < 200 or status in (204, 206, 304):
+            return False
+        if "content-encoding" in headers:
+            return False
+        return self.mw.compressible_type(headers.get("content-type", ""))
+
+    def _set_headers(self, headers: MutableHeaders, length: Optional[int]) -> None:
+        headers["Content-Encoding"] = self.encoding
+        if length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(length)
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+
+    async def on_send(self, message: Message) -> None:
+        kind = message["type"]
+        if kind == "http.response.start":
+            self.start = message
+            return
+        if kind != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+
+        if self.streamer is not None:
+            chunk = self.streamer.compress(body)
+            if not more:
+                chunk += self.streamer.finish()
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more})
+            return
+
+        # Primer trozo del cuerpo: decidir
+        headers = MutableHeaders(raw=self.start["headers"])
+        eligible = self._eligible(headers)
+        if eligible:
+            headers.add_vary_header("Accept-Encoding")
+        if not eligible or (not more and len(body) < self.mw.minimum_size):
+            self.passthrough = True
+            await self.send(self.start)
+            await self.send(message)
+            return
+
+        if more:
+            self.streamer = _StreamCompressor(self.encoding, self.mw.gzip_level, self.mw.brotli_quality)
+            self._set_headers(headers, None)
+            await self.send(self.start)
+            compressed_responses.inc(encoding=self.encoding, source="stream")
+            await self.send({"type": "http.response.body", "body": self.streamer.compress(body), "more_body": True})
+            return
+
+        compressed = self._compress_whole(headers, body)
+        self._set_headers(headers, len(compressed))
+        await self.send(self.start)
+        await self.send({"type": "http.response.body", "body": compressed})
+
+    def _compress_whole(self, headers: MutableHeaders, body: bytes) -> bytes:
+        cache = self.mw.cache
+        cacheable = cache is not None and "no-store" not in headers.get("cache-control", "").lower()
+        key = (self.encoding, hashlib.blake2b(body, digest_size=16).digest()) if cacheable else None
+        if key is not None:
+            hit = cache.get(key)
+            if hit is not None:
+                compressed_responses.inc(encoding=self.encoding, source="cache")
+                return hit
+        compressed = self.mw.compress(self.encoding, body)
+        compression_bytes.inc(len(body), direction="in")
+        compression_bytes.inc(len(compressed), direction="out")
+        compressed_responses.inc(encoding=self.encoding, source="compressed")
+        if key is not None:
+            cache.set(key, compressed)
+        return compressed
+
+
+__all__ = ["CompressionMiddleware", "CompressedCache", "choose_encoding", "EXCLUDED_TYPES"]
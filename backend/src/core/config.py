@@ -23,6 +23,13 @@ class Settings(BaseSettings):
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
     REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
+    # Cada cuánto recarga cada worker la lista de revocación de tokens
+    TOKEN_REVOCATION_SYNC_SECONDS: int = int(os.getenv("TOKEN_REVOCATION_SYNC_SECONDS", 30))
+    # Coste de bcrypt; los hashes con otro coste se rehashean en el login
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", 12))
+    # Executor dedicado a bcrypt: hilos y peticiones admitidas (en cola + en curso)
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 16))
 
     # === Database ===
     DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL")
@@ -33,11 +40,51 @@ class Settings(BaseSettings):
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "5432")
     DATABASE_POOL_SIZE: int = int(os.getenv("DATABASE_POOL_SIZE", 10))
     DATABASE_MAX_OVERFLOW: int = int(os.getenv("DATABASE_MAX_OVERFLOW", 20))
+    # Esquema gestionado por Alembic: sin migrar, el arranque falla (si no, solo avisa)
+    DB_SCHEMA_STRICT: bool = os.getenv(
+        "DB_SCHEMA_STRICT", str(os.getenv("ENVIRONMENT", "development") == "production")
+    ).lower() == "true"
+    # Aviso en el log si un checkout del pool espera más de esto
+    DB_POOL_WAIT_WARN_MS: int = int(os.getenv("DB_POOL_WAIT_WARN_MS", 100))
+    # Réplicas de lectura, separadas por comas (vacío = solo primario)
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    REPLICA_HEALTH_INTERVAL_SECONDS: int = int(os.getenv("REPLICA_HEALTH_INTERVAL_SECONDS", 10))
+    # Tras escribir, el usuario lee del primario durante esta ventana
+    READ_YOUR_WRITES_SECONDS: int = int(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+    # Probe de salud en segundo plano (/health devuelve su última foto)
+    HEALTH_PROBE_INTERVAL_SECONDS: int = int(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", 10))
+    HEALTH_MAX_STALENESS_SECONDS: int = int(os.getenv("HEALTH_MAX_STALENESS_SECONDS", 30))
 
     # === Redis (for caching and sessions) ===
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     REDIS_PASSWORD: Optional[str] = os.getenv("REDIS_PASSWORD")
 
+    # === Cache ===
+    # "memory" (por proceso) o "redis" (compartida entre workers)
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_REDIS_TIMEOUT: float = float(os.getenv("CACHE_REDIS_TIMEOUT", 0.2))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+    USER_CACHE_MAX_ENTRIES: int = int(os.getenv("USER_CACHE_MAX_ENTRIES", 10000))
+    # Respuestas GET de los paneles (core.response_cache), invalidadas al escribir
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "True").lower() == "true"
+    RESPONSE_CACHE_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 30))
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 20000))
+
+    # === Rate limiting ("capacidad/segundos"; "0" desactiva) ===
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+    # "memory" (por worker) o "redis" (compartido)
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_LOGIN_PER_IP: str = os.getenv("RATE_LIMIT_LOGIN_PER_IP", "20/60")
+    RATE_LIMIT_LOGIN_PER_ACCOUNT: str = os.getenv("RATE_LIMIT_LOGIN_PER_ACCOUNT", "5/60")
+    RATE_LIMIT_REFRESH_PER_IP: str = os.getenv("RATE_LIMIT_REFRESH_PER_IP", "30/60")
+    RATE_LIMIT_UPLOAD_PER_IP: str = os.getenv("RATE_LIMIT_UPLOAD_PER_IP", "30/60")
+    RATE_LIMIT_UPLOAD_PER_ACCOUNT: str = os.getenv("RATE_LIMIT_UPLOAD_PER_ACCOUNT", "20/60")
+    RATE_LIMIT_API_PER_IP: str = os.getenv("RATE_LIMIT_API_PER_IP", "600/60")
+    RATE_LIMIT_API_PER_ACCOUNT: str = os.getenv("RATE_LIMIT_API_PER_ACCOUNT", "300/60")
+    # Proxies (IPs o redes, separadas por comas) cuyo X-Forwarded-For / X-Real-IP
+    # se acepta como IP del cliente; detrás de nginx debe incluir su dirección
+    RATE_LIMIT_TRUSTED_PROXIES: str = os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "127.0.0.1,::1")
+
     # === CORS ===
     ALLOWED_ORIGINS: List[str] = [
         "http://localhost:3000",
@@ -50,6 +97,8 @@ class Settings(BaseSettings):
     # === File uploads ===
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB
+    # Límite del cuerpo completo de una petición multipart (p.ej. lotes de imágenes)
+    MAX_UPLOAD_REQUEST_SIZE: int = int(os.getenv("MAX_UPLOAD_REQUEST_SIZE", 200 * 1024 * 1024))
     ALLOWED_FILE_TYPES: List[str] = [
         "image/jpeg", "image/png", "image/gif",
         "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
@@ -57,6 +106,26 @@ class Settings(BaseSettings):
         "text/csv"
     ]
 
+    # === Background processing ===
+    # 0 = usar todos los núcleos disponibles
+    PROCESS_POOL_WORKERS: int = int(os.getenv("PROCESS_POOL_WORKERS", 0))
+    EXCEL_CHUNK_ROWS: int = int(os.getenv("EXCEL_CHUNK_ROWS", 5000))
+    # Informes de importación (core.cache: compartidos si CACHE_BACKEND=redis)
+    IMPORT_JOB_TTL_SECONDS: int = int(os.getenv("IMPORT_JOB_TTL_SECONDS", 3600))
+    IMPORT_JOB_MAX_ENTRIES: int = int(os.getenv("IMPORT_JOB_MAX_ENTRIES", 1000))
+    # Errores por fila guardados en el informe (error_count lleva el total)
+    IMPORT_REPORT_MAX_ERRORS: int = int(os.getenv("IMPORT_REPORT_MAX_ERRORS", 200))
+    ML_MAX_BATCH_IMAGES: int = int(os.getenv("ML_MAX_BATCH_IMAGES", 500))
+    # Tamaño máximo de cada imagen de un lote (también fija el límite de la petición)
+    ML_MAX_IMAGE_SIZE: int = int(os.getenv("ML_MAX_IMAGE_SIZE", 10 * 1024 * 1024))
+    IMAGE_THUMBNAIL_SIZE: int = int(os.getenv("IMAGE_THUMBNAIL_SIZE", 256))
+    ANALYSIS_CACHE_ENTRIES: int = int(os.getenv("ANALYSIS_CACHE_ENTRIES", 4096))
+    FORECAST_MAX_POINTS: int = int(os.getenv("FORECAST_MAX_POINTS", 12))
+    FORECAST_RECENCY_MONTHS: float = float(os.getenv("FORECAST_RECENCY_MONTHS", 6))
+
+    # === ML models ===
+    MODEL_DIR: str = os.getenv("MODEL_DIR", "models")
+
     # === Email ===
     SMTP_HOST: Optional[str] = os.getenv("SMTP_HOST")
     SMTP_PORT: int = int(os.getenv("SMTP_PORT", 587))
@@ -68,8 +137,36 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     LOG_FILE: str = os.getenv("LOG_FILE", "logs/app.log")
 
+    # === Responses ===
+    # Listados (evaluaciones, usuarios, alertas) con filas como tuplas + orjson
+    FAST_JSON_ENABLED: bool = os.getenv("FAST_JSON_ENABLED", "True").lower() == "true"
+    # Compresión (brotli si está instalado, si no gzip) por encima de este tamaño
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 5))
+    # LRU de respuestas ya comprimidas (0 lo desactiva)
+    COMPRESSION_CACHE_MAX_BYTES: int = int(os.getenv("COMPRESSION_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
     # === Monitoring ===
     SENTRY_DSN: Optional[str] = os.getenv("SENTRY_DSN")
+    # Perfilado SQL por petición (Server-Timing + avisos de N+1); dev/staging
+    SQL_PROFILER_ENABLED: bool = os.getenv("SQL_PROFILER_ENABLED", "False").lower() == "true"
+    SQL_PROFILER_N1_THRESHOLD: int = int(os.getenv("SQL_PROFILER_N1_THRESHOLD", 5))
+    # /metrics en formato Prometheus; con METRICS_TOKEN exige "Authorization: Bearer <token>"
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    METRICS_TOKEN: Optional[str] = os.getenv("METRICS_TOKEN")
+    # Cada cuánto se recalculan los gauges que consultan la base de datos
+    METRICS_DB_GAUGE_TTL_SECONDS: float = float(os.getenv("METRICS_DB_GAUGE_TTL_SECONDS", 30))
+    # Perfilado por muestreo: fracción aleatoria, cabecera X-Profile firmada y
+    # captura automática de las peticiones lentas (0 desactiva la captura)
+    PROFILER_ENABLED: bool = os.getenv("PROFILER_ENABLED", "True").lower() == "true"
+    PROFILER_SAMPLE_RATE: float = float(os.getenv("PROFILER_SAMPLE_RATE", 0.0))
+    PROFILER_SLOW_THRESHOLD_MS: float = float(os.getenv("PROFILER_SLOW_THRESHOLD_MS", 2000))
+    PROFILER_INTERVAL_MS: float = float(os.getenv("PROFILER_INTERVAL_MS", 5))
+    # Memoria por worker: ~ (MAX_PROFILES + perfiles en curso) × MAX_SAMPLES × 0,5 KB
+    PROFILER_MAX_SAMPLES: int = int(os.getenv("PROFILER_MAX_SAMPLES", 2000))
+    PROFILER_MAX_PROFILES: int = int(os.getenv("PROFILER_MAX_PROFILES", 10))
 
     class Config:
         env_file = ".env"
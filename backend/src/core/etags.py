@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+core.etags
+----------
+ETag débiles y GET condicional (If-None-Match -> 304):
+- `weak_etag(*partes)`: ETag a partir de la versión de los datos (id +
+  updated_at de la fila, claves de una página...). Las respuestas la llevan
+  calculada de las filas ya cargadas (`versioned`); la consulta de versión
+  (`etag()`) solo se ejecuta si la petición trae If-None-Match, y entonces
+  permite contestar 304 sin cargar ni serializar el cuerpo.
+- `body_etag(cuerpo)`: hash del cuerpo ya serializado, para recursos sin
+  versión en la base de datos; ahorra la transferencia, no la consulta.
+- Siempre débiles (W/...): el cuerpo puede ir comprimido o no según el
+  cliente, y CompressionMiddleware ya debilita los fuertes.
+- `Cache-Control: no-cache`: el cliente puede guardar la respuesta, pero
+  debe revalidarla en cada uso (los datos clínicos cambian).
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Callable, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from core.fast_json import FastJSONResponse
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def weak_etag(*parts: Any) -> str:
+    raw = "\x1f".join("" if part is None else str(part) for part in parts)
+    return 'W/"%s"' % hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def body_etag(body: bytes) -> str:
+    return 'W/"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag[:2] in ("W/", "w/") else tag
+
+
+def etag_requested(request: Request) -> bool:
+    """La petición es condicional (solo entonces compensa consultar la versión)."""
+    return bool(request.headers.get("if-none-match"))
+
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """If-None-Match casa con `etag` (comparación débil, RFC 9110 13.1.2)."""
+    header = request.headers.get("if-none-match")
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = _opaque(etag)
+    return any(_opaque(candidate) == wanted for candidate in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def versioned(content: Any, etag: Optional[str], status_code: int = 200) -> Response:
+    """Respuesta JSON con el ETag de la versión de las filas con que se construyó."""
+    response = FastJSONResponse(content, status_code=status_code)
+    if etag:
+        response.headers["ETag"] = etag
+    return response
+
+
+def tag_response(response: Response, etag: Optional[str] = None) -> str:
+    """
+    Pone ETag y Cache-Control a `response`: el que ya traiga (versioned), si
+    no `etag` y, en último caso, el hash del cuerpo.
+    """
+    etag = response.headers.get("etag") or etag or body_etag(response.body)
+    response.headers["ETag"] = etag
+    response.headers.setdefault("Cache-Control", CACHE_CONTROL)
+    return etag
+
+
+def conditional(
+    request: Request,
+    build: Callable[[], Any],
+    etag: Optional[Callable[[], Optional[str]]] = None,
+    status_code: int = 200,
+) -> Response:
+    """
+    GET condicional sin caché de respuestas: con If-None-Match, si `etag()`
+    (consulta de versión) casa, 304 sin llamar a `build()`; si no, la
+    respuesta de `build()` con su ETag (ver tag_response).
+    """
+    version = etag() if etag is not None and etag_requested(request) else None
+    if version is not None and etag_matches(request, version):
+        return not_modified(version)
+
+    content = build()
+    response = content if isinstance(content, Response) else FastJSONResponse(content, status_code=status_code)
+    if not 200 <= response.status_code < 300:
+        return response
+    version = tag_response(response, version)
+    if etag_matches(request, version):
+        return not_modified(version)
+    return response
+
+
+__all__ = [
+    "CACHE_CONTROL",
+    "body_etag",
+    "conditional",
+    "etag_matches",
+    "etag_requested",
+    "not_modified",
+    "tag_response",
+    "versioned",
+    "weak_etag",
+]
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+core.executors
+--------------
+Pools de ejecución compartidos por los servicios:
+- Process pool (spawn) para trabajo CPU-bound: parseo de Excel, imágenes, etc.
+- Executor acotado para bcrypt (hash/verificación de contraseñas): pocos
+  hilos propios y un máximo de peticiones admitidas; si se llena, falla al
+  instante (ExecutorSaturated) en lugar de acaparar el threadpool de la API.
+
+Los pools se crean de forma perezosa la primera vez que se necesitan y se
+cierran en el lifespan de la app (ver main.py).
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from core.config import settings
+from core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+executor_tasks = REGISTRY.gauge(
+    "executor_tasks", "Tareas en los executors acotados por estado", ("executor", "state")
+)
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def process_pool_size() -> int:
+    """Número de procesos del pool (PROCESS_POOL_WORKERS=0 → todos los núcleos)."""
+    configured = int(getattr(settings, "PROCESS_POOL_WORKERS", 0) or 0)
+    return configured if configured > 0 else (os.cpu_count() or 1)
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Devuelve el ProcessPoolExecutor compartido.
+    Usa 'spawn' para no heredar hilos ni conexiones del worker de uvicorn.
+    """
+    global _process_pool
+    if _process_pool is None:
+        with _process_pool_lock:
+            if _process_pool is None:
+                workers = process_pool_size()
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                logger.info("Process pool iniciado con %s workers", workers)
+    return _process_pool
+
+
+class ExecutorSaturated(RuntimeError):
+    """El executor acotado ya tiene `max_pending` tareas admitidas."""
+
+
+class BoundedExecutor:
+    """
+    ThreadPoolExecutor con límite de tareas admitidas (en cola + en curso).
+    submit() no bloquea: si no hay hueco lanza ExecutorSaturated.
+    Lleva contadores para exponer la profundidad de cola.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(self.max_workers, max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._peak_pending = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._run_seconds = 0.0
+        executor_tasks.set_function(lambda: self.stats()["queued"], executor=name, state="queued")
+        executor_tasks.set_function(lambda: self.stats()["running"], executor=name, state="running")
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ExecutorSaturated(self.name)
+
+        with self._lock:
+            self._pending += 1
+            self._submitted += 1
+            self._peak_pending = max(self._peak_pending, self._pending)
+        enqueued = time.perf_counter()
+
+        def task() -> Any:
+            started = time.perf_counter()
+            with self._lock:
+                self._running += 1
+                waited = started - enqueued
+                self._wait_seconds += waited
+                self._max_wait_seconds = max(self._max_wait_seconds, waited)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._run_seconds += time.perf_counter() - started
+
+        def done(_: Future) -> None:
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+            self._slots.release()
+
+        try:
+            future = self._executor.submit(task)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(done)
+        return future
+
+    def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """submit() y espera el resultado."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._completed
+            return {
+                "name": self.name,
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "running": self._running,
+                "queued": max(self._pending - self._running, 0),
+                "peak_pending": self._peak_pending,
+                "submitted": self._submitted,
+                "completed": completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_seconds / completed * 1000, 2) if completed else 0.0,
+                "max_wait_ms": round(self._max_wait_seconds * 1000, 2),
+                "avg_run_ms": round(self._run_seconds / completed * 1000, 2) if completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_password_executor: Optional[BoundedExecutor] = None
+_password_executor_lock = threading.Lock()
+
+
+def get_password_executor() -> BoundedExecutor:
+    """Executor acotado para bcrypt (PASSWORD_HASH_WORKERS / PASSWORD_HASH_MAX_PENDING)."""
+    global _password_executor
+    if _password_executor is None:
+        with _password_executor_lock:
+            if _password_executor is None:
+                _password_executor = BoundedExecutor(
+                    "password-hash",
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+                )
+                logger.info(
+                    "Executor de contraseñas iniciado (%s hilos, máx. %s pendientes)",
+                    _password_executor.max_workers, _password_executor.max_pending,
+                )
+    return _password_executor
+
+
+def shutdown_executors() -> None:
+    """Cierra los pools compartidos (llamar desde el lifespan)."""
+    global _process_pool, _password_executor
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=True, cancel_futures=True)
+            _process_pool = None
+            logger.info("Process pool detenido")
+    with _password_executor_lock:
+        if _password_executor is not None:
+            _password_executor.shutdown()
+            _password_executor = None
+            logger.info("Executor de contraseñas detenido")
+
+
+__all__ = [
+    "BoundedExecutor",
+    "ExecutorSaturated",
+    "get_password_executor",
+    "get_process_pool",
+    "process_pool_size",
+    "shutdown_executors",
+]
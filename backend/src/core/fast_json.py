@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+core.fast_json
+--------------
+Ruta rápida para endpoints de listado:
+- RowSerializer: a partir del schema de respuesta y de las columnas ORM
+  equivalentes, convierte filas (tuplas de `query(*columnas)`) en dicts con
+  la misma forma que produciría el `response_model`, sin instanciar ni
+  validar un modelo Pydantic por fila. Las conversiones (Decimal -> float)
+  se deciden una vez, al construir el serializador.
+- FastJSONResponse: codifica con orjson (fechas en ISO 8601, UTC como "Z",
+  igual que Pydantic). Sin orjson instalado se usa json de la stdlib.
+
+Al devolver una Response, FastAPI no vuelve a validar contra el
+`response_model`, que se mantiene en el decorador para OpenAPI.
+FAST_JSON_ENABLED=false vuelve a la ruta normal (objetos ORM + Pydantic).
+"""
+
+from __future__ import annotations
+
+import json
+import typing
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Type
+
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+from core.config import settings
+
+try:
+    import orjson
+except ImportError:  # opcional: sin orjson se codifica con json
+    orjson = None  # type: ignore
+
+
+def fast_json_enabled() -> bool:
+    return getattr(settings, "FAST_JSON_ENABLED", True)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_json_default, option=orjson.OPT_UTC_Z)
+        return json.dumps(content, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _to_float(value: Any) -> Any:
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def _converter(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """Conversión necesaria para que el valor salga como lo haría Pydantic."""
+    args = [a for a in typing.get_args(annotation) if a is not type(None)]
+    target = args[0] if typing.get_origin(annotation) is typing.Union and len(args) == 1 else annotation
+    if target is float:
+        return _to_float
+    return None
+
+
+class RowSerializer:
+    """
+    Serializador precompilado de filas para `model`.
+    `columns` son atributos ORM cuyo nombre coincide con los campos del modelo.
+    """
+
+    def __init__(self, model: Type[BaseModel], *columns: Any):
+        by_name = {c.key: c for c in columns}
+        missing = set(model.model_fields) - set(by_name)
+        if missing:
+            raise ValueError(f"{model.__name__}: faltan columnas para {sorted(missing)}")
+        # Mismo orden de claves que el modelo
+        self.fields: List[str] = list(model.model_fields)
+        self.columns = [by_name[name] for name in self.fields]
+        self._converters = [
+            (i, conv) for i, name in enumerate(self.fields)
+            if (conv := _converter(model.model_fields[name].annotation)) is not None
+        ]
+
+    def serialize(self, rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+        fields, converters = self.fields, self._converters
+        if not converters:
+            return [dict(zip(fields, row)) for row in rows]
+        out = []
+        for row in rows:
+            values = list(row)
+            for i, conv in converters:
+                values[i] = conv(values[i])
+            out.append(dict(zip(fields, values)))
+        return out
+
+    def response(self, rows: Iterable[Sequence[Any]], status_code: int = 200) -> FastJSONResponse:
+        return FastJSONResponse(self.serialize(rows), status_code=status_code)
+
+
+__all__ = ["FastJSONResponse", "RowSerializer", "fast_json_enabled"]
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+core.health
+-----------
+Chequeo de salud en segundo plano:
+- HealthProbe ejecuta cada HEALTH_PROBE_INTERVAL_SECONDS (en un hilo, para
+  no bloquear el event loop) un `SELECT 1` contra el primario, lee el estado
+  del pool, comprueba las réplicas y hace PING a Redis si algún backend lo usa.
+- El resultado se guarda en memoria: `/health` (readiness) devuelve esa foto
+  y los probes de Kubernetes / Docker / nginx no consumen conexiones del pool.
+- Si la foto tiene más de HEALTH_MAX_STALENESS_SECONDS (p.ej. el probe está
+  atascado esperando al pool), se considera no lista.
+
+Estados: "healthy" (todo bien), "degraded" (Redis o alguna réplica caída:
+se sigue sirviendo, con fallback) y "unhealthy" (primario caído o sin datos).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _timed(fn) -> Dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        fn()
+        result: Dict[str, Any] = {"ok": True}
+    except Exception as e:
+        result = {"ok": False, "error": str(e)[:200]}
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+class HealthProbe:
+
+    def __init__(self, engine: Any = None, replica_set: Any = None,
+                 interval: float = 10.0, max_staleness: Optional[float] = None):
+        self.engine = engine
+        self.replica_set = replica_set
+        self.interval = interval
+        self.max_staleness = max_staleness if max_staleness else 3 * interval
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._started_at = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # Chequeos (síncronos, se ejecutan en un hilo)
+    # ------------------------------------------------------------------
+    def _check_db(self) -> Dict[str, Any]:
+        def ping() -> None:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+
+        return _timed(ping)
+
+    def _pool_state(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        state: Dict[str, Any] = {"class": type(pool).__name__}
+        for name in ("size", "checkedout", "overflow", "checkedin"):
+            method = getattr(pool, name, None)
+            if callable(method):
+                state[name] = method()
+        return state
+
+    @staticmethod
+    def _uses_redis() -> bool:
+        backends = (getattr(settings, "CACHE_BACKEND", "memory"), getattr(settings, "RATE_LIMIT_BACKEND", "memory"))
+        return any(str(b).lower() == "redis" for b in backends)
+
+    @staticmethod
+    def _check_redis() -> Dict[str, Any]:
+        from core.cache import get_redis_client
+
+        return _timed(lambda: get_redis_client().ping())
+
+    def run_once(self) -> Dict[str, Any]:
+        checks: Dict[str, Any] = {}
+        status = "healthy"
+
+        if self.engine is not None:
+            checks["db"] = self._check_db()
+            checks["pool"] = self._pool_state()
+            if not checks["db"]["ok"]:
+                status = "unhealthy"
+
+        if self.replica_set is not None and self.replica_set.engines:
+            self.replica_set.check()
+            checks["replicas"] = self.replica_set.status()
+            if status == "healthy" and not all(r["healthy"] for r in checks["replicas"]):
+                status = "degraded"
+
+        if self._uses_redis():
+            checks["redis"] = self._check_redis()
+            if status == "healthy" and not checks["redis"]["ok"]:
+                status = "degraded"
+
+        snapshot = {
+            "status": status,
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "checks": checks,
+        }
+        if status != "healthy" and (self._snapshot or {}).get("status") != status:
+            logger.warning("Health probe: %s %s", status, checks)
+        self._snapshot = snapshot
+        self._checked_at = time.monotonic()
+        return snapshot
+
+    # ------------------------------------------------------------------
+    # Bucle en segundo plano
+    # ------------------------------------------------------------------
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                logger.error("Health probe falló: %s", e)
+            await asyncio.sleep(self.interval)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="health-probe")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ------------------------------------------------------------------
+    # Lectura (sin E/S)
+    # ------------------------------------------------------------------
+    def snapshot(self) -> Dict[str, Any]:
+        """Última foto + antigüedad; `ready` indica si sirve para readiness."""
+        if self._snapshot is None:
+            return {"status": "starting", "ready": False, "checks": {}}
+        age = time.monotonic() - (self._checked_at or 0.0)
+        data = dict(self._snapshot, age_seconds=round(age, 2))
+        if age > self.max_staleness:
+            data["status"] = "unhealthy"
+            data["stale"] = True
+        data["ready"] = data["status"] != "unhealthy"
+        return data
+
+    def uptime(self) -> float:
+        return time.monotonic() - self._started_at
+
+
+__all__ = ["HealthProbe"]
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+core.http_metrics
+-----------------
+Métricas HTTP por ruta (ASGI), expuestas en /metrics junto con el resto de
+REGISTRY:
+- http_request_duration_seconds{method,route}: histograma de latencia.
+- http_requests_total{method,route,status}: peticiones por código.
+- http_request_size_bytes / http_response_size_bytes{method,route}: bytes
+  del cuerpo recibido y enviado (ya comprimido, es lo que viaja por la red).
+- http_requests_in_flight: peticiones en curso en este worker.
+
+`route` es la plantilla de la ruta (/api/children/{child_id}), no la URL:
+así la cardinalidad queda acotada por el número de endpoints. Las peticiones
+que no casan con ninguna ruta se agrupan en "unmatched".
+
+Las métricas son por proceso: con varios workers cada uno expone las suyas.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Collection, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.metrics import REGISTRY
+
+# Bytes: de 256 B a 16 MB
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+# Segundos: de 5 ms a 30 s (los informes PDF y las importaciones tardan)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+UNMATCHED_ROUTE = "unmatched"
+
+request_duration = REGISTRY.histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta",
+    ("method", "route"), buckets=LATENCY_BUCKETS,
+)
+requests_total = REGISTRY.counter(
+    "http_requests_total", "Peticiones HTTP por ruta y código de estado", ("method", "route", "status")
+)
+request_size = REGISTRY.histogram(
+    "http_request_size_bytes", "Tamaño del cuerpo de las peticiones", ("method", "route"), buckets=SIZE_BUCKETS
+)
+response_size = REGISTRY.histogram(
+    "http_response_size_bytes", "Tamaño del cuerpo de las respuestas", ("method", "route"), buckets=SIZE_BUCKETS
+)
+in_flight = REGISTRY.gauge("http_requests_in_flight", "Peticiones HTTP en curso")
+
+
+def route_template(scope: Scope) -> str:
+    """Plantilla de la ruta que atendió la petición (la fija el router de FastAPI)."""
+    route = scope.get("route")
+    path = getattr(route, "path_format", None) or getattr(route, "path", None)
+    return path or UNMATCHED_ROUTE
+
+
+class HTTPMetricsMiddleware:
+    """Debe ser el middleware más externo para medir también a los demás."""
+
+    def __init__(self, app: ASGIApp, excluded_paths: Collection[str] = ("/metrics",)):
+        self.app = app
+        self.excluded_paths = frozenset(excluded_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        received = 0
+        sent = 0
+        status: Optional[int] = None
+
+        async def counting_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message: Message) -> None:
+            nonlocal sent, status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        method = scope["method"]
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        except Exception:
+            # La excepción la convierte en 500 ServerErrorMiddleware, más afuera
+            if status is None:
+                status = 500
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            route = route_template(scope)
+            request_duration.observe(elapsed, method=method, route=route)
+            requests_total.inc(method=method, route=route, status=status or 500)
+            request_size.observe(received, method=method, route=route)
+            response_size.observe(sent, method=method, route=route)
+
+
+__all__ = ["HTTPMetricsMiddleware", "route_template", "LATENCY_BUCKETS", "SIZE_BUCKETS"]
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+core.metrics
+------------
+Métricas en proceso (por worker), sin dependencias externas:
+- Counter: contador monotónico.
+- Gauge: valor instantáneo, fijado a mano o leído de un callback.
+- Histogram: buckets acumulados + suma y cuenta (estilo Prometheus).
+
+Todas admiten etiquetas (`labels=("pool",)` y luego `.observe(v, pool="primary")`).
+Se registran en REGISTRY, que los endpoints de administración exponen con
+`snapshot()` y /metrics en formato de texto de Prometheus con
+`render_prometheus()`.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Segundos: de 1 ms a 10 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name}: se esperaban las etiquetas {self.labels}, no {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    @abstractmethod
+    def samples(self) -> List[Tuple[LabelValues, Any]]:
+        ...
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "type": self.kind,
+            "description": self.description,
+            "values": [
+                {"labels": dict(zip(self.labels, key)), "value": value}
+                for key, value in self.samples()
+            ],
+        }
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[Tuple[LabelValues, Any]]:
+        with self._lock:
+            return list(self._values.items())
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+        # por etiqueta: [callback, ttl, instante de la última lectura, último valor]
+        self._callbacks: Dict[LabelValues, List[Any]] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], float], ttl: float = 0.0, **labels: Any) -> None:
+        """
+        El valor se lee de `fn` en cada lectura (p.ej. conexiones en uso).
+        Con `ttl` > 0 se reutiliza el último valor durante `ttl` segundos
+        (callbacks caros, como un COUNT en la base de datos).
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._callbacks[key] = [fn, ttl, 0.0, None]
+
+    def samples(self) -> List[Tuple[LabelValues, Any]]:
+        with self._lock:
+            values = dict(self._values)
+            callbacks = dict(self._callbacks)
+        now = time.monotonic()
+        for key, entry in callbacks.items():
+            fn, ttl, read_at, last = entry
+            if last is not None and now - read_at < ttl:
+                values[key] = last
+                continue
+            try:
+                values[key] = entry[3] = float(fn())
+                entry[2] = now
+            except Exception:
+                if last is not None:
+                    values[key] = last
+        return list(values.items())
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        # por etiqueta: [cuentas por bucket (+Inf al final), suma, máximo]
+        self._data: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._data.get(key)
+            if data is None:
+                data = self._data[key] = [[0] * (len(self.buckets) + 1), 0.0, 0.0]
+            data[0][index] += 1
+            data[1] += value
+            data[2] = max(data[2], value)
+
+    def _summary(self, counts: List[int], total: float, maximum: float) -> Dict[str, Any]:
+        count = sum(counts)
+        cumulative, running = [], 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            running += n
+            cumulative.append((bound, running))
+        return {
+            "count": count,
+            "sum": total,
+            "max": maximum,
+            "avg": total / count if count else 0.0,
+            "p50": self._quantile(cumulative, count, maximum, 0.50),
+            "p95": self._quantile(cumulative, count, maximum, 0.95),
+            "p99": self._quantile(cumulative, count, maximum, 0.99),
+            # "le" como texto: +Inf no es JSON válido
+            "buckets": {("+Inf" if bound == float("inf") else repr(bound)): n for bound, n in cumulative},
+        }
+
+    @staticmethod
+    def _quantile(cumulative: List[Tuple[float, int]], count: int, maximum: float, q: float) -> Optional[float]:
+        """Cota superior del bucket que contiene el cuantil `q` (el máximo si cae en +Inf)."""
+        if not count:
+            return None
+        target = q * count
+        for bound, running in cumulative:
+            if running >= target:
+                return min(bound, maximum)
+        return maximum
+
+    def samples(self) -> List[Tuple[LabelValues, Any]]:
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._data.items()]
+        return [(key, self._summary(*data)) for key, data in items]
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"La métrica {name} ya existe con otro tipo")
+            return metric
+
+    def counter(self, name: str, description: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, description, labels)
+
+    def gauge(self, name: str, description: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, description, labels)
+
+    def histogram(self, name: str, description: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, description, labels, buckets=buckets)
+
+    def metrics(self) -> List[Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def snapshot(self, prefix: str = "") -> Dict[str, Any]:
+        return {m.name: m.snapshot() for m in self.metrics() if m.name.startswith(prefix)}
+
+
+REGISTRY = MetricsRegistry()
+
+
+# ----------------------------------------------------------------------
+# Formato de texto de Prometheus (versión 0.0.4)
+# ----------------------------------------------------------------------
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str, quote: bool = True) -> str:
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quote else value
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(int(value)) if float(value).is_integer() and abs(value) < 1e15 else repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def render_prometheus(registry: Optional[MetricsRegistry] = None) -> str:
+    """Todas las métricas de `registry` (REGISTRY por defecto) en texto de Prometheus."""
+    lines: List[str] = []
+    for metric in sorted((registry or REGISTRY).metrics(), key=lambda m: m.name):
+        lines.append(f"# HELP {metric.name} {_escape(metric.description, quote=False)}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for key, value in sorted(metric.samples()):
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_format_labels(metric.labels, key)} {_format_value(value)}")
+                continue
+            for le, count in value["buckets"].items():
+                labels = _format_labels(metric.labels, key, [("le", le)])
+                lines.append(f"{metric.name}_bucket{labels} {count}")
+            labels = _format_labels(metric.labels, key)
+            lines.append(f"{metric.name}_sum{labels} {_format_value(value['sum'])}")
+            lines.append(f"{metric.name}_count{labels} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+__all__ = [
+    "Counter", "Gauge", "Histogram", "MetricsRegistry", "REGISTRY", "DEFAULT_BUCKETS",
+    "PROMETHEUS_CONTENT_TYPE", "render_prometheus",
+]
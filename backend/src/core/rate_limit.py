@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+core.rate_limit
+---------------
+Limitación de peticiones con token buckets por IP y por cuenta:
+- RateLimitMiddleware (ASGI): aplica la primera regla cuyo prefijo coincide
+  con la ruta y responde 429 + Retry-After antes de llegar al router, al
+  hash de contraseñas o a la base de datos.
+- Cuenta: en login (`/api/auth/login`, `/api/auth/token`) el correo del
+  cuerpo; en el resto, el `uid` de un Bearer token válido.
+- IP: la del par TCP, salvo que sea un proxy de confianza
+  (RATE_LIMIT_TRUSTED_PROXIES, p.ej. nginx): entonces la primera IP que no
+  sea de confianza leyendo X-Forwarded-For de derecha a izquierda, o
+  X-Real-IP. Las cabeceras de un par que no es de confianza se ignoran
+  (cualquiera podría falsearlas para cambiar de bucket).
+- Backends: MemoryBucketStore (por worker) o RedisBucketStore (compartido,
+  RATE_LIMIT_BACKEND=redis, usa REDIS_URL). Si Redis falla se deja pasar.
+
+Los límites se escriben "capacidad/segundos", p.ej. "5/60" = ráfaga de 5 y
+recarga de 5 tokens por minuto.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import json
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Los cuerpos de login son pequeños; no se lee más para buscar la cuenta
+MAX_LOGIN_BODY = 16 * 1024
+
+
+@dataclass(frozen=True)
+class Limit:
+    capacity: float
+    per_seconds: float
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.per_seconds
+
+    @classmethod
+    def parse(cls, spec: Optional[str]) -> Optional["Limit"]:
+        """'10/60' → Limit(10, 60); vacío o '0' desactiva el límite."""
+        if not spec or spec.strip() in ("0", "off"):
+            return None
+        capacity, _, seconds = spec.partition("/")
+        return cls(float(capacity), float(seconds or 1))
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    prefixes: Tuple[str, ...]
+    per_ip: Optional[Limit] = None
+    per_account: Optional[Limit] = None
+    methods: Optional[Tuple[str, ...]] = None
+    # El identificador de cuenta viene en el cuerpo (login) y no en el token
+    account_from_body: bool = False
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.methods and method not in self.methods:
+            return False
+        return any(path == p or path.startswith(p.rstrip("/") + "/") for p in self.prefixes)
+
+
+# ---------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------
+class MemoryBucketStore:
+    """Buckets en memoria del worker (LRU acotado)."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: Limit) -> float:
+        """Consume un token. Devuelve 0 si se permite o los segundos de espera."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - last) * limit.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / limit.rate
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+# Bucket atómico en Redis: {permitido, espera}
+_REDIS_TAKE = """
+local cap = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local b = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = tonumber(b[1]) or cap
+local ts = tonumber(b[2]) or now
+tokens = math.min(cap, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 't', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(cap / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBucketStore:
+    """Buckets compartidos entre workers en Redis (script Lua atómico)."""
+
+    def __init__(self, client: Any, prefix: str = "ratelimit:"):
+        self._client = client
+        self._prefix = prefix
+        self._script = client.register_script(_REDIS_TAKE)
+
+    def take(self, key: str, limit: Limit) -> float:
+        try:
+            wait = self._script(keys=[self._prefix + key], args=[limit.capacity, limit.rate, time.time()])
+        except Exception as e:
+            logger.warning("Rate limit sin Redis, se permite la petición: %s", e)
+            return 0.0
+        return float(wait)
+
+
+def create_bucket_store(backend: str) -> Any:
+    if backend.lower() == "redis":
+        try:
+            from core.cache import get_redis_client
+
+            return RedisBucketStore(get_redis_client())
+        except ImportError:
+            logger.warning("RATE_LIMIT_BACKEND=redis pero el paquete 'redis' no está instalado; se usa memoria")
+    return MemoryBucketStore()
+
+
+# ---------------------------------------------------------------------
+# Identificación de la cuenta
+# ---------------------------------------------------------------------
+def _account_from_body(body: bytes, content_type: bytes) -> Optional[str]:
+    try:
+        if content_type.startswith(b"application/json"):
+            value = json.loads(body or b"{}").get("correo")
+        elif content_type.startswith(b"application/x-www-form-urlencoded"):
+            value = (parse_qs(body.decode("utf-8")).get("username") or [None])[0]
+        else:
+            return None
+    except (ValueError, UnicodeDecodeError, AttributeError):
+        return None
+    return str(value).strip().lower() if value else None
+
+
+def _account_from_token(authorization: bytes) -> Optional[str]:
+    if not authorization.lower().startswith(b"bearer "):
+        return None
+    from jose import JWTError, jwt
+
+    from core.security import ALGORITHM, SECRET_KEY
+
+    try:
+        claims = jwt.decode(authorization[7:].decode("latin-1"), SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    uid = claims.get("uid")
+    return f"uid:{uid}" if uid is not None else None
+
+
+# ---------------------------------------------------------------------
+# IP del cliente
+# ---------------------------------------------------------------------
+Network = Any  # ipaddress.IPv4Network | ipaddress.IPv6Network
+
+
+def parse_networks(spec: Optional[str]) -> Tuple[Network, ...]:
+    """'127.0.0.1, 172.28.0.0/16' → redes; las entradas inválidas se ignoran con aviso."""
+    networks = []
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(item, strict=False))
+        except ValueError:
+            logger.warning("RATE_LIMIT_TRUSTED_PROXIES: entrada inválida %r", item)
+    return tuple(networks)
+
+
+def _is_trusted(ip: str, trusted: Sequence[Network]) -> bool:
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in trusted)
+
+
+def client_ip(scope: Scope, headers: dict, trusted: Sequence[Network] = ()) -> str:
+    """IP del cliente; las cabeceras de reenvío solo cuentan si el par es un proxy de confianza."""
+    client = scope.get("client")
+    peer = client[0] if client else "unknown"
+    if not trusted or not _is_trusted(peer, trusted):
+        return peer
+
+    forwarded = headers.get(b"x-forwarded-for", b"").decode("latin-1")
+    # nginx añade al final ($proxy_add_x_forwarded_for): lo de la izquierda
+    # lo escribe el cliente y no es fiable
+    for hop in reversed([h.strip() for h in forwarded.split(",") if h.strip()]):
+        if not _is_trusted(hop, trusted):
+            return hop
+    real_ip = headers.get(b"x-real-ip", b"").decode("latin-1").strip()
+    return real_ip or peer
+
+
+# ---------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------
+class RateLimitMiddleware:
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        rules: Sequence[RateLimitRule],
+        store: Any,
+        trusted_proxies: Sequence[Network] = (),
+    ):
+        self.app = app
+        self.rules: List[RateLimitRule] = list(rules)
+        self.store = store
+        self.trusted_proxies = tuple(trusted_proxies)
+
+    def _match(self, method: str, path: str) -> Optional[RateLimitRule]:
+        for rule in self.rules:
+            if rule.matches(method, path):
+                return rule
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rule = self._match(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        ip = client_ip(scope, headers, self.trusted_proxies)
+
+        wait = 0.0
+        if rule.per_ip:
+            wait = self.store.take(f"{rule.name}:ip:{ip}", rule.per_ip)
+
+        if not wait and rule.per_account:
+            if rule.account_from_body:
+                body, receive = await _buffer_body(receive)
+                account = _account_from_body(body, headers.get(b"content-type", b""))
+            else:
+                account = _account_from_token(headers.get(b"authorization", b""))
+            if account:
+                wait = self.store.take(f"{rule.name}:acct:{account}", rule.per_account)
+
+        if wait:
+            retry_after = max(1, math.ceil(wait))
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Demasiadas peticiones, intente de nuevo más tarde"},
+                headers={"Retry-After": str(retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+
+async def _buffer_body(receive: Receive) -> Tuple[bytes, Receive]:
+    """
+    Lee el cuerpo (hasta MAX_LOGIN_BODY) y devuelve un `receive` que lo
+    reproduce para la aplicación, seguido del resto si lo hubiera.
+    """
+    messages: List[Message] = []
+    body = b""
+    more = True
+    while more and len(body) <= MAX_LOGIN_BODY:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        body += message.get("body", b"")
+        more = message.get("more_body", False)
+
+    async def replay() -> Message:
+        if messages:
+            return messages.pop(0)
+        return await receive()
+
+    return body, replay
+
+
+def default_rules(settings: Any) -> List[RateLimitRule]:
+    """Reglas por defecto a partir de settings.RATE_LIMIT_* (la primera que coincide gana)."""
+    return [
+        RateLimitRule(
+            "login",
+            ("/api/auth/login", "/api/auth/token"),
+            per_ip=Limit.parse(settings.RATE_LIMIT_LOGIN_PER_IP),
+            per_account=Limit.parse(settings.RATE_LIMIT_LOGIN_PER_ACCOUNT),
+            methods=("POST",),
+            account_from_body=True,
+        ),
+        RateLimitRule(
+            "refresh",
+            ("/api/auth/refresh",),
+            per_ip=Limit.parse(settings.RATE_LIMIT_REFRESH_PER_IP),
+            methods=("POST",),
+        ),
+        RateLimitRule(
+            "upload",
+            ("/api/import", "/api/ml"),
+            per_ip=Limit.parse(settings.RATE_LIMIT_UPLOAD_PER_IP),
+            per_account=Limit.parse(settings.RATE_LIMIT_UPLOAD_PER_ACCOUNT),
+            methods=("POST",),
+        ),
+        RateLimitRule(
+            "api",
+            ("/api",),
+            per_ip=Limit.parse(settings.RATE_LIMIT_API_PER_IP),
+            per_account=Limit.parse(settings.RATE_LIMIT_API_PER_ACCOUNT),
+        ),
+    ]
+
+
+__all__ = [
+    "Limit",
+    "RateLimitRule",
+    "RateLimitMiddleware",
+    "MemoryBucketStore",
+    "RedisBucketStore",
+    "client_ip",
+    "create_bucket_store",
+    "default_rules",
+    "parse_networks",
+]
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+core.refresh_tokens
+-------------------
+Refresh tokens opacos y rotativos:
+- Se entregan en el login junto al access token; en la BD solo queda su
+  sha256 (tienen 384 bits aleatorios, no necesitan bcrypt).
+- Cada uso en /api/auth/refresh marca el token como usado y emite otro de la
+  misma familia. La familia caduca a los REFRESH_TOKEN_EXPIRE_DAYS del login:
+  rotar no alarga la sesión.
+- Reutilizar un token ya usado o revocado revoca toda su familia (posible robo).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from db.models import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _aware(dt: datetime) -> datetime:
+    # SQLite devuelve fechas sin zona (se guardan en UTC)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _invalid() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token inválido o expirado")
+
+
+def issue_refresh_token(
+    db: Session,
+    user_id: int,
+    familia: Optional[str] = None,
+    expira: Optional[datetime] = None,
+) -> Tuple[str, datetime]:
+    """Crea un refresh token (nueva familia si no se indica) y lo guarda hasheado."""
+    token = secrets.token_urlsafe(48)
+    expira = expira or datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    db.add(RefreshToken(
+        usuario_id=user_id,
+        familia=familia or uuid.uuid4().hex,
+        token_hash=_hash(token),
+        expira=expira,
+    ))
+    db.commit()
+    return token, expira
+
+
+def _revoke_family(db: Session, familia: str) -> None:
+    db.query(RefreshToken).filter(RefreshToken.familia == familia).update(
+        {"revocado": True}, synchronize_session=False
+    )
+    db.commit()
+
+
+def rotate_refresh_token(db: Session, token: str) -> Tuple[int, str, datetime]:
+    """
+    Consume `token` y emite el siguiente de su familia.
+    Devuelve (usuario_id, nuevo_token, expira); 401 si no es válido.
+    """
+    row = db.query(RefreshToken).filter(RefreshToken.token_hash == _hash(token)).first()
+    if not row:
+        raise _invalid()
+
+    now = datetime.now(timezone.utc)
+    if row.revocado and row.usado_en is None:
+        raise _invalid()  # familia ya revocada (logout)
+    if row.usado_en is not None:
+        logger.warning("Reutilización de refresh token (usuario %s, familia %s): familia revocada",
+                       row.usuario_id, row.familia)
+        _revoke_family(db, row.familia)
+        raise _invalid()
+    if _aware(row.expira) <= now:
+        raise _invalid()
+
+    # Marca de uso condicional: de dos peticiones simultáneas solo gana una
+    claimed = db.query(RefreshToken).filter(
+        RefreshToken.id == row.id,
+        RefreshToken.usado_en.is_(None),
+        RefreshToken.revocado.is_(False),
+    ).update({"usado_en": now}, synchronize_session=False)
+    if not claimed:
+        _revoke_family(db, row.familia)
+        raise _invalid()
+
+    new_token, expira = issue_refresh_token(db, row.usuario_id, familia=row.familia, expira=_aware(row.expira))
+    return row.usuario_id, new_token, expira
+
+
+def revoke_refresh_token(db: Session, token: str) -> None:
+    """Revoca la familia del token (logout de ese dispositivo)."""
+    row = db.query(RefreshToken).filter(RefreshToken.token_hash == _hash(token)).first()
+    if row:
+        _revoke_family(db, row.familia)
+
+
+def revoke_user_refresh_tokens(db: Session, user_id: int) -> None:
+    """Revoca todos los refresh tokens del usuario (todas sus sesiones)."""
+    db.query(RefreshToken).filter(
+        RefreshToken.usuario_id == user_id,
+        RefreshToken.revocado.is_(False),
+    ).update({"revocado": True}, synchronize_session=False)
+    db.commit()
+
+
+__all__ = [
+    "issue_refresh_token",
+    "rotate_refresh_token",
+    "revoke_refresh_token",
+    "revoke_user_refresh_tokens",
+]
@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+"""
+core.request_profiler
+---------------------
+Perfilado por muestreo de peticiones concretas, apto para producción:
+- Qué se perfila: una fracción aleatoria (PROFILER_SAMPLE_RATE), las
+  peticiones con la cabecera `X-Profile` firmada por un admin (HMAC con
+  SECRET_KEY y caducidad, ver `sign_profile_token`) y, automáticamente, las
+  que siguen en curso pasados PROFILER_SLOW_THRESHOLD_MS (se perfila desde
+  ese momento hasta el final: la parte lenta). El plazo lo vigila el hilo
+  muestreador, no el event loop: también se capturan los endpoints async
+  que lo bloquean.
+- Cómo: un hilo muestreador lee `sys._current_frames()` cada
+  PROFILER_INTERVAL_MS mientras haya peticiones perfiladas; si solo hay
+  peticiones vigiladas despierta cada pocas décimas de segundo, y sin
+  peticiones en curso no hay hilo. Las muestras se atribuyen a la petición:
+  * hilo del event loop: cuando la tarea asyncio en curso es la suya;
+  * hilos del threadpool (endpoints síncronos): cuando el `Context` que
+    ejecuta el worker de anyio contiene el contextvar de la petición.
+- Los perfiles terminados se guardan en un buffer circular por worker
+  (PROFILER_MAX_PROFILES) y se exportan como JSON de speedscope
+  (https://www.speedscope.app) o árbol de flamegraph (d3-flame-graph); ver
+  los endpoints /api/admin/profiles.
+- Memoria: cada muestra es una tupla de índices de frame (~0,5 KB con pilas
+  de unas 50 llamadas) y un perfil se trunca en PROFILER_MAX_SAMPLES. Con
+  los valores por defecto (10 perfiles × 2000 muestras) el buffer ocupa como
+  mucho ~10 MB por worker, más ~1 MB por cada petición que se esté
+  perfilando en ese momento.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import hashlib
+import hmac
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.config import settings
+from core.http_metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+FrameKey = Tuple[str, str, int]  # (función, archivo, línea de definición)
+
+
+# ----------------------------------------------------------------------
+# Cabecera firmada
+# ----------------------------------------------------------------------
+def _signature(expires: int) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), f"profile:{expires}".encode(), hashlib.sha256).hexdigest()
+
+
+def sign_profile_token(ttl_seconds: int = 3600) -> Tuple[str, int]:
+    """Valor para la cabecera X-Profile ("<caducidad>.<firma>") y su caducidad (epoch)."""
+    expires = int(time.time()) + ttl_seconds
+    return f"{expires}.{_signature(expires)}", expires
+
+
+def verify_profile_token(token: str) -> bool:
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(int(expires)))
+
+
+# ----------------------------------------------------------------------
+# Perfiles
+# ----------------------------------------------------------------------
+@dataclass
+class Profile:
+    id: str
+    method: str
+    path: str
+    trigger: str  # "sampled" | "header" | "slow"
+    started_at: datetime
+    interval: float
+    max_samples: int
+    route: Optional[str] = None
+    status: Optional[int] = None
+    duration_ms: Optional[float] = None
+    frames: Dict[FrameKey, int] = field(default_factory=dict)
+    samples: List[Tuple[int, ...]] = field(default_factory=list)
+    weights: List[float] = field(default_factory=list)
+    truncated: bool = False
+
+    def add(self, stack: List[FrameKey], weight: float) -> None:
+        if len(self.samples) >= self.max_samples:
+            self.truncated = True
+            return
+        frames = self.frames
+        self.samples.append(tuple(frames.setdefault(key, len(frames)) for key in stack))
+        self.weights.append(weight)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "trigger": self.trigger,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": self.duration_ms,
+            "samples": len(self.samples),
+            "sampled_ms": round(sum(self.weights) * 1000, 1),
+            "truncated": self.truncated,
+        }
+
+    def speedscope(self) -> Dict[str, Any]:
+        """Formato "sampled" de speedscope (pilas de raíz a hoja)."""
+        frames = [{"name": name, "file": file, "line": line} for (name, file, line) in self.frames]
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.method} {self.path} ({self.trigger})",
+            "exporter": "nutritional-api request_profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.method} {self.route or self.path}",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(self.weights),
+                "samples": [list(s) for s in self.samples],
+                "weights": self.weights,
+            }],
+        }
+
+    def flamegraph(self) -> Dict[str, Any]:
+        """Árbol {name, value, children} (d3-flame-graph); value en milisegundos."""
+        names = [f"{name} ({file}:{line})" for (name, file, line) in self.frames]
+        root: Dict[str, Any] = {"name": f"{self.method} {self.path}", "value": 0.0, "children": {}}
+        for stack, weight in zip(self.samples, self.weights):
+            ms = weight * 1000
+            node = root
+            node["value"] += ms
+            for index in stack:
+                node = node["children"].setdefault(names[index], {"name": names[index], "value": 0.0, "children": {}})
+                node["value"] += ms
+
+        def finish(node: Dict[str, Any]) -> Dict[str, Any]:
+            return {
+                "name": node["name"],
+                "value": round(node["value"], 3),
+                "children": [finish(child) for child in node["children"].values()],
+            }
+
+        return finish(root)
+
+
+class ProfileStore:
+    """Buffer circular de perfiles terminados (por worker)."""
+
+    def __init__(self, max_profiles: int):
+        self._profiles: "deque[Profile]" = deque(maxlen=max(1, max_profiles))
+        self._lock = threading.Lock()
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.append(profile)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [p.summary() for p in reversed(self._profiles)]
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return next((p for p in self._profiles if p.id == profile_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._profiles.clear()
+
+
+# ----------------------------------------------------------------------
+# Muestreador
+# ----------------------------------------------------------------------
+class _RequestSlot:
+    """Se fija en el contextvar al empezar la petición; `profile` se rellena si se perfila."""
+
+    __slots__ = ("method", "path", "task", "loop", "loop_thread", "deadline", "profile")
+
+    def __init__(self, method: str, path: str, deadline: Optional[float]) -> None:
+        self.method = method
+        self.path = path
+        self.task = asyncio.current_task()
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.deadline = deadline  # perf_counter a partir del cual se perfila como lenta
+        self.profile: Optional[Profile] = None
+
+
+_slot_var: contextvars.ContextVar[Optional[_RequestSlot]] = contextvars.ContextVar("profiled_request", default=None)
+
+
+def _frame_key(frame: Any) -> FrameKey:
+    code = frame.f_code
+    return (getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno)
+
+
+def _stack(frame: Any) -> List[Any]:
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()  # raíz -> hoja
+    return frames
+
+
+def _worker_context(frames: List[Any]) -> Tuple[Optional[contextvars.Context], int]:
+    """
+    Context que está ejecutando un worker de anyio (`context.run(func, *args)`)
+    y el índice del primer frame de `func`. Sin trabajo en curso el worker
+    está esperando en queue.get y no cuenta.
+    """
+    for i, frame in enumerate(frames[:-1]):
+        if frame.f_code.co_name != "run":
+            continue
+        context = frame.f_locals.get("context")
+        if isinstance(context, contextvars.Context):
+            if frames[i + 1].f_code.co_filename.endswith("queue.py"):
+                return None, 0
+            return context, i + 1
+    return None, 0
+
+
+class Sampler:
+    """
+    Hilo de muestreo compartido. Vive mientras haya peticiones en curso:
+    muestrea las perfiladas y arranca el perfil de las que pasan su plazo.
+    """
+
+    def __init__(self, interval: float, max_samples: int, watch_interval: float = 0.1):
+        self.interval = interval
+        self.max_samples = max_samples
+        self.watch_interval = max(interval, watch_interval)
+        self._slots: Dict[int, _RequestSlot] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def attach(self, slot: _RequestSlot) -> None:
+        with self._lock:
+            self._slots[id(slot)] = slot
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def detach(self, slot: _RequestSlot) -> None:
+        with self._lock:
+            self._slots.pop(id(slot), None)
+
+    def start_profile(self, slot: _RequestSlot, trigger: str) -> Profile:
+        slot.profile = Profile(
+            id=uuid.uuid4().hex[:12],
+            method=slot.method,
+            path=slot.path,
+            trigger=trigger,
+            started_at=datetime.now(timezone.utc),
+            interval=self.interval,
+            max_samples=self.max_samples,
+        )
+        return slot.profile
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while True:
+            with self._lock:
+                slots = list(self._slots.values())
+                if not slots:
+                    self._thread = None
+                    return
+            now = time.perf_counter()
+            profiled = []
+            for slot in slots:
+                if slot.profile is None and slot.deadline is not None and now >= slot.deadline:
+                    self.start_profile(slot, "slow")
+                if slot.profile is not None:
+                    profiled.append(slot)
+            if profiled:
+                self._sample(profiled, now - last)
+            last = now
+            time.sleep(self.interval if profiled else self.watch_interval)
+
+    def _sample(self, slots: List[_RequestSlot], weight: float) -> None:
+        me = threading.get_ident()
+        current = sys._current_frames()
+        by_loop: Dict[int, List[_RequestSlot]] = {}
+        for slot in slots:
+            by_loop.setdefault(slot.loop_thread, []).append(slot)
+
+        for thread_id, frame in current.items():
+            if thread_id == me:
+                continue
+            if thread_id in by_loop:
+                for slot in by_loop[thread_id]:
+                    if asyncio.current_task(slot.loop) is slot.task:
+                        slot.profile.add([_frame_key(f) for f in _stack(frame)], weight)
+                continue
+            frames = _stack(frame)
+            context, start = _worker_context(frames)
+            if context is None:
+                continue
+            slot = context.get(_slot_var)
+            if slot is not None and slot.profile is not None and id(slot) in self._slots:
+                stack = [("[threadpool]", "", 0)] + [_frame_key(f) for f in frames[start:]]
+                slot.profile.add(stack, weight)
+
+
+# ----------------------------------------------------------------------
+# Middleware
+# ----------------------------------------------------------------------
+class RequestProfilerMiddleware:
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: "ProfileStore",
+        sample_rate: float = 0.0,
+        slow_threshold_ms: float = 2000.0,
+        interval_ms: float = 5.0,
+        max_samples: int = 2000,
+        excluded_paths: Collection[str] = ("/metrics", "/health", "/healthz"),
+        excluded_prefixes: Collection[str] = ("/api/admin/profiles",),
+    ):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold_ms / 1000 if slow_threshold_ms > 0 else None
+        self.interval = interval_ms / 1000
+        self.max_samples = max_samples
+        self.excluded_paths = frozenset(excluded_paths)
+        self.excluded_prefixes = tuple(excluded_prefixes)
+        self.sampler = Sampler(self.interval, max_samples)
+
+    def _trigger(self, scope: Scope) -> Optional[str]:
+        token = Headers(scope=scope).get(PROFILE_HEADER)
+        if token and verify_profile_token(token):
+            return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["path"] in self.excluded_paths
+            or scope["path"].startswith(self.excluded_prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        trigger = self._trigger(scope)
+        if trigger is None and self.slow_threshold is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        deadline = start + self.slow_threshold if self.slow_threshold is not None else None
+        slot = _RequestSlot(scope["method"], scope["path"], deadline)
+        if trigger:
+            self.sampler.start_profile(slot, trigger)
+        token = _slot_var.set(slot)
+        self.sampler.attach(slot)
+        status: Optional[int] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if slot.profile is not None:
+                    MutableHeaders(scope=message)["X-Profile-Id"] = slot.profile.id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.sampler.detach(slot)
+            _slot_var.reset(token)
+            profile = slot.profile
+            if profile is not None:
+                profile.route = route_template(scope)
+                profile.status = status
+                profile.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+                self.store.add(profile)
+                if profile.trigger == "slow":
+                    logger.info(
+                        "Petición lenta perfilada: %s %s %.0f ms (perfil %s)",
+                        profile.method, profile.path, profile.duration_ms, profile.id,
+                    )
+
+
+# Un buffer por worker, compartido por el middleware y los endpoints de admin
+PROFILES = ProfileStore(getattr(settings, "PROFILER_MAX_PROFILES", 10))
+
+
+__all__ = [
+    "PROFILES", "PROFILE_HEADER", "Profile", "ProfileStore", "RequestProfilerMiddleware",
+    "sign_profile_token", "verify_profile_token",
+]
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+core.response_cache
+-------------------
+Caché de respuestas GET para los endpoints que consultan los paneles cada
+pocos segundos, sobre los backends de core.cache (memoria o Redis):
+- Clave: método + plantilla de la ruta + query string ordenada + alcance
+  de autorización de quien llama (`scope`: "public" o, en endpoints con
+  permisos por usuario, su id y rol). Dos usuarios con permisos distintos
+  nunca comparten entrada.
+- Invalidación por etiquetas versionadas: cada respuesta se guarda con la
+  versión de sus etiquetas ("evaluation:12", "child:7", "users"...). Los
+  handlers de escritura llaman a `invalidate(...)` tras el commit, que
+  cambia la versión: las entradas antiguas dejan de casar sin tener que
+  buscarlas. Las versiones se leen antes de consultar la base de datos, así
+  que una lectura que se cruce con una escritura no deja datos viejos con
+  la versión nueva.
+- Solo se guardan respuestas 2xx construidas por el handler; los errores
+  (HTTPException) pasan de largo.
+- GET condicional (core.etags): cada entrada guarda su ETag. Con un acierto
+  en caché, un If-None-Match que casa se contesta 304 sin tocar la base de
+  datos; sin acierto y solo si la petición trae If-None-Match, el `etag()`
+  del handler (consulta de versión) permite contestar 304 sin cargar ni
+  serializar el cuerpo.
+
+Con CACHE_BACKEND=memory cada worker tiene su caché y solo ve sus propias
+invalidaciones (las de otros workers tardan como mucho
+RESPONSE_CACHE_TTL_SECONDS); con varios workers conviene CACHE_BACKEND=redis.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import uuid
+from typing import Any, Callable, List, Optional, Sequence
+from urllib.parse import urlencode
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from core.cache import CacheBackend, create_cache
+from core.config import settings
+from core.etags import conditional, etag_matches, etag_requested, not_modified, tag_response
+from core.fast_json import FastJSONResponse
+
+
+def response_cache_enabled() -> bool:
+    return getattr(settings, "RESPONSE_CACHE_ENABLED", True)
+
+
+def user_scope(user: Any) -> str:
+    """Alcance de autorización de un usuario autenticado (id + rol)."""
+    rol = getattr(user, "rol_nombre", None) or getattr(user, "rol", None)
+    return f"user:{user.id_usuario}:{rol}"
+
+
+class ResponseCache:
+
+    def __init__(self, entries: CacheBackend, tags: CacheBackend):
+        self.entries = entries
+        self.tags = tags
+        # Una versión de etiqueta debe sobrevivir a las entradas que la usan
+        self.tag_ttl = max(entries.ttl * 20, 3600)
+
+    # -- etiquetas -------------------------------------------------------
+    def _versions(self, tags: Sequence[str]) -> List[str]:
+        versions = []
+        for tag in tags:
+            version = self.tags.get(tag)
+            if version is None:
+                # Etiqueta desconocida o expulsada: versión nueva, así ninguna
+                # entrada anterior puede darse por válida
+                version = self._bump(tag)
+            versions.append(version)
+        return versions
+
+    def _bump(self, tag: str) -> str:
+        version = uuid.uuid4().hex[:16]
+        self.tags.set(tag, version, ttl=self.tag_ttl)
+        return version
+
+    def invalidate(self, *tags: str) -> None:
+        """Llamar tras el commit de una escritura que afecte a esas etiquetas."""
+        if not response_cache_enabled():
+            return
+        for tag in tags:
+            self._bump(tag)
+
+    # -- entradas --------------------------------------------------------
+    @staticmethod
+    def key(request: Request, scope: str) -> str:
+        route = request.scope.get("route")
+        template = getattr(route, "path_format", None) or request.url.path
+        query = urlencode(sorted(request.query_params.multi_items()))
+        raw = f"{request.method} {template}?{query}|{scope}"
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=20).hexdigest()
+
+    def cached(
+        self,
+        request: Request,
+        tags: Sequence[str],
+        build: Callable[[], Any],
+        scope: str = "public",
+        status_code: int = 200,
+        etag: Optional[Callable[[], Optional[str]]] = None,
+    ) -> Response:
+        """
+        Respuesta en caché para `request` o, si no la hay, la que produce
+        `build()` (contenido serializable a JSON o una Response), que se guarda.
+        `etag()` da la versión de los datos sin cargarlos y solo se llama en
+        peticiones condicionales; el ETag guardado es el de la respuesta de
+        `build()` (ver etags.tag_response).
+        """
+        if not response_cache_enabled():
+            return conditional(request, build, etag, status_code)
+
+        key = self.key(request, scope)
+        versions = self._versions(tags)
+        hit = self.entries.get(key)
+        if hit is not None and hit["t"] == versions:
+            # .get: entradas guardadas en Redis antes de que existiera "e"
+            if etag_matches(request, hit.get("e")):
+                return not_modified(hit["e"])
+            response = Response(hit["b"], status_code=hit["s"], media_type="application/json",
+                                headers={"X-Cache": "HIT"})
+            tag_response(response, hit.get("e"))
+            return response
+
+        version = etag() if etag is not None and etag_requested(request) else None
+        if version is not None and etag_matches(request, version):
+            return not_modified(version)
+
+        response = self._to_response(build(), status_code)
+        if 200 <= response.status_code < 300:
+            version = tag_response(response, version)
+            self.entries.set(key, {
+                "t": versions, "s": response.status_code, "e": version, "b": response.body.decode("utf-8"),
+            })
+            if etag_matches(request, version):
+                return not_modified(version)
+        response.headers["X-Cache"] = "MISS"
+        return response
+
+    @staticmethod
+    def _to_response(content: Any, status_code: int) -> Response:
+        if isinstance(content, Response):
+            return content
+        return FastJSONResponse(content, status_code=status_code)
+
+    def stats(self) -> dict:
+        return {"entries": self.entries.stats(), "tags": self.tags.stats()}
+
+
+RESPONSES = ResponseCache(
+    create_cache(
+        "responses",
+        ttl=getattr(settings, "RESPONSE_CACHE_TTL_SECONDS", 30),
+        max_entries=getattr(settings, "RESPONSE_CACHE_MAX_ENTRIES", 20000),
+    ),
+    create_cache(
+        "response-tags",
+        ttl=getattr(settings, "RESPONSE_CACHE_TTL_SECONDS", 30),
+        max_entries=getattr(settings, "RESPONSE_CACHE_MAX_ENTRIES", 20000),
+    ),
+)
+
+
+__all__ = ["RESPONSES", "ResponseCache", "response_cache_enabled", "user_scope"]
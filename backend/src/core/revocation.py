@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+core.revocation
+---------------
+Lista de revocación de JWT, en memoria y sincronizada desde la base de datos:
+- tokens_revocados: un `jti` concreto (logout).
+- revocaciones_usuario: todos los tokens de un usuario con `iat` anterior a
+  `emitidos_antes` (cambio de rol, borrado, "cerrar todas las sesiones").
+
+Solo se guardan entradas que aún pueden afectar a tokens vigentes, así que la
+lista es pequeña. Cada worker recarga la lista completa cada
+TOKEN_REVOCATION_SYNC_SECONDS; las revocaciones hechas en el propio worker
+se aplican al instante.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Mapping, Optional
+
+from sqlalchemy.orm import Session
+
+from db.models import RevocacionUsuario, TokenRevocado
+
+logger = logging.getLogger(__name__)
+
+
+def _epoch(dt: datetime) -> float:
+    # SQLite devuelve fechas sin zona: se guardan siempre en UTC
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class RevocationList:
+
+    def __init__(self, sync_seconds: float, max_token_age_seconds: float):
+        self.sync_seconds = sync_seconds
+        self.max_token_age_seconds = max_token_age_seconds
+        self._jtis: Dict[str, float] = {}      # jti -> exp (epoch)
+        self._cutoffs: Dict[int, float] = {}   # usuario -> emitidos_antes (epoch)
+        self._synced_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    # ---------- Consulta ----------
+    def is_revoked(self, claims: Mapping[str, Any]) -> bool:
+        self._maybe_sync()
+        jti = claims.get("jti")
+        if jti and jti in self._jtis:
+            return True
+        uid = claims.get("uid")
+        if uid is None:
+            return False
+        cutoff = self._cutoffs.get(int(uid))
+        if cutoff is None:
+            return False
+        iat = claims.get("iat")
+        return iat is None or float(iat) < cutoff
+
+    # ---------- Revocación ----------
+    def revoke_token(self, db: Session, jti: str, user_id: Optional[int], exp: float) -> None:
+        db.merge(TokenRevocado(
+            jti=jti,
+            usuario_id=user_id,
+            expira=datetime.fromtimestamp(exp, timezone.utc),
+        ))
+        db.commit()
+        with self._lock:
+            self._jtis[jti] = exp
+
+    def revoke_user(self, db: Session, user_id: int) -> None:
+        now = time.time()
+        db.merge(RevocacionUsuario(
+            usuario_id=user_id,
+            emitidos_antes=datetime.fromtimestamp(now, timezone.utc),
+            fecha_revocado=datetime.now(timezone.utc),
+        ))
+        db.commit()
+        with self._lock:
+            self._cutoffs[user_id] = now
+
+    # ---------- Sincronización ----------
+    def _maybe_sync(self) -> None:
+        if self._synced_at is not None and time.monotonic() - self._synced_at < self.sync_seconds:
+            return
+        # Un solo hilo sincroniza; el resto sigue con la lista actual
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            from db.session import SessionLocal
+
+            db = SessionLocal()
+            try:
+                self.sync(db)
+            finally:
+                db.close()
+        except Exception as e:
+            logger.warning("No se pudo sincronizar la lista de revocación: %s", e)
+        finally:
+            # También tras un fallo, para no consultar la BD en cada petición
+            self._synced_at = time.monotonic()
+            self._sync_lock.release()
+
+    def sync(self, db: Session) -> None:
+        """Recarga las revocaciones vigentes desde la base de datos."""
+        now = datetime.now(timezone.utc)
+        oldest = now - timedelta(seconds=self.max_token_age_seconds)
+        jtis = {
+            jti: _epoch(expira)
+            for jti, expira in db.query(TokenRevocado.jti, TokenRevocado.expira)
+            .filter(TokenRevocado.expira > now)
+        }
+        cutoffs = {
+            uid: _epoch(antes)
+            for uid, antes in db.query(RevocacionUsuario.usuario_id, RevocacionUsuario.emitidos_antes)
+            .filter(RevocacionUsuario.emitidos_antes > oldest)
+        }
+        # Unión con lo local: una revocación hecha durante la consulta no se
+        # pierde (las revocaciones nunca se deshacen, solo caducan)
+        now_ts, oldest_ts = now.timestamp(), oldest.timestamp()
+        with self._lock:
+            for jti, exp in self._jtis.items():
+                if exp > now_ts:
+                    jtis.setdefault(jti, exp)
+            for uid, antes in self._cutoffs.items():
+                if antes > oldest_ts:
+                    cutoffs[uid] = max(antes, cutoffs.get(uid, 0.0))
+            self._jtis = jtis
+            self._cutoffs = cutoffs
+
+    def stats(self) -> Dict[str, Any]:
+        return {"revoked_tokens": len(self._jtis), "revoked_users": len(self._cutoffs)}
+
+
+__all__ = ["RevocationList"]
@@ -4,25 +4,37 @@ core.security
 --------------
 Utilidades de seguridad compartidas:
 - OAuth2PasswordBearer apuntando a /api/auth/token
-- Normalización/hash/verificación de contraseñas (bcrypt)
-- Decodificación de JWT y obtención de usuario actual
-- Dependencias para exigir roles (admin, nutricionista, cuidador)
+- Normalización/hash/verificación de contraseñas (bcrypt), ejecutadas en un
+  executor acotado (core.executors); si está saturado se responde 503
+- Emisión de JWT con claims de rol y sedes (`role`, `sedes`) y `jti`
+- Decodificación de JWT contra la lista de revocación (core.revocation)
+- Usuario actual (UserSnapshot en caché TTL+LRU por `uid`, ver core.cache;
+  se invalida al editar/borrar usuarios)
+- Dependencias para exigir roles (admin, nutricionista, cuidador); se
+  resuelven solo con los claims, sin consultar la base de datos
 """
 
 from __future__ import annotations
 
 import os
-from datetime import datetime, timedelta
-from typing import Optional, Callable, Iterable
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
+from core.cache import create_cache
+from core.config import settings
+from core.executors import ExecutorSaturated, get_password_executor
+from core.revocation import RevocationList
 from db.session import get_db
-from db.models import Usuario
+from db.models import Infante, Seguimiento, Usuario
 
 # ---------------------------------------------------------------------
 # Config
@@ -30,11 +42,20 @@ from db.models import Usuario
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+BCRYPT_ROUNDS = settings.BCRYPT_ROUNDS
 
 # Debe coincidir con el endpoint real del token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min = max = default: cualquier hash con otro coste "needs_update" y se
+# rehashea en el siguiente login correcto.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 
 # ---------------------------------------------------------------------
@@ -50,43 +71,201 @@ def _bcrypt_normalize(password: str) -> str:
     return pw_bytes.decode("utf-8", "ignore")
 
 
+def _run_hashing(fn: Callable[..., Any], *args: Any) -> Any:
+    """Ejecuta bcrypt en el executor acotado; 503 + Retry-After si está lleno."""
+    try:
+        return get_password_executor().run(fn, *args)
+    except ExecutorSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servicio de autenticación saturado, intente de nuevo en unos segundos",
+            headers={"Retry-After": "1"},
+        )
+
+
 def hash_password(password: str) -> str:
-    return pwd_context.hash(_bcrypt_normalize(password))
+    return _run_hashing(pwd_context.hash, _bcrypt_normalize(password))
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(_bcrypt_normalize(plain_password), hashed_password)
+    return _run_hashing(pwd_context.verify, _bcrypt_normalize(plain_password), hashed_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica y, si el hash usa un coste distinto de BCRYPT_ROUNDS, devuelve
+    también el nuevo hash para guardarlo: (valida, nuevo_hash | None).
+    """
+    return _run_hashing(pwd_context.verify_and_update, _bcrypt_normalize(plain_password), hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
-    now = datetime.utcnow()
-    expire = now + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"iat": now, "exp": expire})
+    now = time.time()
+    expire = now + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)).total_seconds()
+    # `iat` con decimales: la revocación por usuario compara contra un instante
+    to_encode.update({"iat": now, "exp": int(expire), "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def _sede_scopes(db: Session, user: Usuario, role: str) -> list:
+    """
+    Sedes a las que el token da acceso. No hay tabla usuario–sede: admin ve
+    todas ("*") y el resto las sedes de los infantes de sus seguimientos.
+    """
+    if role == "admin":
+        return ["*"]
+    rows = (
+        db.query(Infante.sede_id)
+        .join(Seguimiento, Seguimiento.infante_id == Infante.id_infante)
+        .filter(Seguimiento.encargado_id == user.id_usuario, Infante.sede_id.isnot(None))
+        .distinct()
+        .all()
+    )
+    return sorted(r[0] for r in rows)
+
+
+def build_access_claims(db: Session, user: Usuario) -> Dict[str, Any]:
+    """Claims firmados en el access token: identidad, rol y sedes."""
+    role = ((user.rol.nombre if user.rol else "") or "").lower()
+    return {
+        "sub": user.correo,
+        "uid": user.id_usuario,
+        "role": role,
+        "sedes": _sede_scopes(db, user, role),
+    }
+
+
+# ---------------------------------------------------------------------
+# Revocación (logout, cambio de rol, borrado de usuario)
+# ---------------------------------------------------------------------
+revocation_list = RevocationList(
+    sync_seconds=settings.TOKEN_REVOCATION_SYNC_SECONDS,
+    max_token_age_seconds=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+
+def revoke_token(db: Session, claims: Dict[str, Any]) -> None:
+    """Revoca un token concreto (su `jti`)."""
+    if claims.get("jti"):
+        revocation_list.revoke_token(db, claims["jti"], claims.get("uid"), float(claims["exp"]))
+
+
+def revoke_user_tokens(db: Session, user_id: int) -> None:
+    """Revoca todos los tokens emitidos hasta ahora para el usuario."""
+    revocation_list.revoke_user(db, user_id)
+    invalidate_user(user_id)
+
+
+# ---------------------------------------------------------------------
+# Usuario autenticado (snapshot en caché)
+# ---------------------------------------------------------------------
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Datos del usuario autenticado que necesitan las dependencias y /me."""
+    id_usuario: int
+    nombre: str
+    correo: str
+    telefono: str
+    rol_id: Optional[int] = None
+    rol_nombre: Optional[str] = None
+
+    @classmethod
+    def from_model(cls, user: Usuario) -> "UserSnapshot":
+        return cls(
+            id_usuario=user.id_usuario,
+            nombre=user.nombre,
+            correo=user.correo,
+            telefono=user.telefono,
+            rol_id=user.rol_id,
+            rol_nombre=user.rol.nombre if user.rol else None,
+        )
+
+
+_user_cache = create_cache(
+    "users",
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    max_entries=settings.USER_CACHE_MAX_ENTRIES,
+)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Descarta el snapshot en caché (llamar tras editar, borrar o cambiar contraseña)."""
+    _user_cache.delete(str(user_id))
+
+
+def user_cache_stats() -> dict:
+    return _user_cache.stats()
+
+
+def _load_snapshot(db: Session, user_id: Optional[int], correo: str) -> Optional[UserSnapshot]:
+    """Snapshot desde la caché o, si no está, con una sola consulta (usuario + rol)."""
+    if user_id is not None:
+        cached = _user_cache.get(str(user_id))
+        if cached is not None:
+            return UserSnapshot(**cached)
+
+    q = db.query(Usuario).options(joinedload(Usuario.rol))
+    # Tokens antiguos sin `uid`: se busca por correo
+    user = q.filter(Usuario.id_usuario == user_id).first() if user_id is not None \
+        else q.filter(Usuario.correo == correo).first()
+    if not user:
+        return None
+    snapshot = UserSnapshot.from_model(user)
+    _user_cache.set(str(snapshot.id_usuario), asdict(snapshot))
+    return snapshot
+
+
 # ---------------------------------------------------------------------
-# JWT → usuario actual
+# JWT → claims / usuario actual
 # ---------------------------------------------------------------------
-def get_current_user(db: Session, token: str) -> Usuario:
-    """Decodifica el JWT y retorna el Usuario; si falla, 401."""
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No autenticado o token inválido",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """Valida firma, expiración y revocación; devuelve los claims o 401."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        correo: str = payload.get("sub")  # email guardado en el token
-        if correo is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        if payload.get("sub") is None:
+            raise _credentials_exception()
+        if payload.get("uid") is not None:
+            payload["uid"] = int(payload["uid"])
+    except (JWTError, TypeError, ValueError):
+        raise _credentials_exception()
+    if revocation_list.is_revoked(payload):
+        raise _credentials_exception()
+    return payload
 
-    user = db.query(Usuario).filter(Usuario.correo == correo).first()
-    if not user:
-        raise credentials_exception
+
+def token_claims_dep(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+    return decode_token(token)
+
+
+@dataclass(frozen=True)
+class TokenPrincipal:
+    """Identidad autorizada solo con los claims del token (sin BD)."""
+    id_usuario: int
+    correo: str
+    rol_nombre: str
+    sedes: Tuple[Any, ...] = ()
+
+    def can_access_sede(self, sede_id: int) -> bool:
+        return "*" in self.sedes or sede_id in self.sedes
+
+
+def get_current_user(db: Session, token: str) -> UserSnapshot:
+    """Decodifica el JWT y retorna el UserSnapshot; si falla, 401."""
+    payload = decode_token(token)
+    correo: str = payload["sub"]  # email guardado en el token
+    user = _load_snapshot(db, payload.get("uid"), correo)
+    # Si el correo cambió, los tokens emitidos con el anterior dejan de valer
+    if not user or user.correo != correo:
+        raise _credentials_exception()
     return user
 
 
@@ -94,26 +273,60 @@ def get_current_user(db: Session, token: str) -> Usuario:
 def current_user_dep(
     db: Session = Depends(get_db),
     token: str = Depends(oauth2_scheme),
-) -> Usuario:
+) -> UserSnapshot:
     return get_current_user(db, token)
 
 
-def is_admin(user: Usuario) -> bool:
-    return bool(user.rol and (user.rol.nombre or "").lower() == "admin")
+def principal_dep(
+    claims: Dict[str, Any] = Depends(token_claims_dep),
+    db: Session = Depends(get_db),
+) -> TokenPrincipal:
+    """
+    Principal a partir de los claims. Los tokens emitidos antes de incluir
+    `role` se resuelven con el snapshot del usuario (caché/BD).
+    """
+    if "role" in claims and claims.get("uid") is not None:
+        return TokenPrincipal(
+            id_usuario=claims["uid"],
+            correo=claims["sub"],
+            rol_nombre=claims["role"],
+            sedes=tuple(claims.get("sedes") or ()),
+        )
+    user = _load_snapshot(db, claims.get("uid"), claims["sub"])
+    if not user or user.correo != claims["sub"]:
+        raise _credentials_exception()
+    role = (user.rol_nombre or "").lower()
+    return TokenPrincipal(
+        id_usuario=user.id_usuario,
+        correo=user.correo,
+        rol_nombre=role,
+        sedes=("*",) if role == "admin" else (),
+    )
+
+
+def _role_name(user: Any) -> str:
+    """Nombre del rol de un UserSnapshot/TokenPrincipal o de un Usuario del ORM."""
+    if isinstance(user, (UserSnapshot, TokenPrincipal)):
+        return (user.rol_nombre or "").lower()
+    return ((user.rol.nombre if user.rol else "") or "").lower()
+
+
+def is_admin(user: Any) -> bool:
+    return _role_name(user) == "admin"
 
 
-def require_roles(*allowed: Iterable[str]) -> Callable[[Usuario], Usuario]:
+def require_roles(*allowed: Iterable[str]) -> Callable[[TokenPrincipal], TokenPrincipal]:
     """
     Devuelve una dependencia que exige que el usuario tenga uno
     de los roles permitidos. Si no se especifican roles, solo verifica autenticación.
+    Autoriza con los claims del token: un cambio de rol revoca los tokens previos.
     """
     allowed_set = {str(r).lower() for r in allowed} if allowed else set()
 
-    def _dep(user: Usuario = Depends(current_user_dep)) -> Usuario:
+    def _dep(user: TokenPrincipal = Depends(principal_dep)) -> TokenPrincipal:
         if not allowed_set:
             return user
-        role_name = (user.rol.nombre if user.rol else "") or ""
-        if role_name.lower() not in allowed_set:
+        if _role_name(user) not in allowed_set:
             raise HTTPException(status_code=403, detail="Operación no permitida (rol insuficiente)")
         return user
 
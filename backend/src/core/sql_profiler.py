@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+core.sql_profiler
+-----------------
+Perfilado de SQL por petición (SQL_PROFILER_ENABLED=true, pensado para
+desarrollo, tests y staging):
+- Hooks `before_cursor_execute` / `after_cursor_execute` en todos los
+  engines: cuentan consultas y tiempo de BD de la petición en curso
+  (contextvar; llega también a los endpoints síncronos del threadpool).
+- Agrupa por "forma" de la sentencia (parámetros ya van como placeholders;
+  las listas IN se colapsan). Una forma repetida SQL_PROFILER_N1_THRESHOLD
+  veces o más se marca como sospechosa de N+1 y se avisa en el log.
+- SQLProfilerMiddleware añade `Server-Timing: db;dur=..;desc="N queries",
+  app;dur=..` a la respuesta y deja un resumen en el log (DEBUG).
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|:\w+|\$\d+)\s*,?)+\)", re.IGNORECASE)
+_POSTCOMPILE = re.compile(r"\(\s*__\[POSTCOMPILE_\w+\]\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normaliza una sentencia para agrupar ejecuciones equivalentes."""
+    shape = _POSTCOMPILE.sub("(...)", statement)
+    shape = _IN_LIST.sub("IN (...)", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+@dataclass
+class RequestProfile:
+    path: str
+    queries: int = 0
+    db_seconds: float = 0.0
+    shapes: Dict[str, List[float]] = field(default_factory=dict)  # forma -> [veces, segundos]
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.queries += 1
+        self.db_seconds += seconds
+        stats = self.shapes.setdefault(statement_shape(statement), [0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+
+    def n_plus_one(self, threshold: int) -> List[Dict[str, Any]]:
+        """Formas repetidas al menos `threshold` veces, de más a menos."""
+        suspects = [
+            {"statement": shape, "count": int(n), "seconds": round(secs, 6)}
+            for shape, (n, secs) in self.shapes.items()
+            if n >= threshold
+        ]
+        return sorted(suspects, key=lambda s: s["count"], reverse=True)
+
+
+_current: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar("sql_profile", default=None)
+_installed = False
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current.get()
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault("_profiler_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    profile = _current.get()
+    starts = conn.info.get("_profiler_start")
+    if profile is None or not starts:
+        return
+    profile.record(statement, time.perf_counter() - starts.pop())
+
+
+def install_sql_hooks() -> None:
+    """Registra los hooks a nivel de clase Engine (primario y réplicas)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
+
+
+class SQLProfilerMiddleware:
+
+    def __init__(self, app: ASGIApp, n_plus_one_threshold: int = 5):
+        self.app = app
+        self.threshold = n_plus_one_threshold
+        install_sql_hooks()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(path=scope["path"])
+        token = _current.set(profile)
+        start = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - start) * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={profile.db_seconds * 1000:.2f};desc="{profile.queries} queries", '
+                    f"app;dur={total_ms:.2f}",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self._report(scope, profile, time.perf_counter() - start)
+
+    def _report(self, scope: Scope, profile: RequestProfile, seconds: float) -> None:
+        suspects = profile.n_plus_one(self.threshold)
+        if suspects:
+            logger.warning(
+                "Posible N+1 en %s %s: %s consultas; repetidas: %s",
+                scope.get("method"), profile.path, profile.queries,
+                "; ".join(f'{s["count"]}x {s["statement"][:160]}' for s in suspects),
+            )
+        logger.debug(
+            "SQL %s %s: %s consultas, %.1f ms en BD de %.1f ms",
+            scope.get("method"), profile.path, profile.queries, profile.db_seconds * 1000, seconds * 1000,
+        )
+
+
+__all__ = [
+    "RequestProfile",
+    "SQLProfilerMiddleware",
+    "current_profile",
+    "install_sql_hooks",
+    "statement_shape",
+]
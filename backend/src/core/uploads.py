@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+core.uploads
+------------
+Subsistema común de subida de archivos:
+- UploadSizeLimitMiddleware: corta las peticiones multipart en cuanto el
+  cuerpo supera el límite de su ruta (upload_route_limits(): un Excel
+  ≈ MAX_FILE_SIZE, un lote de ML ≈ ML_MAX_BATCH_IMAGES × ML_MAX_IMAGE_SIZE)
+  o, en el resto, MAX_UPLOAD_REQUEST_SIZE; por Content-Length o contando
+  bytes, antes de que se parsee el formulario completo.
+- save_upload(): copia un UploadFile por bloques a un archivo temporal en
+  UPLOAD_DIR con aiofiles, aplica MAX_FILE_SIZE y ALLOWED_FILE_TYPES
+  (detectando el MIME por los primeros bytes) y devuelve la ruta en disco.
+
+Limitación conocida: Starlette ya vuelca a disco cada parte de más de 1 MB
+(SpooledTemporaryFile, anónimo: no tiene ruta que se pueda mover), así que
+los archivos grandes se escriben dos veces. Por eso el límite por ruta corta
+la petición antes de que se parsee, en vez de depender del MAX_FILE_SIZE de
+save_upload(), que solo actúa con el cuerpo ya leído.
+
+Los servicios reciben rutas (StoredUpload.path) en lugar de `bytes`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.config import settings
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+# Cabeceras y separadores multipart (por petición y por parte)
+MULTIPART_OVERHEAD = 64 * 1024
+PART_OVERHEAD = 1024
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+XLS_MIME = "application/vnd.ms-excel"
+IMAGE_MIMES = ("image/jpeg", "image/png", "image/gif")
+# La importación usa openpyxl: solo .xlsx
+EXCEL_MIMES = (XLSX_MIME,)
+
+# Firmas (magic bytes) → MIME
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"PK\x03\x04", XLSX_MIME),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", XLS_MIME),
+)
+
+
+_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    XLSX_MIME: ".xlsx",
+    XLS_MIME: ".xls",
+    "text/csv": ".csv",
+}
+
+
+def sniff_mime(head: bytes) -> str:
+    """Detecta el MIME a partir de los primeros bytes del archivo."""
+    for magic, mime in _SIGNATURES:
+        if head.startswith(magic):
+            return mime
+    if head and b"\x00" not in head:
+        try:
+            head.decode("utf-8")
+            return "text/csv"
+        except UnicodeDecodeError:
+            pass
+    return "application/octet-stream"
+
+
+@dataclass
+class StoredUpload:
+    """Archivo subido ya escrito en disco."""
+    path: Path
+    size: int
+    content_type: str
+    sha256: str
+    filename: Optional[str] = None
+
+    def remove(self) -> None:
+        """Borra el temporal (no-op si un servicio ya lo movió)."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Archivo demasiado grande (máximo {limit} bytes)")
+
+
+async def save_upload(
+    upload: UploadFile,
+    allowed_types: Optional[Iterable[str]] = None,
+    max_size: Optional[int] = None,
+) -> StoredUpload:
+    """
+    Copia `upload` por bloques a UPLOAD_DIR/tmp.
+    - 413 en cuanto se supera `max_size` (por defecto MAX_FILE_SIZE)
+    - 415 si el MIME detectado no está en `allowed_types` ∩ ALLOWED_FILE_TYPES
+    """
+    limit = max_size or settings.MAX_FILE_SIZE
+    allowed = set(settings.ALLOWED_FILE_TYPES)
+    if allowed_types is not None:
+        allowed &= set(allowed_types)
+
+    first = await upload.read(CHUNK_SIZE)
+    if not first:
+        raise HTTPException(status_code=400, detail="El archivo está vacío")
+    content_type = sniff_mime(first[:512])
+    if content_type not in allowed:
+        raise HTTPException(status_code=415, detail=f"Tipo de archivo no permitido: {content_type}")
+
+    tmp_dir = Path(settings.UPLOAD_DIR) / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    # La extensión importa a algunos lectores (openpyxl)
+    path = tmp_dir / f"{uuid.uuid4().hex}{_EXTENSIONS.get(content_type, '')}"
+
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        async with aiofiles.open(path, "wb") as out:
+            chunk = first
+            while chunk:
+                size += len(chunk)
+                if size > limit:
+                    raise _too_large(limit)
+                digest.update(chunk)
+                await out.write(chunk)
+                chunk = await upload.read(CHUNK_SIZE)
+    except BaseException:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    return StoredUpload(
+        path=path,
+        size=size,
+        content_type=content_type,
+        sha256=digest.hexdigest(),
+        filename=upload.filename,
+    )
+
+
+def upload_route_limits() -> Dict[str, int]:
+    """Límite del cuerpo multipart por ruta, derivado de los límites por archivo."""
+    image_batch = settings.ML_MAX_BATCH_IMAGES * (settings.ML_MAX_IMAGE_SIZE + PART_OVERHEAD)
+    return {
+        "/api/import/excel": settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+        "/api/ml/eye/batch": image_batch + MULTIPART_OVERHEAD,
+        "/api/ml/gum/batch": image_batch + MULTIPART_OVERHEAD,
+    }
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rechaza con 413 los cuerpos multipart/form-data mayores que el límite de
+    su ruta (`route_limits`, nunca por encima de `max_body_size`) o, si la
+    ruta no está, que `max_body_size`. Si hay Content-Length se rechaza sin
+    leer el cuerpo; si no, se cuentan los bytes recibidos y se aborta en
+    cuanto se cruza el límite.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int, route_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.route_limits = {path.rstrip("/"): limit for path, limit in (route_limits or {}).items()}
+
+    def limit_for(self, path: str) -> int:
+        limit = self.route_limits.get(path.rstrip("/"))
+        return self.max_body_size if limit is None else min(limit, self.max_body_size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limit_for(scope.get("path", ""))
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse(
+                status_code=413,
+                content={"detail": f"Petición demasiado grande (máximo {limit} bytes)"},
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI deja pasar HTTPException al parsear el formulario
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Petición demasiado grande (máximo {limit} bytes)",
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+__all__ = [
+    "StoredUpload",
+    "UploadSizeLimitMiddleware",
+    "save_upload",
+    "sniff_mime",
+    "upload_route_limits",
+    "IMAGE_MIMES",
+    "EXCEL_MIMES",
+]
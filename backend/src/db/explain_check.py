@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Comprobación de planes de las consultas calientes
+-------------------------------------------------
+Ejecuta EXPLAIN sobre las consultas que cubren los índices de la migración
+0002 y falla (código de salida 1) si alguna recorre su tabla completa:
+
+    cd backend/src && python -m db.explain_check
+
+tests/test_explain_plans.py hace la misma comprobación en SQLite tras
+`alembic upgrade head` (python -m pytest tests).
+
+En PostgreSQL se desactiva `enable_seqscan` dentro de la transacción: con
+tablas pequeñas el planificador prefiere un seq scan aunque exista el
+índice, y lo que se comprueba es que el índice sea utilizable. En SQLite se
+usa EXPLAIN QUERY PLAN (SEARCH ... USING INDEX frente a SCAN).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sys
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+# nombre -> (tabla, SQL, índice esperado)
+HOT_QUERIES: Dict[str, Tuple[str, str, str]] = {
+    "evaluaciones_por_nino": (
+        "evaluaciones",
+        "SELECT id, fecha, peso_kg, talla_cm FROM evaluaciones "
+        "WHERE child_id = :id ORDER BY fecha DESC, id DESC LIMIT 50",
+        "idx_evaluaciones_child_fecha_id",
+    ),
+    "alertas_pendientes": (
+        "alertas",
+        "SELECT id_alerta, tipo_alerta FROM alertas "
+        "WHERE infante_id = :id AND estado_alerta = 'pendiente'",
+        "idx_alertas_infante_pendiente",
+    ),
+    "infantes_por_sede": (
+        "infantes",
+        "SELECT id_infante, nombre FROM infantes WHERE sede_id = :id",
+        "idx_infantes_sede",
+    ),
+}
+
+
+def _plan_nodes(node: Dict) -> List[Dict]:
+    nodes = [node]
+    for child in node.get("Plans", []):
+        nodes.extend(_plan_nodes(child))
+    return nodes
+
+
+def _check_postgres(conn: Connection, table: str, sql: str, index: str) -> Tuple[bool, str]:
+    conn.execute(text("SET LOCAL enable_seqscan = off"))
+    raw = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), {"id": 1}).scalar()
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+    nodes = [n for n in _plan_nodes(plan) if n.get("Relation Name") == table]
+    ok = bool(nodes) and all(
+        "Seq Scan" not in n["Node Type"] and n.get("Index Name") == index for n in nodes
+    )
+    return ok, "; ".join(f'{n["Node Type"]} {n.get("Index Name") or ""}'.strip() for n in nodes)
+
+
+def _check_sqlite(conn: Connection, table: str, sql: str, index: str) -> Tuple[bool, str]:
+    rows = [r[-1] for r in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), {"id": 1})]
+    detail = "; ".join(rows)
+    scans = [r for r in rows if table in r]
+    ok = bool(scans) and all(r.startswith("SEARCH") and index in r for r in scans)
+    return ok, detail
+
+
+def check_plans(conn: Connection) -> Dict[str, Dict[str, object]]:
+    checker = _check_postgres if conn.dialect.name == "postgresql" else _check_sqlite
+    results: Dict[str, Dict[str, object]] = {}
+    for name, (table, sql, index) in HOT_QUERIES.items():
+        with conn.begin():
+            ok, detail = checker(conn, table, sql, index)
+        results[name] = {"ok": ok, "index": index, "plan": detail}
+    return results
+
+
+def main() -> int:
+    from db.session import engine
+
+    with engine.connect() as conn:
+        results = check_plans(conn)
+    for name, result in results.items():
+        print(f"{'OK  ' if result['ok'] else 'FAIL'} {name}: {result['plan']}")
+    return 0 if all(r["ok"] for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Entorno de Alembic.
+La URL sale de DATABASE_URL (o de las variables POSTGRES_*), igual que en
+db.session, pero con NullPool: las migraciones no usan el pool de la app.
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from core.config import get_database_url
+from db import models  # noqa: F401  (registra las tablas en Base.metadata)
+from db.base import Base
+from db.session import _normalized_db_url
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def _url() -> str:
+    return config.get_main_option("sqlalchemy.url") or _normalized_db_url(get_database_url())
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connectable = create_engine(_url(), poolclass=NullPool, future=True)
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
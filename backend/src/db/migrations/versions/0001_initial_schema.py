@@ -0,0 +1,253 @@
+"""Esquema inicial (database/schema.sql + tablas creadas hasta ahora por create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+Bases de datos existentes creadas con schema.sql + create_all: marcar esta
+revisión sin ejecutarla (`alembic stamp 0001`) y luego `alembic upgrade head`.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+JSON = sa.JSON().with_variant(postgresql.JSONB(), "postgresql")
+
+
+def _timestamps():
+    return [
+        sa.Column("fecha_creado", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("fecha_actualizado", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    ]
+
+
+def upgrade() -> None:
+    is_pg = op.get_bind().dialect.name == "postgresql"
+
+    op.create_table(
+        "roles",
+        sa.Column("id_rol", sa.Integer, primary_key=True),
+        sa.Column("nombre", sa.String(100), nullable=False, unique=True),
+        sa.Column("descripcion", sa.Text),
+    )
+    op.create_table(
+        "usuarios",
+        sa.Column("id_usuario", sa.Integer, primary_key=True),
+        sa.Column("nombre", sa.String(150), nullable=False),
+        sa.Column("correo", sa.String(50), nullable=False),
+        sa.Column("telefono", sa.String(20), nullable=False),
+        sa.Column("contrasena", sa.Text, nullable=False),
+        sa.Column("rol_id", sa.Integer, sa.ForeignKey("roles.id_rol")),
+        *_timestamps(),
+    )
+    op.create_table(
+        "sedes",
+        sa.Column("id_sede", sa.Integer, primary_key=True),
+        sa.Column("nombre", sa.String(150), nullable=False),
+        sa.Column("municipio", sa.String(100)),
+        sa.Column("departamento", sa.String(100)),
+        sa.Column("telefono", sa.String(20)),
+    )
+    op.create_table(
+        "acudientes",
+        sa.Column("id_acudiente", sa.Integer, primary_key=True),
+        sa.Column("nombre", sa.String(150), nullable=False),
+        sa.Column("telefono", sa.String(20)),
+        sa.Column("correo", sa.String(100)),
+        sa.Column("direccion", sa.Text),
+        *_timestamps(),
+    )
+    infante_checks = []
+    if is_pg:  # SQLite no admite CURRENT_DATE en un CHECK
+        infante_checks.append(sa.CheckConstraint("fecha_nacimiento <= CURRENT_DATE", name="ck_infantes_fecha_nacimiento"))
+    op.create_table(
+        "infantes",
+        sa.Column("id_infante", sa.Integer, primary_key=True),
+        sa.Column("nombre", sa.String(100), nullable=False),
+        sa.Column("fecha_nacimiento", sa.Date, nullable=False),
+        sa.Column("genero", sa.String(10), nullable=False),
+        sa.Column("acudiente_id", sa.Integer, sa.ForeignKey("acudientes.id_acudiente", ondelete="SET NULL")),
+        sa.Column("sede_id", sa.Integer, sa.ForeignKey("sedes.id_sede", ondelete="SET NULL")),
+        *_timestamps(),
+        *infante_checks,
+    )
+    op.create_table(
+        "seguimientos",
+        sa.Column("id_seguimiento", sa.Integer, primary_key=True),
+        sa.Column("infante_id", sa.Integer, sa.ForeignKey("infantes.id_infante", ondelete="CASCADE")),
+        sa.Column("encargado_id", sa.Integer, sa.ForeignKey("usuarios.id_usuario")),
+        sa.Column("fecha", sa.Date, nullable=False),
+        sa.Column("observacion", sa.Text),
+    )
+    op.create_table(
+        "datos_antropometricos",
+        sa.Column("id_dato", sa.Integer, primary_key=True),
+        sa.Column("seguimiento_id", sa.Integer, sa.ForeignKey("seguimientos.id_seguimiento", ondelete="CASCADE")),
+        sa.Column("peso", sa.DECIMAL(5, 2), nullable=False),
+        sa.Column("estatura", sa.DECIMAL(5, 2), nullable=False),
+        sa.Column("imc", sa.DECIMAL(5, 2)),
+        sa.Column("circunferencia_braquial", sa.DECIMAL(5, 2)),
+        sa.Column("perimetro_cefalico", sa.DECIMAL(5, 2)),
+        sa.Column("pliegue_cutaneo", sa.DECIMAL(5, 2)),
+        sa.Column("perimetro_abdominal", sa.DECIMAL(5, 2)),
+        sa.CheckConstraint("peso > 0", name="ck_datos_peso"),
+        sa.CheckConstraint("estatura > 0", name="ck_datos_estatura"),
+        sa.CheckConstraint("circunferencia_braquial > 0", name="ck_datos_circunferencia_braquial"),
+        sa.CheckConstraint("perimetro_cefalico > 0", name="ck_datos_perimetro_cefalico"),
+        sa.CheckConstraint("pliegue_cutaneo > 0", name="ck_datos_pliegue_cutaneo"),
+        sa.CheckConstraint("perimetro_abdominal > 0", name="ck_datos_perimetro_abdominal"),
+    )
+    op.create_table(
+        "examenes",
+        sa.Column("id_examenes", sa.Integer, primary_key=True),
+        sa.Column("seguimiento_id", sa.Integer, sa.ForeignKey("seguimientos.id_seguimiento", ondelete="CASCADE")),
+        sa.Column("hemoglobina", sa.DECIMAL(5, 2)),
+    )
+    op.create_table(
+        "sintomas",
+        sa.Column("id_sintoma", sa.Integer, primary_key=True),
+        sa.Column("nombre", sa.String(100), nullable=False),
+    )
+    op.create_table(
+        "seguimiento_sintomas",
+        sa.Column("sintoma_id", sa.Integer, sa.ForeignKey("sintomas.id_sintoma", ondelete="CASCADE"), primary_key=True),
+        sa.Column("seguimiento_id", sa.Integer, sa.ForeignKey("seguimientos.id_seguimiento", ondelete="CASCADE"), primary_key=True),
+    )
+    op.create_table(
+        "diagnosticos",
+        sa.Column("id_diagnostico", sa.Integer, primary_key=True),
+        sa.Column("seguimiento_id", sa.Integer, sa.ForeignKey("seguimientos.id_seguimiento", ondelete="CASCADE")),
+        sa.Column("diagnostico", sa.Text, nullable=False),
+        sa.Column("recomendaciones", JSON),
+        sa.Column("fecha_generado", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "reportes_individuales",
+        sa.Column("id_reporte", sa.Integer, primary_key=True),
+        sa.Column("infante_id", sa.Integer, sa.ForeignKey("infantes.id_infante", ondelete="CASCADE")),
+        sa.Column("seguimiento_id", sa.Integer, sa.ForeignKey("seguimientos.id_seguimiento", ondelete="CASCADE")),
+        sa.Column("nutricionista_id", sa.Integer, sa.ForeignKey("usuarios.id_usuario", ondelete="SET NULL")),
+        sa.Column("fecha_reporte", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("archivo_url", sa.Text),
+        sa.Column("observaciones", sa.Text),
+    )
+    op.create_table(
+        "alertas",
+        sa.Column("id_alerta", sa.Integer, primary_key=True),
+        sa.Column("infante_id", sa.Integer, sa.ForeignKey("infantes.id_infante", ondelete="CASCADE")),
+        sa.Column("seguimiento_id", sa.Integer, sa.ForeignKey("seguimientos.id_seguimiento")),
+        sa.Column("tipo_alerta", sa.String(100), nullable=False),
+        sa.Column("mensaje", sa.Text, nullable=False),
+        sa.Column("estado_alerta", sa.String(20), server_default="pendiente"),
+        sa.Column("fecha_creacion", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("fecha_resuelta", sa.DateTime(timezone=True)),
+    )
+
+    # Tablas que hasta ahora solo creaba create_all
+    op.create_table(
+        "evaluaciones",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("child_id", sa.Integer, sa.ForeignKey("infantes.id_infante"), nullable=False),
+        sa.Column("fecha", sa.Date, nullable=False),
+        sa.Column("peso_kg", sa.DECIMAL(5, 2), nullable=False),
+        sa.Column("talla_cm", sa.DECIMAL(5, 2), nullable=False),
+        sa.Column("imc", sa.DECIMAL(5, 2), nullable=False),
+        sa.Column("estado_nutricional", sa.String(32), nullable=False),
+        sa.Column("observaciones", sa.Text),
+        sa.Column("created_at", sa.DateTime(timezone=True)),
+    )
+    op.create_table(
+        "pronosticos_crecimiento",
+        sa.Column("infante_id", sa.Integer, sa.ForeignKey("infantes.id_infante", ondelete="CASCADE"), primary_key=True),
+        sa.Column("edad_meses_objetivo", sa.Float, nullable=False),
+        sa.Column("peso_predicho", sa.DECIMAL(5, 2), nullable=False),
+        sa.Column("talla_predicha", sa.DECIMAL(5, 2), nullable=False),
+        sa.Column("tendencia", sa.String(20), nullable=False),
+        sa.Column("pendiente_z_peso", sa.Float, nullable=False),
+        sa.Column("confianza", sa.Float, nullable=False),
+        sa.Column("mediciones", sa.Integer, nullable=False),
+        sa.Column("fecha_calculo", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "tokens_revocados",
+        sa.Column("jti", sa.String(64), primary_key=True),
+        sa.Column("usuario_id", sa.Integer, sa.ForeignKey("usuarios.id_usuario", ondelete="CASCADE")),
+        sa.Column("expira", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("fecha_revocado", sa.DateTime(timezone=True)),
+    )
+    op.create_table(
+        "revocaciones_usuario",
+        sa.Column("usuario_id", sa.Integer, primary_key=True),
+        sa.Column("emitidos_antes", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("fecha_revocado", sa.DateTime(timezone=True)),
+    )
+    op.create_table(
+        "refresh_tokens",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("usuario_id", sa.Integer, sa.ForeignKey("usuarios.id_usuario", ondelete="CASCADE"), nullable=False),
+        sa.Column("familia", sa.String(32), nullable=False),
+        sa.Column("token_hash", sa.String(64), nullable=False, unique=True),
+        sa.Column("expira", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("fecha_creado", sa.DateTime(timezone=True)),
+        sa.Column("usado_en", sa.DateTime(timezone=True)),
+        sa.Column("revocado", sa.Boolean, nullable=False, server_default=sa.false()),
+    )
+
+    # Índices de schema.sql
+    op.create_index("idx_usuarios_correo", "usuarios", ["correo"], unique=True)
+    op.create_index("idx_usuarios_telefono", "usuarios", ["telefono"], unique=True)
+    op.create_index("idx_infantes_nombre", "infantes", ["nombre"])
+    op.create_index("idx_infantes_genero", "infantes", ["genero"])
+    op.create_index("idx_infantes_acudiente", "infantes", ["acudiente_id"])
+    op.create_index("idx_seguimientos_infante", "seguimientos", ["infante_id"])
+    op.create_index("idx_seguimientos_encargado", "seguimientos", ["encargado_id"])
+    op.create_index("idx_seguimientos_fecha", "seguimientos", ["fecha"])
+    op.create_index("idx_datos_antropometricos_seguimiento", "datos_antropometricos", ["seguimiento_id"])
+    op.create_index("idx_examenes_seguimiento", "examenes", ["seguimiento_id"])
+    op.create_index("idx_sintomas_nombre", "sintomas", ["nombre"], unique=True)
+    op.create_index("idx_seguimiento_sintomas_seguimiento", "seguimiento_sintomas", ["seguimiento_id"])
+    op.create_index("idx_seguimiento_sintomas_sintoma", "seguimiento_sintomas", ["sintoma_id"])
+    # Índices de los modelos (tokens)
+    op.create_index("ix_tokens_revocados_usuario_id", "tokens_revocados", ["usuario_id"])
+    op.create_index("ix_tokens_revocados_fecha_revocado", "tokens_revocados", ["fecha_revocado"])
+    op.create_index("ix_revocaciones_usuario_fecha_revocado", "revocaciones_usuario", ["fecha_revocado"])
+    op.create_index("ix_refresh_tokens_usuario_id", "refresh_tokens", ["usuario_id"])
+    op.create_index("ix_refresh_tokens_familia", "refresh_tokens", ["familia"])
+
+    if is_pg:
+        op.execute(
+            """
+            CREATE OR REPLACE FUNCTION calcular_imc()
+            RETURNS TRIGGER AS $$
+            BEGIN
+              IF NEW.estatura > 0 THEN
+                NEW.imc := NEW.peso / ((NEW.estatura/100) * (NEW.estatura/100));
+              END IF;
+              RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+            """
+        )
+        op.execute(
+            "CREATE TRIGGER trg_calcular_imc BEFORE INSERT OR UPDATE ON datos_antropometricos "
+            "FOR EACH ROW EXECUTE FUNCTION calcular_imc()"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS trg_calcular_imc ON datos_antropometricos")
+        op.execute("DROP FUNCTION IF EXISTS calcular_imc()")
+    for table in (
+        "refresh_tokens", "revocaciones_usuario", "tokens_revocados", "pronosticos_crecimiento",
+        "evaluaciones", "alertas", "reportes_individuales", "diagnosticos", "seguimiento_sintomas",
+        "sintomas", "examenes", "datos_antropometricos", "seguimientos", "infantes", "acudientes",
+        "sedes", "usuarios", "roles",
+    ):
+        op.drop_table(table)
@@ -0,0 +1,50 @@
+"""Índices de las consultas calientes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+- evaluaciones(child_id, fecha, id): historial por niño ordenado por fecha.
+- alertas(infante_id) WHERE estado_alerta = 'pendiente': alertas abiertas.
+- infantes(sede_id): alcance por sede de los tokens y listados por sede.
+
+En PostgreSQL se crean CONCURRENTLY (sin bloquear escrituras en tablas
+grandes), fuera de la transacción de la migración.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+PENDIENTE = sa.text("estado_alerta = 'pendiente'")
+
+
+def upgrade() -> None:
+    is_pg = op.get_bind().dialect.name == "postgresql"
+    options = {"postgresql_concurrently": True} if is_pg else {}
+
+    def create() -> None:
+        op.create_index(
+            "idx_evaluaciones_child_fecha_id", "evaluaciones", ["child_id", "fecha", "id"], **options
+        )
+        op.create_index(
+            "idx_alertas_infante_pendiente", "alertas", ["infante_id"],
+            postgresql_where=PENDIENTE, sqlite_where=PENDIENTE, **options,
+        )
+        op.create_index("idx_infantes_sede", "infantes", ["sede_id"], **options)
+
+    if is_pg:
+        with op.get_context().autocommit_block():
+            create()
+    else:
+        create()
+
+
+def downgrade() -> None:
+    op.drop_index("idx_infantes_sede", table_name="infantes")
+    op.drop_index("idx_alertas_infante_pendiente", table_name="alertas")
+    op.drop_index("idx_evaluaciones_child_fecha_id", table_name="evaluaciones")
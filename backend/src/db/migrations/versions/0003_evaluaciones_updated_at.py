@@ -0,0 +1,28 @@
+"""Versión de fila en evaluaciones (updated_at)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+evaluaciones.updated_at: instante de la última escritura desde el ORM; con
+created_at forma la versión de la fila de la que salen los ETag de
+/api/evaluations. Las filas existentes toman su created_at.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("evaluaciones", sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE evaluaciones SET updated_at = created_at")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("evaluaciones") as batch:
+        batch.drop_column("updated_at")
@@ -4,9 +4,11 @@ Modelos SQLAlchemy adaptados al esquema SQL (schema.sql)
 Sistema de Evaluación Nutricional Infantil
 """
 
+from datetime import datetime, timezone
+
 from sqlalchemy import (
     Column, Integer, String, Date, DateTime, Text,
-    DECIMAL, ForeignKey, Boolean, JSON
+    DECIMAL, Float, ForeignKey, Boolean, JSON, Index, text
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -82,6 +84,10 @@ class Acudiente(Base):
 # ===============================
 class Infante(Base):
     __tablename__ = "infantes"
+    __table_args__ = (
+        # Filtro por sede (alcance de los tokens, listados por sede)
+        Index("idx_infantes_sede", "sede_id"),
+    )
 
     id_infante = Column(Integer, primary_key=True, index=True)
     nombre = Column(String(100), nullable=False)
@@ -95,6 +101,8 @@ class Infante(Base):
     acudiente = relationship("Acudiente", back_populates="infantes")
     sede = relationship("Sede", back_populates="infantes")
     seguimientos = relationship("Seguimiento", back_populates="infante")
+    evaluaciones = relationship("Evaluation", back_populates="infante")
+    pronostico = relationship("PronosticoCrecimiento", back_populates="infante", uselist=False)
 
 
 # ===============================
@@ -212,6 +220,15 @@ class ReporteIndividual(Base):
 # ===============================
 class Alerta(Base):
     __tablename__ = "alertas"
+    __table_args__ = (
+        # Solo las pendientes: es lo que consultan las evaluaciones
+        Index(
+            "idx_alertas_infante_pendiente",
+            "infante_id",
+            postgresql_where=text("estado_alerta = 'pendiente'"),
+            sqlite_where=text("estado_alerta = 'pendiente'"),
+        ),
+    )
 
     id_alerta = Column(Integer, primary_key=True, index=True)
     infante_id = Column(Integer, ForeignKey("infantes.id_infante"))
@@ -222,3 +239,95 @@ class Alerta(Base):
     fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
     fecha_resuelta = Column(DateTime(timezone=True))
 
+
+# ===============================
+# Tabla: evaluaciones
+# ===============================
+class Evaluation(Base):
+    __tablename__ = "evaluaciones"
+    __table_args__ = (
+        # Historial por niño ordenado por fecha (listados y pronósticos)
+        Index("idx_evaluaciones_child_fecha_id", "child_id", "fecha", "id"),
+        {"extend_existing": True},
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    child_id = Column(Integer, ForeignKey("infantes.id_infante"), nullable=False)
+    fecha = Column(Date, nullable=False)
+    peso_kg = Column(DECIMAL(5, 2), nullable=False)
+    talla_cm = Column(DECIMAL(5, 2), nullable=False)
+    imc = Column(DECIMAL(5, 2), nullable=False)
+    estado_nutricional = Column(String(32), nullable=False)
+    observaciones = Column(Text)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    # Versión de la fila para los ETag (en Python: microsegundos también en SQLite)
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    infante = relationship("Infante", back_populates="evaluaciones", foreign_keys=[child_id])
+
+
+# ===============================
+# Tabla: pronosticos_crecimiento
+# (precalculada por services.growth_forecast)
+# ===============================
+class PronosticoCrecimiento(Base):
+    __tablename__ = "pronosticos_crecimiento"
+
+    infante_id = Column(Integer, ForeignKey("infantes.id_infante", ondelete="CASCADE"), primary_key=True)
+    edad_meses_objetivo = Column(Float, nullable=False)
+    peso_predicho = Column(DECIMAL(5, 2), nullable=False)
+    talla_predicha = Column(DECIMAL(5, 2), nullable=False)
+    tendencia = Column(String(20), nullable=False)
+    pendiente_z_peso = Column(Float, nullable=False)
+    confianza = Column(Float, nullable=False)
+    mediciones = Column(Integer, nullable=False)
+    fecha_calculo = Column(DateTime(timezone=True), server_default=func.now())
+
+    infante = relationship("Infante", back_populates="pronostico")
+
+
+# ===============================
+# Tabla: tokens_revocados
+# (logout de un token concreto, por `jti`)
+# ===============================
+class TokenRevocado(Base):
+    __tablename__ = "tokens_revocados"
+
+    jti = Column(String(64), primary_key=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id_usuario", ondelete="CASCADE"), index=True)
+    expira = Column(DateTime(timezone=True), nullable=False)
+    fecha_revocado = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
+
+
+# ===============================
+# Tabla: revocaciones_usuario
+# (invalida todos los tokens emitidos antes de `emitidos_antes`)
+# ===============================
+class RevocacionUsuario(Base):
+    __tablename__ = "revocaciones_usuario"
+
+    # Sin FK: debe sobrevivir al borrado del usuario
+    usuario_id = Column(Integer, primary_key=True)
+    emitidos_antes = Column(DateTime(timezone=True), nullable=False)
+    fecha_revocado = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
+
+
+# ===============================
+# Tabla: refresh_tokens
+# (solo se guarda el sha256 del token; rotan dentro de una familia)
+# ===============================
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id_usuario", ondelete="CASCADE"), nullable=False, index=True)
+    familia = Column(String(32), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    expira = Column(DateTime(timezone=True), nullable=False)
+    fecha_creado = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    usado_en = Column(DateTime(timezone=True))
+    revocado = Column(Boolean, nullable=False, default=False)
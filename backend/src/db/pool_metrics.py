@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentación del pool de conexiones
+--------------------------------------
+- InstrumentedQueuePool: QueuePool que mide cuánto espera cada checkout
+  (cola del pool + apertura de conexión nueva + pre-ping) y avisa en el log
+  si supera DB_POOL_WAIT_WARN_MS.
+- instrument_engine(): listeners `connect`, `checkout`, `checkin`,
+  `invalidate` y `close` que alimentan core.metrics (histogramas de espera y
+  de tiempo de uso, gauges de conexiones en uso / overflow, contadores de
+  altas, bajas e invalidaciones).
+- observe_request_session(): sesiones por petición (cuántas llegaron a usar
+  la BD) y tiempo total con conexión prestada por petición.
+
+Todo se etiqueta con `pool` (primary, replica-1, ...).
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Espera / uso: de 0.1 ms a 30 s
+POOL_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Como mucho un aviso de espera alta cada N segundos por pool
+WARN_EVERY_SECONDS = 10.0
+
+checkout_wait = REGISTRY.histogram(
+    "db_pool_checkout_wait_seconds", "Espera para obtener una conexión del pool", ("pool",), POOL_BUCKETS
+)
+connection_hold = REGISTRY.histogram(
+    "db_pool_connection_hold_seconds", "Tiempo que una conexión está prestada", ("pool",), POOL_BUCKETS
+)
+connections_created = REGISTRY.counter("db_pool_connections_created_total", "Conexiones DBAPI abiertas", ("pool",))
+connections_closed = REGISTRY.counter("db_pool_connections_closed_total", "Conexiones DBAPI cerradas", ("pool",))
+connections_invalidated = REGISTRY.counter(
+    "db_pool_connections_invalidated_total", "Conexiones invalidadas (errores, pre-ping)", ("pool",)
+)
+checkouts = REGISTRY.counter("db_pool_checkouts_total", "Checkouts del pool", ("pool",))
+checked_out = REGISTRY.gauge("db_pool_checked_out", "Conexiones en uso", ("pool",))
+overflow = REGISTRY.gauge("db_pool_overflow", "Conexiones por encima de pool_size", ("pool",))
+pool_size = REGISTRY.gauge("db_pool_size", "Tamaño configurado del pool", ("pool",))
+# Por petición (get_db / get_routed_db)
+request_sessions = REGISTRY.counter(
+    "db_pool_request_sessions_total", "Sesiones de petición; used=false si nunca tocaron la BD", ("pool", "used")
+)
+request_hold = REGISTRY.histogram(
+    "db_pool_request_hold_seconds", "Tiempo con conexión prestada por petición", ("pool",), POOL_BUCKETS
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mide la espera de cada checkout."""
+
+    metrics_label = "primary"
+    warn_after_seconds = 0.1
+    _last_warning = 0.0
+
+    def connect(self):  # type: ignore[override]
+        start = time.perf_counter()
+        conn = super().connect()
+        waited = time.perf_counter() - start
+        checkout_wait.observe(waited, pool=self.metrics_label)
+        if waited >= self.warn_after_seconds:
+            now = time.monotonic()
+            if now - self._last_warning >= WARN_EVERY_SECONDS:
+                self._last_warning = now
+                logger.warning(
+                    "Espera alta en el pool %s: %.0f ms (en uso %s/%s, overflow %s)",
+                    self.metrics_label, waited * 1000, self.checkedout(), self.size(), self.overflow(),
+                )
+        return conn
+
+    def recreate(self):  # type: ignore[override]
+        pool = super().recreate()
+        pool.metrics_label = self.metrics_label
+        pool.warn_after_seconds = self.warn_after_seconds
+        return pool
+
+
+def instrument_engine(engine: Engine, label: str, warn_ms: float) -> None:
+    """Engancha los listeners del pool de `engine` y sus gauges."""
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        pool.metrics_label = label
+        pool.warn_after_seconds = warn_ms / 1000
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn: Any, record: Any) -> None:
+        connections_created.inc(pool=label)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_conn: Any, record: Any, proxy: Any) -> None:
+        record.info["checkout_at"] = time.perf_counter()
+        checkouts.inc(pool=label)
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_conn: Any, record: Any) -> None:
+        started = record.info.pop("checkout_at", None)
+        if started is not None:
+            connection_hold.observe(time.perf_counter() - started, pool=label)
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_conn: Any, record: Any, exception: Any) -> None:
+        connections_invalidated.inc(pool=label)
+
+    @event.listens_for(engine, "close")
+    def _on_close(dbapi_conn: Any, record: Any) -> None:
+        connections_closed.inc(pool=label)
+
+    # engine.pool cambia tras dispose(): se lee en cada muestreo
+    checked_out.set_function(lambda: _pool_stat(engine, "checkedout"), pool=label)
+    overflow.set_function(lambda: max(_pool_stat(engine, "overflow"), 0), pool=label)
+    pool_size.set_function(lambda: _pool_stat(engine, "size"), pool=label)
+
+
+def observe_request_session(label: str, used: bool, hold_seconds: float) -> None:
+    """Registra una sesión de petición y, si la usó, cuánto tuvo la conexión."""
+    request_sessions.inc(pool=label, used=str(used).lower())
+    if used:
+        request_hold.observe(hold_seconds, pool=label)
+
+
+def _pool_stat(engine: Engine, name: str) -> float:
+    method = getattr(engine.pool, name, None)
+    return float(method()) if callable(method) else 0.0
+
+
+def pool_report() -> Dict[str, Any]:
+    """Métricas db_pool_* del worker actual."""
+    return REGISTRY.snapshot(prefix="db_pool_")
+
+
+__all__ = ["InstrumentedQueuePool", "instrument_engine", "observe_request_session", "pool_report"]
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Verificación de la revisión del esquema
+---------------------------------------
+El esquema lo gestionan las migraciones de Alembic (`alembic upgrade head`
+desde backend/). Al arrancar, cada worker solo compara la revisión de la base
+de datos con la cabeza de las migraciones: no crea ni altera tablas.
+
+Con DB_SCHEMA_STRICT=true (por defecto en producción) una base de datos sin
+migrar detiene el arranque; en desarrollo solo se avisa en el log.
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Optional, Set
+
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+
+def head_revisions() -> Set[str]:
+    return set(ScriptDirectory(str(MIGRATIONS_DIR)).get_heads())
+
+
+def current_revisions(engine: Engine) -> Set[str]:
+    with engine.connect() as conn:
+        return set(MigrationContext.configure(conn).get_current_heads())
+
+
+def check_schema_revision(engine: Engine, strict: bool = False) -> Optional[str]:
+    """
+    Devuelve la revisión actual si coincide con la cabeza de las migraciones.
+    Si no coincide: RuntimeError con `strict`, o aviso en el log y None.
+    """
+    heads = head_revisions()
+    try:
+        current = current_revisions(engine)
+    except SQLAlchemyError as e:
+        if strict:
+            raise RuntimeError(f"No se pudo leer la revisión del esquema: {e}") from e
+        logger.warning("No se pudo leer la revisión del esquema: %s", e)
+        return None
+    if current == heads:
+        revision = ",".join(sorted(current))
+        logger.info("Esquema de base de datos en la revisión %s", revision)
+        return revision
+
+    message = (
+        f"Esquema de base de datos en {sorted(current) or 'ninguna revisión'}, "
+        f"se esperaba {sorted(heads)}: ejecute `alembic upgrade head` desde backend/"
+    )
+    if strict:
+        raise RuntimeError(message)
+    logger.warning(message)
+    return None
+
+
+__all__ = ["check_schema_revision", "current_revisions", "head_revisions"]
@@ -5,19 +5,43 @@ Database session management for Nutritional Assessment API
 -----------------------------------------------------------
 Compatible con Docker local y Railway.
 Maneja engine SQLAlchemy, SessionLocal y helpers de conexión.
+
+Réplicas de lectura (opcional, DATABASE_REPLICA_URLS separadas por comas):
+get_routed_db envía las peticiones GET/HEAD a una réplica sana (round-robin)
+y el resto al primario. Tras un commit, el usuario queda fijado al primario
+READ_YOUR_WRITES_SECONDS para que lea lo que acaba de escribir.
+
+Ambas dependencias entregan una LazySession: la sesión se crea en el primer
+uso, así que las peticiones que terminan antes (validación, 404, caché,
+auth) no la crean ni tocan el pool. El tiempo con conexión prestada se suma
+por petición en `request.state.db_hold_seconds` y en las métricas del pool.
 """
 
 from __future__ import annotations
 
+import itertools
 import os
 import logging
-from typing import Generator
+import threading
+import time
+from typing import Any, Callable, Generator, List, Optional
 
-from sqlalchemy import create_engine, text
+from fastapi import Request
+from sqlalchemy import create_engine, event, make_url, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
 
 logger = logging.getLogger(__name__)
 
+try:
+    from db.pool_metrics import InstrumentedQueuePool, instrument_engine, observe_request_session
+except Exception:  # métricas opcionales
+    InstrumentedQueuePool = None  # type: ignore
+    instrument_engine = None  # type: ignore
+    observe_request_session = None  # type: ignore
+
 # ============================================================
 # Carga de configuración (con fallback si no existe core.config)
 # ============================================================
@@ -30,6 +54,10 @@ except Exception:
         DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "5"))
         DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
         DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+        DATABASE_REPLICA_URLS = os.getenv("DATABASE_REPLICA_URLS", "")
+        DB_POOL_WAIT_WARN_MS = int(os.getenv("DB_POOL_WAIT_WARN_MS", "100"))
+        READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+        REPLICA_HEALTH_INTERVAL_SECONDS = int(os.getenv("REPLICA_HEALTH_INTERVAL_SECONDS", "10"))
 
     settings = _FallbackSettings()  # type: ignore
 
@@ -65,9 +93,15 @@ def _normalized_db_url(raw_url: str | None) -> str:
     return raw_url
 
 
-def _create_engine():
+def _create_engine(raw_url: str | None = None, label: str = "primary"):
     try:
-        db_url = _normalized_db_url(get_database_url())
+        db_url = _normalized_db_url(raw_url or get_database_url())
+        options = {}
+        # Solo donde el dialecto usaría QueuePool (no en SQLite en memoria)
+        if InstrumentedQueuePool is not None:
+            url = make_url(db_url)
+            if url.get_dialect().get_pool_class(url) is QueuePool:
+                options["poolclass"] = InstrumentedQueuePool
         engine = create_engine(
             db_url,
             pool_size=getattr(settings, "DATABASE_POOL_SIZE", 5),
@@ -75,7 +109,10 @@ def _create_engine():
             pool_pre_ping=True,
             echo=getattr(settings, "DEBUG", False),
             future=True,  # API 2.x
+            **options,
         )
+        if instrument_engine is not None:
+            instrument_engine(engine, label, getattr(settings, "DB_POOL_WAIT_WARN_MS", 100))
         logger.info(f"✅ Database engine created successfully → {db_url}")
         return engine
     except Exception as e:
@@ -94,27 +131,267 @@ SessionLocal: sessionmaker[Session] = sessionmaker(
 )
 
 
+@event.listens_for(SessionLocal, "after_commit")
+def _mark_committed(session: Session) -> None:
+    session.info["committed"] = True
+    # Read-your-writes: se fija al usuario en el propio commit, antes de que
+    # el handler responda (el teardown de la dependencia corre tras enviar la
+    # respuesta y una lectura inmediata podría ir a una réplica atrasada)
+    key = session.info.get("pin_key")
+    if key is not None:
+        try:
+            _pin_cache().set(key, 1)
+        except Exception as exc:
+            logger.warning("No se pudo fijar %s al primario: %s", key, exc)
+
+
+@event.listens_for(SessionLocal, "after_begin")
+def _mark_connection_acquired(session: Session, transaction: Any, connection: Any) -> None:
+    session.info.setdefault("connection_since", time.perf_counter())
+
+
+@event.listens_for(SessionLocal, "after_transaction_end")
+def _mark_connection_released(session: Session, transaction: Any) -> None:
+    # Solo la transacción raíz devuelve la conexión al pool
+    if transaction.parent is None:
+        since = session.info.pop("connection_since", None)
+        if since is not None:
+            session.info["hold_seconds"] = session.info.get("hold_seconds", 0.0) + time.perf_counter() - since
+
+
+class LazySession:
+    """
+    Proxy de Session que la crea en el primer acceso a cualquier atributo.
+    rollback() y close() no hacen nada si nunca se creó.
+    """
+
+    __slots__ = ("_factory", "_session")
+
+    def __init__(self, factory: Callable[[], Session]):
+        self._factory = factory
+        self._session: Optional[Session] = None
+
+    @property
+    def materialized(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._session is None:
+            self._session = self._factory()
+        return getattr(self._session, name)
+
+    def rollback(self) -> None:
+        if self._session is not None:
+            self._session.rollback()
+
+    def close(self) -> float:
+        """Cierra la sesión y devuelve los segundos que tuvo conexión."""
+        if self._session is None:
+            return 0.0
+        self._session.close()
+        return self._session.info.get("hold_seconds", 0.0)
+
+
+# ============================================================
+# Réplicas de lectura
+# ============================================================
+class ReplicaSet:
+    """Engines de réplica con round-robin entre las sanas y chequeo periódico."""
+
+    def __init__(self, engines: List[Engine], check_interval: float):
+        self.engines = engines
+        self.check_interval = check_interval
+        self._healthy = [True] * len(engines)
+        self._checked_at: Optional[float] = None
+        self._rr = itertools.count()
+        self._check_lock = threading.Lock()
+
+    def pick(self) -> Optional[Engine]:
+        """Siguiente réplica sana; None si no hay (se usa el primario)."""
+        if not self.engines:
+            return None
+        self._maybe_check()
+        healthy = [e for e, ok in zip(self.engines, self._healthy) if ok]
+        if not healthy:
+            return None
+        return healthy[next(self._rr) % len(healthy)]
+
+    def mark_failed(self, bad: Engine) -> None:
+        for i, e in enumerate(self.engines):
+            if e is bad and self._healthy[i]:
+                self._healthy[i] = False
+                logger.warning("Réplica %s marcada como no disponible", e.url.render_as_string(hide_password=True))
+
+    def _maybe_check(self) -> None:
+        if self._checked_at is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            self.check()
+        finally:
+            self._checked_at = time.monotonic()
+            self._check_lock.release()
+
+    def check(self) -> List[bool]:
+        for i, e in enumerate(self.engines):
+            try:
+                with e.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                ok = True
+            except Exception as exc:
+                ok = False
+                if self._healthy[i]:
+                    logger.warning("Réplica %s no responde: %s", e.url.render_as_string(hide_password=True), exc)
+            if ok and not self._healthy[i]:
+                logger.info("Réplica %s disponible de nuevo", e.url.render_as_string(hide_password=True))
+            self._healthy[i] = ok
+        return list(self._healthy)
+
+    def status(self) -> List[dict]:
+        return [
+            {"url": e.url.render_as_string(hide_password=True), "healthy": ok}
+            for e, ok in zip(self.engines, self._healthy)
+        ]
+
+
+def _create_replica_engines() -> List[Engine]:
+    urls = [u.strip() for u in (getattr(settings, "DATABASE_REPLICA_URLS", "") or "").split(",") if u.strip()]
+    engines = []
+    for i, url in enumerate(urls, start=1):
+        try:
+            engines.append(_create_engine(url, label=f"replica-{i}"))
+        except Exception:
+            logger.error("Réplica ignorada (no se pudo crear el engine)")
+    return engines
+
+
+replicas = ReplicaSet(
+    _create_replica_engines(),
+    check_interval=getattr(settings, "REPLICA_HEALTH_INTERVAL_SECONDS", 10),
+)
+
+_pins = None
+
+
+def _pin_cache():
+    """Caché de usuarios fijados al primario (compartida si CACHE_BACKEND=redis)."""
+    global _pins
+    if _pins is None:
+        from core.cache import create_cache
+
+        _pins = create_cache(
+            "db-pins",
+            ttl=getattr(settings, "READ_YOUR_WRITES_SECONDS", 5),
+            max_entries=100_000,
+        )
+    return _pins
+
+
+def _client_key(request: Request) -> str:
+    """Usuario del Bearer token (uid) o, sin token válido, la IP del cliente."""
+    auth = request.headers.get("authorization", "")
+    if auth.lower().startswith("bearer "):
+        try:
+            from jose import jwt
+            from core.security import ALGORITHM, SECRET_KEY
+
+            uid = jwt.decode(auth[7:], SECRET_KEY, algorithms=[ALGORITHM]).get("uid")
+            if uid is not None:
+                return f"uid:{uid}"
+        except Exception:
+            pass
+    return f"ip:{_client_ip(request)}"
+
+
+_trusted_proxies = None
+
+
+def _client_ip(request: Request) -> str:
+    """IP real del cliente; detrás de nginx, la de X-Forwarded-For (ver core.rate_limit)."""
+    global _trusted_proxies
+    from core.rate_limit import client_ip, parse_networks
+
+    if _trusted_proxies is None:
+        _trusted_proxies = parse_networks(getattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", "127.0.0.1,::1"))
+    return client_ip(request.scope, dict(request.scope.get("headers") or []), _trusted_proxies)
+
+
+def _pinning_factory(request: Request, bind: Optional[Engine] = None) -> Callable[[], Session]:
+    """Fábrica de sesiones que, con réplicas, fija al cliente al primario en cada commit."""
+
+    def factory() -> Session:
+        session = SessionLocal(bind=bind) if bind is not None else SessionLocal()
+        if replicas.engines:
+            # Lo usa _mark_committed para fijar al usuario al hacer commit
+            session.info["pin_key"] = _client_key(request)
+        return session
+
+    return factory
+
+
 # ============================================================
 # Dependencia para FastAPI
 # ============================================================
-def get_db() -> Generator[Session, None, None]:
+def _release(db: LazySession, request: Optional[Request], label: str) -> None:
+    try:
+        hold = db.close()
+    except Exception as exc:
+        logger.warning("No se pudo cerrar la sesión de DB: %s", exc)
+        return
+    if request is not None:
+        request.state.db_hold_seconds = getattr(request.state, "db_hold_seconds", 0.0) + hold
+    if observe_request_session is not None:
+        observe_request_session(label, db.materialized, hold)
+
+
+def get_db(request: Request) -> Generator[Session, None, None]:
     """
     Uso en rutas:
         def endpoint(db: Session = Depends(get_db)):
             ...
+
+    Siempre el primario. Sus commits también fijan al cliente (registro,
+    cambios de usuario...); en login/token/refresh el cliente aún no trae
+    Bearer válido, así que se fija su IP y no su uid.
     """
-    db = SessionLocal()
+    db = LazySession(_pinning_factory(request))
     try:
-        yield db
+        yield db  # type: ignore[misc]
     except Exception as e:
         logger.error(f"Database session error: {e}")
         db.rollback()
         raise
     finally:
-        try:
-            db.close()
-        except Exception as exc:
-            logger.warning("No se pudo cerrar la sesión de DB: %s", exc)
+        _release(db, request, "primary")
+
+
+def get_routed_db(request: Request) -> Generator[Session, None, None]:
+    """
+    Como get_db, pero las lecturas (GET/HEAD) van a una réplica si hay
+    réplicas sanas y el usuario no escribió en los últimos
+    READ_YOUR_WRITES_SECONDS. Un commit fija al usuario al primario en el
+    momento del commit (ver _mark_committed).
+    """
+    read_only = request.method in ("GET", "HEAD")
+    replica = None
+    if read_only and replicas.engines:
+        key = _client_key(request)
+        if _pin_cache().get(key) is None:
+            replica = replicas.pick()
+
+    db = LazySession(_pinning_factory(request, replica))
+    label = getattr(replica.pool, "metrics_label", "replica") if replica is not None else "primary"
+    try:
+        yield db  # type: ignore[misc]
+    except Exception as e:
+        logger.error(f"Database session error: {e}")
+        if replica is not None and isinstance(e, DBAPIError) and e.connection_invalidated:
+            replicas.mark_failed(replica)
+        db.rollback()
+        raise
+    finally:
+        _release(db, request, label)
 
 
 # ============================================================
@@ -133,4 +410,4 @@ def test_connection() -> bool:
         return False
 
 
-__all__ = ["engine", "SessionLocal", "get_db", "test_connection"]
+__all__ = ["engine", "SessionLocal", "LazySession", "get_db", "get_routed_db", "replicas", "test_connection"]
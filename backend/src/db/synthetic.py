@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+"""
+Generador de datos sintéticos
+-----------------------------
+Llena la base de datos con un volumen de producción para medir rendimiento:
+
+    cd backend/src
+    python -m db.synthetic --sedes 500 --children 1000000 --measurements 10000000
+    python -m db.synthetic --database-url sqlite:////tmp/bench.db --children 20000 --create-schema
+
+- Reproducible: misma semilla + misma fecha de corte (--as-of) = mismos datos.
+- Distribuciones: tamaño de sede log-normal (pocas sedes grandes), edad de
+  ingreso 0-24 meses, controles cada 1-3 meses (más juntos si no caben),
+  siempre dentro de los 0-60 meses que cubre la referencia, z-scores de
+  peso/talla por niño con un ~8% de desnutrición y deriva entre controles.
+  Las medidas salen de las tablas OMS por sexo de
+  services.nutrition_service. El estado usa las
+  etiquetas y tipos de alerta de api.evaluations, pero clasificado por
+  z-score de peso para la edad (sus umbrales de IMC son de adultos y
+  marcarían a casi todos los niños).
+- Tablas: sedes, acudientes, infantes, evaluaciones, seguimientos (una parte
+  de las medidas) con datos_antropometricos, alertas, y personal
+  (nutricionistas) si no hay usuarios con ese rol.
+- Carga: COPY en PostgreSQL, executemany en SQLite. Los ids se asignan aquí
+  (a partir del máximo actual), así que se puede añadir sobre datos previos.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import logging
+import math
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Table, create_engine, func, select, text
+from sqlalchemy.engine import Connection
+
+from db.models import (
+    Acudiente, Alerta, DatoAntropometrico, Evaluation, Infante, Rol, Sede, Seguimiento, Usuario,
+)
+
+logger = logging.getLogger("db.synthetic")
+
+DAYS_PER_MONTH = 30.4375
+MUNICIPIOS = [
+    ("Cartagena", "Bolívar"), ("Turbaco", "Bolívar"), ("Magangué", "Bolívar"), ("Barranquilla", "Atlántico"),
+    ("Soledad", "Atlántico"), ("Santa Marta", "Magdalena"), ("Sincelejo", "Sucre"), ("Montería", "Córdoba"),
+    ("Valledupar", "Cesar"), ("Riohacha", "La Guajira"), ("Quibdó", "Chocó"), ("Bogotá", "Cundinamarca"),
+]
+NOMBRES_M = ["Juan", "Santiago", "Samuel", "Matías", "Sebastián", "Emiliano", "Tomás", "Daniel", "Jerónimo", "Andrés"]
+NOMBRES_F = ["Sofía", "Valentina", "Isabella", "Mariana", "Salomé", "Luciana", "Gabriela", "Antonella", "Sara", "Emma"]
+APELLIDOS = ["Pérez", "Gómez", "Rodríguez", "Martínez", "López", "García", "Ramírez", "Torres", "Díaz", "Herrera",
+             "Castro", "Morales", "Ortiz", "Vargas", "Rojas", "Mendoza", "Suárez", "Jiménez", "Ruiz", "Cárdenas"]
+# Cortes de z-score (peso para la edad) -> estado
+Z_CORTES = [-3.0, -2.0, 2.0, 3.0]
+ESTADOS = np.array(["bajo", "riesgo", "normal", "sobrepeso", "obesidad"])
+TIPOS_ALERTA = {"bajo": "imc_bajo", "riesgo": "imc_riesgo", "sobrepeso": "imc_sobrepeso", "obesidad": "imc_obesidad"}
+
+
+# ---------------------------------------------------------------------
+# Carga
+# ---------------------------------------------------------------------
+def _fmt(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class Loader:
+    """COPY en PostgreSQL; executemany con parámetros posicionales en el resto."""
+
+    def __init__(self, conn: Connection):
+        self.conn = conn
+        self.dialect = conn.dialect.name
+        self.rows_loaded: Dict[str, int] = {}
+
+    def load(self, table: Table, columns: Sequence[str], rows: List[Tuple[Any, ...]]) -> None:
+        if not rows:
+            return
+        if self.dialect == "postgresql":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows([tuple(_fmt(v) for v in row) for row in rows])
+            buffer.seek(0)
+            cursor = self.conn.connection.dbapi_connection.cursor()
+            try:
+                cursor.copy_expert(
+                    f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+            finally:
+                cursor.close()
+        else:
+            placeholders = ", ".join("?" for _ in columns)
+            self.conn.exec_driver_sql(
+                f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({placeholders})",
+                [tuple(_fmt(v) for v in row) for row in rows],
+            )
+        self.rows_loaded[table.name] = self.rows_loaded.get(table.name, 0) + len(rows)
+
+    def prepare(self) -> None:
+        if self.dialect == "sqlite":
+            self.conn.exec_driver_sql("PRAGMA synchronous = OFF")
+            self.conn.exec_driver_sql("PRAGMA journal_mode = WAL")
+
+    def finish(self, tables: Sequence[Tuple[Table, str]]) -> None:
+        """Tras cargar con ids explícitos: ajusta las secuencias y actualiza estadísticas."""
+        if self.dialect == "postgresql":
+            for table, pk in tables:
+                self.conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', '{pk}'), "
+                    f"COALESCE((SELECT MAX({pk}) FROM {table.name}), 1))"
+                ))
+            self.conn.commit()
+            for table, _ in tables:
+                self.conn.execute(text(f"ANALYZE {table.name}"))
+        else:
+            self.conn.exec_driver_sql("ANALYZE")
+        self.conn.commit()
+
+
+def _next_id(conn: Connection, column: Any) -> int:
+    return int(conn.execute(select(func.coalesce(func.max(column), 0))).scalar()) + 1
+
+
+# ---------------------------------------------------------------------
+# Generación
+# ---------------------------------------------------------------------
+class SyntheticDataset:
+
+    def __init__(self, conn: Connection, rng: np.random.Generator, as_of: date, staff: int, staff_password: str):
+        self.conn = conn
+        self.rng = rng
+        self.as_of = as_of
+        self.staff = staff
+        self.staff_password = staff_password
+        self.loader = Loader(conn)
+        self.ids = {
+            "sede": _next_id(conn, Sede.id_sede),
+            "acudiente": _next_id(conn, Acudiente.id_acudiente),
+            "infante": _next_id(conn, Infante.id_infante),
+            "evaluacion": _next_id(conn, Evaluation.id),
+            "seguimiento": _next_id(conn, Seguimiento.id_seguimiento),
+            "dato": _next_id(conn, DatoAntropometrico.id_dato),
+            "alerta": _next_id(conn, Alerta.id_alerta),
+        }
+        self.sede_ids = np.empty(0, dtype=np.int64)
+        self.sede_weights = np.empty(0)
+        self.encargados: List[int] = []
+
+    def _take_ids(self, kind: str, n: int) -> np.ndarray:
+        start = self.ids[kind]
+        self.ids[kind] = start + n
+        return np.arange(start, start + n, dtype=np.int64)
+
+    def _names(self, n: int, female: np.ndarray) -> List[str]:
+        first_m = self.rng.integers(0, len(NOMBRES_M), n)
+        first_f = self.rng.integers(0, len(NOMBRES_F), n)
+        last = self.rng.integers(0, len(APELLIDOS), (n, 2))
+        return [
+            f"{NOMBRES_F[ff] if fem else NOMBRES_M[fm]} {APELLIDOS[a]} {APELLIDOS[b]}"
+            for fm, ff, fem, (a, b) in zip(first_m, first_f, female, last)
+        ]
+
+    # -- catálogos ------------------------------------------------------
+    def create_sedes(self, n: int) -> None:
+        ids = self._take_ids("sede", n)
+        places = self.rng.integers(0, len(MUNICIPIOS), n)
+        rows = [
+            (int(i), f"Sede {MUNICIPIOS[p][0]} {int(i)}", MUNICIPIOS[p][0], MUNICIPIOS[p][1], f"605{int(i):07d}")
+            for i, p in zip(ids, places)
+        ]
+        self.loader.load(Sede.__table__, ["id_sede", "nombre", "municipio", "departamento", "telefono"], rows)
+        self.sede_ids = ids
+        weights = self.rng.lognormal(mean=0.0, sigma=1.0, size=n)
+        self.sede_weights = weights / weights.sum()
+
+    def ensure_staff(self) -> None:
+        """Nutricionistas para `encargado_id`; se crean si no hay ninguno."""
+        rol_id = self.conn.execute(select(Rol.id_rol).where(Rol.nombre == "Nutricionista")).scalar()
+        if rol_id is None:
+            rol_id = self.conn.execute(
+                Rol.__table__.insert().values(nombre="Nutricionista", descripcion="Profesional de seguimiento")
+            ).inserted_primary_key[0]
+        self.encargados = list(self.conn.execute(select(Usuario.id_usuario).where(Usuario.rol_id == rol_id)).scalars())
+        if self.encargados or not self.staff:
+            return
+
+        from core.security import pwd_context
+
+        password_hash = pwd_context.hash(self.staff_password)
+        start = _next_id(self.conn, Usuario.id_usuario)
+        rows = [
+            (start + i, f"Nutricionista {i + 1}", f"nutri{i + 1}@synthetic.example.com", f"39{start + i:08d}", password_hash, rol_id)
+            for i in range(self.staff)
+        ]
+        self.loader.load(Usuario.__table__, ["id_usuario", "nombre", "correo", "telefono", "contrasena", "rol_id"], rows)
+        self.encargados = [r[0] for r in rows]
+
+    # -- niños y medidas -------------------------------------------------
+    def create_children(self, n: int, mean_measurements: float, followup_ratio: float) -> None:
+        from services.nutrition_service import MAX_REFERENCE_AGE, NutritionService
+
+        rng = self.rng
+        infante_ids = self._take_ids("infante", n)
+        female = rng.random(n) < 0.49
+
+        # Acudientes: ~1.3 niños por acudiente (hermanos)
+        n_acu = max(1, math.ceil(n / 1.3))
+        acu_ids = self._take_ids("acudiente", n_acu)
+        acu_names = self._names(n_acu, rng.random(n_acu) < 0.8)
+        self.loader.load(
+            Acudiente.__table__,
+            ["id_acudiente", "nombre", "telefono", "correo", "direccion"],
+            [(int(a), name, f"30{int(a):08d}", f"acudiente{int(a)}@synthetic.example.com", f"Barrio {APELLIDOS[int(a) % len(APELLIDOS)]}")
+             for a, name in zip(acu_ids, acu_names)],
+        )
+
+        # Controles por niño, edad de ingreso e intervalos (meses)
+        counts = 1 + rng.poisson(max(mean_measurements - 1, 0), n)
+        total = int(counts.sum())
+        child_of = np.repeat(np.arange(n), counts)
+        gaps = rng.uniform(1, 3, total)
+        starts = np.cumsum(counts) - counts
+        gaps[starts] = 0.0
+        offsets = np.cumsum(gaps)
+        offsets -= np.repeat(offsets[starts], counts)
+        # Todas las medidas dentro de la referencia (0-60 meses): las series
+        # largas se comprimen y la edad de ingreso deja sitio a la serie
+        span = offsets[starts + counts - 1]
+        scale = np.minimum(1.0, MAX_REFERENCE_AGE / np.maximum(span, 1e-9))
+        offsets *= scale[child_of]
+        first_age = rng.uniform(0, 1, n) * np.minimum(24.0, MAX_REFERENCE_AGE - span * scale)
+        ages = first_age[child_of] + offsets
+        # El último control cae en los 6 meses previos a la fecha de corte
+        last_age = ages[starts + counts - 1]
+        birth_days = ((last_age + rng.uniform(0, 6, n)) * DAYS_PER_MONTH).astype(np.int64)
+        births = [self.as_of - timedelta(days=int(d)) for d in birth_days]
+        meas_dates = [births[c] + timedelta(days=int(a * DAYS_PER_MONTH)) for c, a in zip(child_of, ages)]
+
+        # z-scores: ~8% con desnutrición, deriva entre controles
+        malnourished = rng.random(n) < 0.08
+        z_w0 = np.where(malnourished, rng.normal(-2.5, 0.7, n), rng.normal(-0.2, 1.0, n))
+        z_h0 = 0.6 * z_w0 + rng.normal(0, 0.8, n)
+        drift = rng.normal(0, 0.15, total)
+        drift[starts] = 0.0
+        walk = np.cumsum(drift) - np.repeat(np.cumsum(drift)[starts], counts)
+        z_w = z_w0[child_of] + walk
+        sex = np.where(female, "F", "M")[child_of]
+        weight = np.clip(NutritionService.from_zscore("weight", ages, z_w, sex), 1.5, 40).round(2)
+        height = np.clip(NutritionService.from_zscore("height", ages, z_h0[child_of] + 0.5 * walk, sex), 40, 130).round(2)
+        imc = (weight / (height / 100) ** 2).round(2)
+        estados = ESTADOS[np.digitize(z_w, Z_CORTES)].tolist()
+
+        sede_of = rng.choice(self.sede_ids, size=n, p=self.sede_weights)
+        acu_of = rng.choice(acu_ids, size=n)
+        names = self._names(n, female)
+        self.loader.load(
+            Infante.__table__,
+            ["id_infante", "nombre", "fecha_nacimiento", "genero", "acudiente_id", "sede_id"],
+            [(int(i), names[k], births[k], "F" if female[k] else "M", int(acu_of[k]), int(sede_of[k]))
+             for k, i in enumerate(infante_ids)],
+        )
+
+        eval_ids = self._take_ids("evaluacion", total)
+        created = [datetime.combine(d, datetime.min.time()) + timedelta(hours=9) for d in meas_dates]
+        self.loader.load(
+            Evaluation.__table__,
+            ["id", "child_id", "fecha", "peso_kg", "talla_cm", "imc", "estado_nutricional", "created_at"],
+            [(int(eval_ids[j]), int(infante_ids[child_of[j]]), meas_dates[j], float(weight[j]), float(height[j]),
+              float(imc[j]), estados[j], created[j]) for j in range(total)],
+        )
+
+        # Parte de los controles también como seguimiento + datos antropométricos
+        followups = np.flatnonzero(rng.random(total) < followup_ratio)
+        if len(followups) and self.encargados:
+            seg_ids = self._take_ids("seguimiento", len(followups))
+            encargado = rng.choice(np.asarray(self.encargados), size=len(followups))
+            self.loader.load(
+                Seguimiento.__table__,
+                ["id_seguimiento", "infante_id", "encargado_id", "fecha", "observacion"],
+                [(int(s), int(infante_ids[child_of[j]]), int(e), meas_dates[j], None)
+                 for s, j, e in zip(seg_ids, followups, encargado)],
+            )
+            dato_ids = self._take_ids("dato", len(followups))
+            self.loader.load(
+                DatoAntropometrico.__table__,
+                ["id_dato", "seguimiento_id", "peso", "estatura", "imc"],
+                [(int(d), int(s), float(weight[j]), float(height[j]), float(imc[j]))
+                 for d, s, j in zip(dato_ids, seg_ids, followups)],
+            )
+
+        # Alertas: pendiente si el último control está fuera de "normal";
+        # resuelta para los anteriores fuera de rango
+        alert_rows = []
+        last = starts + counts - 1
+        for j in np.flatnonzero(np.array([e != "normal" for e in estados])):
+            is_last = last[child_of[j]] == j
+            if not is_last and rng.random() > 0.3:
+                continue
+            alert_rows.append((
+                int(infante_ids[child_of[j]]),
+                TIPOS_ALERTA.get(estados[j], "imc_fuera_rango"),
+                f"IMC {imc[j]:.2f} clasificado como '{estados[j]}'. Revisión requerida.",
+                "pendiente" if is_last else "resuelta",
+                created[j],
+                None if is_last else created[j] + timedelta(days=30),
+            ))
+        alert_ids = self._take_ids("alerta", len(alert_rows))
+        self.loader.load(
+            Alerta.__table__,
+            ["id_alerta", "infante_id", "tipo_alerta", "mensaje", "estado_alerta", "fecha_creacion", "fecha_resuelta"],
+            [(int(a), *row) for a, row in zip(alert_ids, alert_rows)],
+        )
+
+
+def _create_schema(url: str) -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    from db.schema_version import MIGRATIONS_DIR
+
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    command.upgrade(config, "head")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos a escala de producción")
+    parser.add_argument("--database-url", help="por defecto DATABASE_URL / POSTGRES_*")
+    parser.add_argument("--sedes", type=int, default=500)
+    parser.add_argument("--children", type=int, default=1_000_000)
+    parser.add_argument("--measurements", type=int, default=10_000_000, help="evaluaciones en total (aprox.)")
+    parser.add_argument("--followup-ratio", type=float, default=0.25,
+                        help="fracción de medidas registradas también como seguimiento")
+    parser.add_argument("--staff", type=int, default=200, help="nutricionistas a crear si no hay")
+    parser.add_argument("--staff-password", default="synthetic123")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--as-of", type=date.fromisoformat, default=date(2026, 1, 1), help="fecha de corte (AAAA-MM-DD)")
+    parser.add_argument("--batch-size", type=int, default=20_000, help="niños por lote (memoria y commit)")
+    parser.add_argument("--create-schema", action="store_true", help="ejecuta las migraciones antes de cargar")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    if args.database_url:
+        # core.config exige DATABASE_URL al importarse
+        os.environ["DATABASE_URL"] = args.database_url
+
+    from core.config import get_database_url
+    from db.session import _normalized_db_url
+
+    url = _normalized_db_url(args.database_url or get_database_url())
+    if args.create_schema:
+        _create_schema(url)
+
+    engine = create_engine(url, future=True)
+    if engine.dialect.name not in ("postgresql", "sqlite"):
+        parser.error(f"Dialecto no soportado: {engine.dialect.name}")
+
+    rng = np.random.default_rng(args.seed)
+    mean_measurements = args.measurements / max(args.children, 1)
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        dataset = SyntheticDataset(conn, rng, args.as_of, args.staff, args.staff_password)
+        dataset.loader.prepare()
+        dataset.create_sedes(args.sedes)
+        dataset.ensure_staff()
+        conn.commit()
+
+        done = 0
+        while done < args.children:
+            n = min(args.batch_size, args.children - done)
+            dataset.create_children(n, mean_measurements, args.followup_ratio)
+            conn.commit()
+            done += n
+            elapsed = time.perf_counter() - started
+            logger.info("%s/%s niños (%.0f filas/s)", done, args.children,
+                        sum(dataset.loader.rows_loaded.values()) / max(elapsed, 1e-9))
+
+        dataset.loader.finish([
+            (Sede.__table__, "id_sede"), (Acudiente.__table__, "id_acudiente"), (Infante.__table__, "id_infante"),
+            (Evaluation.__table__, "id"), (Seguimiento.__table__, "id_seguimiento"),
+            (DatoAntropometrico.__table__, "id_dato"), (Alerta.__table__, "id_alerta"),
+            (Usuario.__table__, "id_usuario"),
+        ])
+
+    logger.info("Filas cargadas en %.1f s: %s", time.perf_counter() - started, dataset.loader.rows_loaded)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
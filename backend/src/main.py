@@ -11,15 +11,15 @@ FastAPI main (modo dev, con DB opcional) para el Sistema de Evaluación Nutricio
 
 from contextlib import asynccontextmanager
 from pathlib import Path
+import hmac
 import importlib
 import logging
 import sys
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy import text  # para testear la conexión SQL
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 # --- Configuración de imports ---
 HERE = Path(__file__).parent.resolve()
@@ -50,15 +50,43 @@ except Exception:
 
 # ---------- DB opcional ----------
 _engine = None
-_SessionLocal = None
-_Base = None
 try:
-    from db.session import engine as _engine, SessionLocal as _SessionLocal  # type: ignore
-    from db.base import Base as _Base  # type type: ignore
+    from db.session import engine as _engine  # type: ignore
 except Exception:
     # correremos sin DB si no está disponible
     pass
 
+# ---------- Probe de salud en segundo plano ----------
+_health_probe = None
+try:
+    from core.health import HealthProbe  # type: ignore
+    try:
+        from db.session import replicas as _replicas  # type: ignore
+    except Exception:
+        _replicas = None
+    _health_probe = HealthProbe(
+        engine=_engine,
+        replica_set=_replicas,
+        interval=getattr(settings, "HEALTH_PROBE_INTERVAL_SECONDS", 10),
+        max_staleness=getattr(settings, "HEALTH_MAX_STALENESS_SECONDS", 30),
+    )
+except Exception:
+    _health_probe = None
+
+# ---------- Executors compartidos (process pool) ----------
+try:
+    from core.executors import shutdown_executors as _shutdown_executors  # type: ignore
+except Exception:
+    _shutdown_executors = None
+
+# ---------- Métricas (Prometheus) ----------
+_render_metrics = None
+try:
+    if getattr(settings, "METRICS_ENABLED", True):
+        from core.metrics import render_prometheus as _render_metrics, PROMETHEUS_CONTENT_TYPE  # type: ignore
+except Exception:
+    _render_metrics = None
+
 # ---------- Logging ----------
 logging.basicConfig(
     level=logging.INFO,
@@ -67,6 +95,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger("nutritional-api")
 
+# ---------- Modelos ML ----------
+# Se cargan en el lifespan de cada worker; los .npy/.joblib van con
+# mmap_mode="r", así que sus páginas se comparten vía page cache del SO.
+_model_registry = None
+try:
+    from services.model_registry import get_model_registry  # type: ignore
+    _model_registry = get_model_registry()
+except Exception as e:
+    logger.warning(f"Registro de modelos no disponible: {e}")
+    _model_registry = None
+
 # ---------- Cargar routers ----------
 def _try_import_router(candidates, attr: str = "router"):
     """
@@ -92,6 +131,8 @@ auth_router         = _try_import_router(["api.auth", "src.api.auth"])
 followups_router    = _try_import_router(["api.followups", "src.api.followups"])
 reports_router      = _try_import_router(["api.reports", "src.api.reports"])
 import_excel_router = _try_import_router(["api.import_excel", "src.api.import_excel"])
+ml_router           = _try_import_router(["api.ml", "src.api.ml"])
+admin_router        = _try_import_router(["api.admin", "src.api.admin"])
 users_router        = _try_import_router(["api.users", "src.api.users"])  
 evaluations_router  = _try_import_router(["api.evaluations", "src.api.evaluations"]) # <--- AÑADIDO
 
@@ -99,15 +140,27 @@ evaluations_router  = _try_import_router(["api.evaluations", "src.api.evaluation
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Iniciando Nutritional Assessment API...")
-    # Crear tablas si hay DB
-    if _engine and _Base:
+    # El esquema lo crean las migraciones (alembic upgrade head); aquí solo
+    # se comprueba que la base de datos esté en la última revisión
+    if _engine:
         try:
-            _Base.metadata.create_all(bind=_engine)
-            logger.info("Tablas creadas OK")
+            from db.schema_version import check_schema_revision  # type: ignore
         except Exception as e:
-            logger.error(f"Error creando tablas: {e}")
+            logger.warning(f"No se pudo verificar la revisión del esquema: {e}")
+        else:
+            check_schema_revision(_engine, strict=getattr(settings, "DB_SCHEMA_STRICT", False))
+    # Modelos ML
+    if _model_registry:
+        _model_registry.load_all()
+        logger.info(f"Modelos ML: {_model_registry.report()}")
+    if _health_probe:
+        await _health_probe.start()
     yield
     logger.info("Apagando Nutritional Assessment API...")
+    if _health_probe:
+        await _health_probe.stop()
+    if _shutdown_executors:
+        _shutdown_executors()
 
 # ---------- App ----------
 app = FastAPI(
@@ -124,6 +177,19 @@ app.add_middleware(
     TrustedHostMiddleware,
     allowed_hosts=ALLOWED_HOSTS if ALLOWED_HOSTS else ["*"]
 )
+# Rate limiting por IP/cuenta: dentro de CORS (los 429 llevan cabeceras CORS)
+# pero antes del router, el hash de contraseñas y la base de datos
+try:
+    from core.rate_limit import RateLimitMiddleware, create_bucket_store, default_rules, parse_networks  # type: ignore
+    if getattr(settings, "RATE_LIMIT_ENABLED", True):
+        app.add_middleware(
+            RateLimitMiddleware,
+            rules=default_rules(settings),
+            store=create_bucket_store(settings.RATE_LIMIT_BACKEND),
+            trusted_proxies=parse_networks(getattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", "127.0.0.1,::1")),
+        )
+except Exception as e:
+    logger.warning(f"Rate limiting no disponible: {e}")
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ALLOWED_ORIGINS if ALLOWED_ORIGINS else ["*"],
@@ -131,38 +197,104 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Límite del cuerpo multipart (por ruta): se aborta antes de parsear el formulario completo
+try:
+    from core.uploads import UploadSizeLimitMiddleware, upload_route_limits  # type: ignore
+    app.add_middleware(
+        UploadSizeLimitMiddleware,
+        max_body_size=getattr(settings, "MAX_UPLOAD_REQUEST_SIZE", 200 * 1024 * 1024),
+        route_limits=upload_route_limits(),
+    )
+except Exception as e:
+    logger.warning(f"Límite de subidas no disponible: {e}")
+# Compresión gzip/brotli de respuestas grandes (excepto PDF, XLSX, imágenes...)
+try:
+    if getattr(settings, "COMPRESSION_ENABLED", True):
+        from core.compression import CompressionMiddleware  # type: ignore
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=getattr(settings, "COMPRESSION_MIN_SIZE", 1024),
+            gzip_level=getattr(settings, "COMPRESSION_GZIP_LEVEL", 6),
+            brotli_quality=getattr(settings, "COMPRESSION_BROTLI_QUALITY", 5),
+            cache_max_bytes=getattr(settings, "COMPRESSION_CACHE_MAX_BYTES", 32 * 1024 * 1024),
+        )
+except Exception as e:
+    logger.warning(f"Compresión de respuestas no disponible: {e}")
+# Perfilado SQL por petición (Server-Timing, N+1) solo si está activado
+try:
+    if getattr(settings, "SQL_PROFILER_ENABLED", False):
+        from core.sql_profiler import SQLProfilerMiddleware  # type: ignore
+        app.add_middleware(
+            SQLProfilerMiddleware,
+            n_plus_one_threshold=getattr(settings, "SQL_PROFILER_N1_THRESHOLD", 5),
+        )
+except Exception as e:
+    logger.warning(f"Perfilado SQL no disponible: {e}")
+# Perfilado por muestreo (X-Profile firmada, fracción aleatoria, peticiones lentas)
+try:
+    if getattr(settings, "PROFILER_ENABLED", True):
+        from core.request_profiler import PROFILES, RequestProfilerMiddleware  # type: ignore
+        app.add_middleware(
+            RequestProfilerMiddleware,
+            store=PROFILES,
+            sample_rate=getattr(settings, "PROFILER_SAMPLE_RATE", 0.0),
+            slow_threshold_ms=getattr(settings, "PROFILER_SLOW_THRESHOLD_MS", 2000),
+            interval_ms=getattr(settings, "PROFILER_INTERVAL_MS", 5),
+            max_samples=getattr(settings, "PROFILER_MAX_SAMPLES", 2000),
+        )
+except Exception as e:
+    logger.warning(f"Perfilado de peticiones no disponible: {e}")
+# Métricas HTTP por ruta: el más externo, para medir también a los demás middlewares
+try:
+    if _render_metrics:
+        from core.http_metrics import HTTPMetricsMiddleware  # type: ignore
+        app.add_middleware(HTTPMetricsMiddleware)
+except Exception as e:
+    logger.warning(f"Métricas HTTP no disponibles: {e}")
 
 # ---------- Endpoints base ----------
 @app.get("/health")
 async def health_check():
     """
-    Verifica el estado general y la conexión con la base de datos.
+    Readiness: devuelve la última foto del probe en segundo plano
+    (base de datos, pool, réplicas, Redis). No abre conexiones.
     """
-    try:
-        db_ok = False
-        if _SessionLocal:
-            db = _SessionLocal()
-            db.execute(text("SELECT 1"))
-            db.close()
-            db_ok = True
-
-        return {
-            "status": "healthy",
-            "service": "nutritional-assessment-api",
-            "version": "1.0.0",
-            "environment": ENV,
-            "db": db_ok,
-        }
-
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        raise HTTPException(status_code=503, detail="Service unavailable")
+    body = {
+        "service": "nutritional-assessment-api",
+        "version": "1.0.0",
+        "environment": ENV,
+    }
+    if _health_probe is None:
+        return {"status": "healthy", **body, "db": None}
+
+    snapshot = _health_probe.snapshot()
+    db_check = snapshot.get("checks", {}).get("db")
+    body.update(snapshot, db=db_check["ok"] if db_check else None)
+    if not snapshot["ready"]:
+        return JSONResponse(status_code=503, content=body)
+    return body
 
 
 @app.get("/healthz")
 async def healthz_check():
-    """Alias para Docker healthcheck"""
-    return await health_check()
+    """Liveness (Docker/nginx): solo comprueba que el proceso responde."""
+    return {
+        "status": "alive",
+        "uptime_seconds": round(_health_probe.uptime(), 1) if _health_probe else None,
+    }
+
+
+if _render_metrics:
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics(request: Request):
+        """
+        Métricas de este worker en formato de texto de Prometheus. Síncrono:
+        algunos gauges consultan la base de datos (con TTL).
+        """
+        token = getattr(settings, "METRICS_TOKEN", None)
+        if token and not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {token}"):
+            return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+        return PlainTextResponse(_render_metrics(), headers={"Content-Type": PROMETHEUS_CONTENT_TYPE})
 
 
 @app.get("/")
@@ -173,6 +305,7 @@ async def root():
         "version": "1.0.0",
         "docs": "/docs" if ENV == "development" else "Documentation disabled in production",
         "health": "/health",
+        "metrics": "/metrics" if _render_metrics else None,
     }
 
 # ---------- Registro de routers ----------
@@ -186,6 +319,10 @@ if reports_router:
     app.include_router(reports_router, prefix="/api/reports", tags=["reports"])
 if import_excel_router:
     app.include_router(import_excel_router, prefix="/api/import", tags=["import"])
+if ml_router:
+    app.include_router(ml_router, prefix="/api/ml", tags=["ml"])
+if admin_router:
+    app.include_router(admin_router, prefix="/api/admin", tags=["admin"])
 if users_router:  
     app.include_router(users_router, prefix="/api/users", tags=["users"])
 if evaluations_router: # <--- REGISTRADO
@@ -1,37 +1,193 @@
 # Excel processing service
+import os
+import tempfile
 import pandas as pd
-from typing import List, Dict, Any
+from datetime import date
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Union
 from io import BytesIO
 
+REQUIRED_COLUMNS = ['name', 'birth_date', 'gender', 'guardian_name']
+VALID_GENDERS = {'M', 'F'}
+
+
+def _validate_row(row: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Validate and normalize one spreadsheet row. Returns (data, error)."""
+    missing = [c for c in REQUIRED_COLUMNS if pd.isna(row.get(c)) or str(row.get(c)).strip() == '']
+    if missing:
+        return None, f"Missing values: {', '.join(missing)}"
+
+    birth_date = pd.to_datetime(row['birth_date'], errors='coerce')
+    if pd.isna(birth_date):
+        return None, f"Invalid birth_date: {row['birth_date']}"
+    birth_date = birth_date.date()
+    if birth_date > date.today():
+        return None, "birth_date is in the future"
+
+    gender = str(row['gender']).strip().upper()[:1]
+    if gender not in VALID_GENDERS:
+        return None, f"Invalid gender: {row['gender']}"
+
+    data = {
+        'name': str(row['name']).strip(),
+        'birth_date': birth_date.isoformat(),
+        'gender': gender,
+        'guardian_name': str(row['guardian_name']).strip(),
+    }
+    for optional in ('guardian_phone', 'address', 'community'):
+        value = row.get(optional)
+        data[optional] = None if pd.isna(value) else str(value).strip()
+    return data, None
+
+
+def _parse_sheet_range(path: str, sheet_name: str, sheet_index: int,
+                       start_row: int, nrows: Optional[int]) -> Dict[str, Any]:
+    """
+    Parse and validate a row range of one sheet.
+    Runs inside the process pool, so it must stay a top-level function.
+    `start_row` is 0-based and relative to the first data row (after the header).
+    """
+    df = pd.read_excel(
+        path,
+        sheet_name=sheet_name,
+        skiprows=range(1, start_row + 1) if start_row else None,
+        nrows=nrows,
+    )
+    df.columns = [str(c).strip().lower() for c in df.columns]
+
+    result = {
+        'sheet': sheet_name,
+        'sheet_index': sheet_index,
+        'start_row': start_row,
+        'rows': len(df),
+        'data': [],
+        'errors': [],
+    }
+
+    missing_columns = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing_columns:
+        if start_row == 0:
+            result['errors'].append({
+                'sheet': sheet_name,
+                'row': 1,
+                'error': f"Missing required columns: {', '.join(missing_columns)}",
+            })
+        return result
+
+    # Excel row number = header (1) + 1-based data offset
+    first_excel_row = start_row + 2
+    for offset, row in enumerate(df.to_dict(orient='records')):
+        excel_row = first_excel_row + offset
+        data, error = _validate_row(row)
+        if error:
+            result['errors'].append({'sheet': sheet_name, 'row': excel_row, 'error': error})
+        else:
+            data['sheet'] = sheet_name
+            data['row'] = excel_row
+            result['data'].append(data)
+    return result
+
+
 class ExcelService:
-    
+
     @staticmethod
-    def process_children_excel(file_content: bytes) -> Dict[str, Any]:
-        """Process Excel file with children data"""
+    def plan_workbook(path: str, chunk_rows: int, workers: int) -> List[Tuple[str, int, int, Optional[int]]]:
+        """
+        Split a workbook into parse tasks: (sheet_name, sheet_index, start_row, nrows).
+        Big sheets are split into row ranges only when there are idle workers,
+        since every range re-streams the sheet up to its start row.
+        """
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True)
         try:
-            df = pd.read_excel(BytesIO(file_content))
-            
-            # TODO: Validate required columns
-            required_columns = ['name', 'birth_date', 'gender', 'guardian_name']
-            
-            # TODO: Process and validate data
-            processed_data = []
-            errors = []
-            
-            return {
-                "success": True,
-                "processed_count": len(processed_data),
-                "error_count": len(errors),
-                "data": processed_data,
-                "errors": errors
-            }
-            
+            sheets = [(ws.title, ws.max_row) for ws in wb.worksheets]
+        finally:
+            wb.close()
+
+        split = len(sheets) < workers
+        tasks = []
+        for index, (name, max_row) in enumerate(sheets):
+            data_rows = (max_row - 1) if max_row else None
+            if not split or not data_rows or data_rows <= chunk_rows:
+                tasks.append((name, index, 0, None))
+                continue
+            for start in range(0, data_rows, chunk_rows):
+                tasks.append((name, index, start, chunk_rows))
+        return tasks
+
+    @staticmethod
+    def process_children_excel(file_content: Union[bytes, str, Path]) -> Dict[str, Any]:
+        """
+        Process Excel file with children data.
+        Sheets (or row ranges of big sheets) are parsed in parallel in the shared
+        process pool and merged in workbook order.
+        """
+        from core.config import settings
+        from core.executors import get_process_pool, process_pool_size
+
+        tmp_path = None
+        try:
+            if isinstance(file_content, (bytes, bytearray)):
+                # Workers read from disk instead of receiving a pickled copy of the file
+                fd, tmp_path = tempfile.mkstemp(suffix='.xlsx', dir=settings.UPLOAD_DIR)
+                with os.fdopen(fd, 'wb') as fh:
+                    fh.write(file_content)
+                path = tmp_path
+            else:
+                path = str(file_content)
+
+            workers = process_pool_size()
+            tasks = ExcelService.plan_workbook(path, settings.EXCEL_CHUNK_ROWS, workers)
+
+            if len(tasks) == 1 or workers == 1:
+                parts = [_parse_sheet_range(path, *task) for task in tasks]
+            else:
+                pool = get_process_pool()
+                futures = [pool.submit(_parse_sheet_range, path, *task) for task in tasks]
+                parts = [f.result() for f in futures]
+
+            return ExcelService.merge_results(parts)
+
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e)
             }
-    
+        finally:
+            if tmp_path:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def merge_results(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Merge per-range results into one import report (workbook order)."""
+        parts = sorted(parts, key=lambda p: (p['sheet_index'], p['start_row']))
+
+        processed_data = []
+        errors = []
+        sheets: Dict[str, Dict[str, Any]] = {}
+        for part in parts:
+            processed_data.extend(part['data'])
+            errors.extend(part['errors'])
+            summary = sheets.setdefault(part['sheet'], {
+                'sheet': part['sheet'], 'rows': 0, 'processed': 0, 'errors': 0,
+            })
+            summary['rows'] += part['rows']
+            summary['processed'] += len(part['data'])
+            summary['errors'] += len(part['errors'])
+
+        return {
+            "success": True,
+            "processed_count": len(processed_data),
+            "error_count": len(errors),
+            "sheets": list(sheets.values()),
+            "data": processed_data,
+            "errors": errors
+        }
+
     @staticmethod
     def generate_template() -> bytes:
         """Generate Excel template for data import"""
@@ -45,7 +201,7 @@ class ExcelService:
             'address': ['Dirección ejemplo'],
             'community': ['Comunidad ejemplo']
         }
-        
+
         df = pd.DataFrame(template_data)
         output = BytesIO()
         df.to_excel(output, index=False)
@@ -0,0 +1,257 @@
+# Batch growth forecasting service
+"""
+Forecasts weight and height at the next visit for every child in one pass.
+
+All evaluation series are loaded with a single query, packed into padded
+(children x points) NumPy arrays and fitted with recency-weighted least
+squares on age vs z-score, vectorized across children. Results are stored in
+`pronosticos_crecimiento` so the API only reads precomputed rows.
+
+The WHO reference covers 0-60 months: measurements past that are ignored, and
+children whose next visit would fall past it get no forecast.
+
+Nightly run (from backend/src):
+    python -m services.growth_forecast
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from db.models import Evaluation, Infante, PronosticoCrecimiento
+from services.nutrition_service import MAX_REFERENCE_AGE, NutritionService
+
+logger = logging.getLogger(__name__)
+
+DAYS_PER_MONTH = 30.4375
+# Weight-for-age z-score change per month that counts as a trend
+TREND_SLOPE = 0.05
+# Next visit horizon bounds (months)
+MIN_INTERVAL, MAX_INTERVAL = 1.0, 6.0
+STORE_CHUNK = 5000
+
+
+@dataclass
+class SeriesBatch:
+    """Padded per-child series; row i holds the last points of child_ids[i], oldest first."""
+    child_ids: np.ndarray  # (C,)
+    age: np.ndarray        # (C, T) age in months
+    weight: np.ndarray     # (C, T) kg
+    height: np.ndarray     # (C, T) cm
+    mask: np.ndarray       # (C, T) True where there is a measurement
+    sex: Optional[np.ndarray] = None  # (C,) 'M'/'F'; None = unknown
+
+
+class GrowthForecastService:
+
+    @staticmethod
+    def pack_series(child_ids: np.ndarray, age: np.ndarray, weight: np.ndarray,
+                    height: np.ndarray, max_points: int, sex: Optional[np.ndarray] = None) -> SeriesBatch:
+        """
+        Pack flat measurements (sorted by child, then age) into padded arrays,
+        keeping the last `max_points` measurements of each child. `sex` is
+        per measurement, like the other inputs.
+        """
+        ids, starts, counts = np.unique(child_ids, return_index=True, return_counts=True)
+        group = np.repeat(np.arange(len(ids)), counts)
+        position = np.arange(len(child_ids)) - starts[group]
+        column = position - np.maximum(counts - max_points, 0)[group]
+        keep = column >= 0
+
+        width = int(min(max_points, counts.max())) if len(ids) else 0
+        shape = (len(ids), width)
+        batch = SeriesBatch(
+            child_ids=ids,
+            age=np.zeros(shape),
+            weight=np.zeros(shape),
+            height=np.zeros(shape),
+            mask=np.zeros(shape, dtype=bool),
+            sex=sex[starts] if sex is not None else None,
+        )
+        rows, cols = group[keep], column[keep]
+        batch.age[rows, cols] = age[keep]
+        batch.weight[rows, cols] = weight[keep]
+        batch.height[rows, cols] = height[keep]
+        batch.mask[rows, cols] = True
+        return batch
+
+    @staticmethod
+    def fit_wls(x: np.ndarray, y: np.ndarray, w: np.ndarray):
+        """Row-wise weighted least squares y = a + b x. Returns (a, b, weighted residual SD)."""
+        sw = w.sum(axis=1)
+        sx = (w * x).sum(axis=1)
+        sy = (w * y).sum(axis=1)
+        sxx = (w * x * x).sum(axis=1)
+        sxy = (w * x * y).sum(axis=1)
+
+        den = sw * sxx - sx * sx
+        ok = den > 1e-9
+        slope = np.where(ok, (sw * sxy - sx * sy) / np.where(ok, den, 1.0), 0.0)
+        safe_sw = np.maximum(sw, 1e-12)
+        intercept = (sy - slope * sx) / safe_sw
+        resid = y - (intercept[:, None] + slope[:, None] * x)
+        resid_sd = np.sqrt((w * resid * resid).sum(axis=1) / safe_sw)
+        return intercept, slope, resid_sd
+
+    @staticmethod
+    def within_reference(batch: SeriesBatch) -> SeriesBatch:
+        """
+        Drop measurements past the reference range. Ages are sorted, so they
+        are the trailing columns and the kept ones still start at column 0.
+        Children left without measurements are removed.
+        """
+        mask = batch.mask & (batch.age <= MAX_REFERENCE_AGE)
+        keep = mask.any(axis=1)
+        return SeriesBatch(
+            child_ids=batch.child_ids[keep],
+            age=batch.age[keep],
+            weight=batch.weight[keep],
+            height=batch.height[keep],
+            mask=mask[keep],
+            sex=batch.sex[keep] if batch.sex is not None else None,
+        )
+
+    @staticmethod
+    def forecast(batch: SeriesBatch, recency_months: float) -> Dict[str, np.ndarray]:
+        """Vectorized forecast for every child in `batch` whose next visit is within the reference."""
+        if batch.mask.size:
+            batch = GrowthForecastService.within_reference(batch)
+        if batch.mask.size == 0:
+            keys = ("child_ids", "target_age", "weight", "height", "trend", "slope", "confidence", "points")
+            return {k: np.zeros(0) for k in keys}
+
+        rows = np.arange(len(batch.child_ids))
+        n = batch.mask.sum(axis=1)
+        last_age = batch.age[rows, n - 1]
+        first_age = batch.age[:, 0]
+        interval = np.where(n > 1, (last_age - first_age) / np.maximum(n - 1, 1), MIN_INTERVAL)
+        interval = np.clip(interval, MIN_INTERVAL, MAX_INTERVAL)
+        target_age = last_age + interval
+
+        # Ages relative to the last visit (<= 0) so the intercept is "now"
+        x = np.where(batch.mask, batch.age - last_age[:, None], 0.0)
+        w = np.where(batch.mask, np.exp(x / recency_months), 0.0)
+
+        sex = batch.sex[:, None] if batch.sex is not None else None
+        z_weight = np.where(batch.mask, NutritionService.zscore("weight", batch.age, batch.weight, sex), 0.0)
+        z_height = np.where(batch.mask, NutritionService.zscore("height", batch.age, batch.height, sex), 0.0)
+        a_w, b_w, sd_w = GrowthForecastService.fit_wls(x, z_weight, w)
+        a_h, b_h, _ = GrowthForecastService.fit_wls(x, z_height, w)
+
+        sex = batch.sex
+        weight = NutritionService.from_zscore("weight", target_age, a_w + b_w * interval, sex)
+        height = NutritionService.from_zscore("height", target_age, a_h + b_h * interval, sex)
+
+        trend = np.full(len(rows), "stable", dtype=object)
+        trend[b_w > TREND_SLOPE] = "improving"
+        trend[b_w < -TREND_SLOPE] = "declining"
+        confidence = np.clip((1 - 1 / (n + 1)) * np.exp(-sd_w), 0.3, 0.95)
+
+        # No extrapolation past the reference: no forecast for those children
+        ok = target_age <= MAX_REFERENCE_AGE
+        return {
+            "child_ids": batch.child_ids[ok],
+            "target_age": target_age[ok],
+            "weight": np.round(weight, 2)[ok],
+            "height": np.round(height, 2)[ok],
+            "trend": trend[ok],
+            "slope": b_w[ok],
+            "confidence": np.round(confidence, 2)[ok],
+            "points": n[ok],
+        }
+
+    @staticmethod
+    def load_series(db: Session, max_points: int) -> SeriesBatch:
+        """Fetch every child's evaluations in one query and pack them."""
+        stmt = (
+            select(
+                Evaluation.child_id,
+                Evaluation.fecha,
+                Evaluation.peso_kg,
+                Evaluation.talla_cm,
+                Infante.fecha_nacimiento,
+                Infante.genero,
+            )
+            .join(Infante, Infante.id_infante == Evaluation.child_id)
+            .order_by(Evaluation.child_id, Evaluation.fecha, Evaluation.id)
+        )
+        rows = db.execute(stmt).all()
+        if not rows:
+            empty = np.zeros((0, 0))
+            return SeriesBatch(np.zeros(0, dtype=np.int64), empty, empty, empty, empty.astype(bool))
+
+        child_ids, fechas, pesos, tallas, nacimientos, generos = zip(*rows)
+        days = np.array(fechas, dtype="datetime64[D]") - np.array(nacimientos, dtype="datetime64[D]")
+        return GrowthForecastService.pack_series(
+            np.array(child_ids, dtype=np.int64),
+            days.astype(np.float64) / DAYS_PER_MONTH,
+            np.array(pesos, dtype=np.float64),
+            np.array(tallas, dtype=np.float64),
+            max_points,
+            sex=np.array(generos, dtype=object),
+        )
+
+    @staticmethod
+    def store(db: Session, result: Dict[str, np.ndarray]) -> int:
+        """Replace the stored forecasts with `result` in one transaction."""
+        now = datetime.now(timezone.utc)
+        rows: List[Dict[str, Any]] = [
+            {
+                "infante_id": int(cid),
+                "edad_meses_objetivo": float(age),
+                "peso_predicho": float(weight),
+                "talla_predicha": float(height),
+                "tendencia": trend,
+                "pendiente_z_peso": float(slope),
+                "confianza": float(conf),
+                "mediciones": int(points),
+                "fecha_calculo": now,
+            }
+            for cid, age, weight, height, trend, slope, conf, points in zip(
+                result["child_ids"], result["target_age"], result["weight"], result["height"],
+                result["trend"], result["slope"], result["confidence"], result["points"],
+            )
+        ]
+        db.execute(delete(PronosticoCrecimiento))
+        for i in range(0, len(rows), STORE_CHUNK):
+            db.execute(insert(PronosticoCrecimiento), rows[i:i + STORE_CHUNK])
+        db.commit()
+        return len(rows)
+
+    @staticmethod
+    def run(db: Session) -> Dict[str, Any]:
+        """Load, forecast and store for all children. Returns timing info."""
+        from core.config import settings
+
+        t0 = time.perf_counter()
+        batch = GrowthForecastService.load_series(db, settings.FORECAST_MAX_POINTS)
+        t1 = time.perf_counter()
+        result = GrowthForecastService.forecast(batch, settings.FORECAST_RECENCY_MONTHS)
+        t2 = time.perf_counter()
+        stored = GrowthForecastService.store(db, result)
+        t3 = time.perf_counter()
+
+        summary = {
+            "children": stored,
+            "load_seconds": round(t1 - t0, 3),
+            "fit_seconds": round(t2 - t1, 3),
+            "store_seconds": round(t3 - t2, 3),
+        }
+        logger.info("Growth forecast run: %s", summary)
+        return summary
+
+
+if __name__ == "__main__":
+    from db.session import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    session = SessionLocal()
+    try:
+        print(GrowthForecastService.run(session))
+    finally:
+        session.close()
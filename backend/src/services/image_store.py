@@ -0,0 +1,184 @@
+# Content-addressed image store
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from core.uploads import sniff_mime
+
+_EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/gif": ".gif"}
+
+
+def image_extension(data: bytes) -> str:
+    return _EXTENSIONS.get(sniff_mime(data[:16]), ".bin")
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """Write to a temp file in the same directory and rename into place."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+@dataclass(frozen=True)
+class StoredImage:
+    sha256: str
+    path: Path
+    size: int
+    created: bool  # False when the content was already stored
+
+
+class ImageStore:
+    """
+    Stores uploaded images by sha256 under sharded directories:
+
+        <root>/images/ab/cd/abcd...<ext>
+        <root>/thumbnails/ab/cd/abcd....jpg
+        <root>/analysis/ab/cd/abcd....<kind>.<model_version>.json
+
+    Identical uploads are written once; thumbnails are generated on first
+    request; analysis results are cached per (hash, kind, model version)
+    in memory (LRU) and on disk.
+    """
+
+    def __init__(self, root: Path, thumbnail_size: int = 256, cache_entries: int = 4096):
+        self.root = Path(root)
+        self.thumbnail_size = thumbnail_size
+        self.cache_entries = cache_entries
+        self._analysis: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---------- Paths ----------
+    def _shard(self, kind: str, sha256: str) -> Path:
+        return self.root / kind / sha256[:2] / sha256[2:4]
+
+    def image_path(self, sha256: str) -> Optional[Path]:
+        shard = self._shard("images", sha256)
+        for candidate in shard.glob(f"{sha256}.*"):
+            return candidate
+        return None
+
+    def thumbnail_path(self, sha256: str) -> Path:
+        return self._shard("thumbnails", sha256) / f"{sha256}.jpg"
+
+    def _analysis_path(self, sha256: str, kind: str, version: str) -> Path:
+        return self._shard("analysis", sha256) / f"{sha256}.{kind}.{version}.json"
+
+    # ---------- Images ----------
+    @staticmethod
+    def hash(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def put(self, data: bytes, sha256: Optional[str] = None) -> StoredImage:
+        """Store `data` unless the same content already exists."""
+        sha256 = sha256 or self.hash(data)
+        path = self._shard("images", sha256) / f"{sha256}{image_extension(data)}"
+        if path.exists():
+            return StoredImage(sha256, path, len(data), created=False)
+        _atomic_write(path, data)
+        return StoredImage(sha256, path, len(data), created=True)
+
+    def put_file(self, path: Path, sha256: str) -> StoredImage:
+        """
+        Move an already written temp file (e.g. a streamed upload) into the
+        store; the temp file is dropped when the content already exists.
+        It must live on the same filesystem (UPLOAD_DIR) for the rename.
+        """
+        with open(path, "rb") as fh:
+            head = fh.read(16)
+        size = os.path.getsize(path)
+        target = self._shard("images", sha256) / f"{sha256}{image_extension(head)}"
+        if target.exists():
+            os.remove(path)
+            return StoredImage(sha256, target, size, created=False)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, target)
+        return StoredImage(sha256, target, size, created=True)
+
+    def thumbnail(self, sha256: str) -> Optional[Path]:
+        """Return the thumbnail path, generating it the first time."""
+        thumb = self.thumbnail_path(sha256)
+        if thumb.exists():
+            return thumb
+        source = self.image_path(sha256)
+        if source is None:
+            return None
+
+        img = cv2.imdecode(np.fromfile(str(source), np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            return None
+        h, w = img.shape[:2]
+        scale = self.thumbnail_size / max(h, w)
+        if scale < 1:
+            img = cv2.resize(img, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        if not ok:
+            return None
+        _atomic_write(thumb, encoded.tobytes())
+        return thumb
+
+    # ---------- Analysis cache ----------
+    def get_analysis(self, sha256: str, kind: str, version: str) -> Optional[Dict[str, Any]]:
+        key = (sha256, kind, version)
+        with self._lock:
+            if key in self._analysis:
+                self._analysis.move_to_end(key)
+                return self._analysis[key]
+
+        path = self._analysis_path(sha256, kind, version)
+        try:
+            result = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        self._remember(key, result)
+        return result
+
+    def set_analysis(self, sha256: str, kind: str, version: str, result: Dict[str, Any]) -> None:
+        if "error" in result:
+            return  # failures are not cached
+        _atomic_write(self._analysis_path(sha256, kind, version), json.dumps(result).encode("utf-8"))
+        self._remember((sha256, kind, version), result)
+
+    def _remember(self, key: Tuple[str, str, str], result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._analysis[key] = result
+            self._analysis.move_to_end(key)
+            while len(self._analysis) > self.cache_entries:
+                self._analysis.popitem(last=False)
+
+
+_store: Optional[ImageStore] = None
+_store_lock = threading.Lock()
+
+
+def get_image_store() -> ImageStore:
+    """Shared store rooted at settings.UPLOAD_DIR."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from core.config import settings
+
+                _store = ImageStore(
+                    Path(settings.UPLOAD_DIR),
+                    thumbnail_size=settings.IMAGE_THUMBNAIL_SIZE,
+                    cache_entries=settings.ANALYSIS_CACHE_ENTRIES,
+                )
+    return _store
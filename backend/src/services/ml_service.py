@@ -1,58 +1,301 @@
 # Machine learning and image processing service
 import cv2
 import numpy as np
-from typing import Dict, Any, Optional, List
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple, Union
+
+# Image input: raw bytes or a path on disk (paths are what gets shipped to the pool)
+ImageSource = Union[bytes, str, Path]
+
+# Input size for the image analyzers (square, RGB)
+IMAGE_SIZE = 224
+
+# Below this batch size decoding inline is cheaper than shipping bytes to the pool
+MIN_POOL_BATCH = 8
+
+# Version reported when no trained model is loaded: the analyzers then return
+# "unknown" with model_unavailable=True, never a clinical label. When a trained
+# model named "eye"/"gum" is present in MODEL_DIR its version (file hash) is
+# used instead; a different version invalidates the cached analyses.
+MODEL_VERSIONS = {
+    "eye": "no-model",
+    "gum": "no-model",
+}
+
+EYE_RECOMMENDATIONS = {
+    "low": ["Continue monitoring"],
+    "medium": ["Repeat screening in 1 month", "Review iron intake"],
+    "high": ["Refer for hemoglobin test", "Review iron intake"],
+}
+
+GUM_INDICATORS = {
+    "normal": [],
+    "pale": ["possible_iron_deficiency"],
+    "inflamed": ["possible_vitamin_c_deficiency"],
+}
+
+
+def preprocess_image(image: Union[bytes, str, Path], size: int = IMAGE_SIZE) -> Optional[np.ndarray]:
+    """
+    Decode an image (raw bytes or a file path), resize it to `size`x`size`
+    and convert it to RGB (uint8).
+    """
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        nparr = np.frombuffer(image, np.uint8)
+    else:
+        try:
+            nparr = np.fromfile(str(image), np.uint8)
+        except OSError:
+            return None
+    if not nparr.size:
+        return None
+    try:
+        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    except cv2.error:
+        return None
+    if img is None:
+        return None
+    img = cv2.resize(img, (size, size), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def _preprocess_chunk(images: List[ImageSource], size: int) -> List[Optional[np.ndarray]]:
+    """Process-pool task: preprocess a chunk of images (uint8 keeps IPC small)."""
+    return [preprocess_image(b, size) for b in images]
+
 
 class MLService:
-    
+
+    @staticmethod
+    def preprocess_batch(images: List[ImageSource], size: int = IMAGE_SIZE) -> Tuple[np.ndarray, List[int]]:
+        """
+        Decode and normalize many images, in the shared process pool for big batches.
+        Returns the stacked float32 batch (N, size, size, 3) in [0, 1] and the
+        indexes of the inputs that decoded successfully.
+        """
+        if len(images) < MIN_POOL_BATCH:
+            decoded = _preprocess_chunk(images, size)
+        else:
+            from core.executors import get_process_pool, process_pool_size
+
+            pool = get_process_pool()
+            chunk = -(-len(images) // process_pool_size())
+            futures = [
+                pool.submit(_preprocess_chunk, images[i:i + chunk], size)
+                for i in range(0, len(images), chunk)
+            ]
+            decoded = [img for f in futures for img in f.result()]
+
+        valid = [i for i, img in enumerate(decoded) if img is not None]
+        if not valid:
+            return np.empty((0, size, size, 3), dtype=np.float32), valid
+        batch = np.stack([decoded[i] for i in valid]).astype(np.float32)
+        batch /= 255.0
+        return batch, valid
+
+    @staticmethod
+    def model(kind: str):
+        """Warm trained model for `kind` from the registry, or None."""
+        from services.model_registry import get_model_registry
+
+        return get_model_registry().get(kind)
+
+    @staticmethod
+    def model_version(kind: str) -> str:
+        loaded = MLService.model(kind)
+        return loaded.version if loaded else MODEL_VERSIONS[kind]
+
+    @staticmethod
+    def _predict(kind: str, batch: np.ndarray):
+        """
+        Run the trained model for `kind` on the batch features (mean RGB per image).
+        Returns (labels, confidences) or None when no model is loaded. Confidences
+        are the model's class probabilities, or None if it does not provide them.
+        """
+        loaded = MLService.model(kind)
+        if loaded is None:
+            return None
+        features = batch.mean(axis=(1, 2))
+        estimator = loaded.model
+        labels = estimator.predict(features)
+        confidence = None
+        if hasattr(estimator, "predict_proba"):
+            confidence = estimator.predict_proba(features).max(axis=1)
+        return labels, confidence
+
+    @staticmethod
+    def _confidence(confidence: Optional[np.ndarray], j: int) -> Optional[float]:
+        return round(float(confidence[j]), 2) if confidence is not None else None
+
+    @staticmethod
+    def analyze_eye_batch(images: List[ImageSource]) -> List[Dict[str, Any]]:
+        """Analyze many eye images for anemia detection in one stacked batch"""
+        results: List[Dict[str, Any]] = [
+            {"error": "Could not decode image", "anemia_risk": "unknown"} for _ in images
+        ]
+        batch, valid = MLService.preprocess_batch(images)
+        if not valid:
+            return results
+
+        predicted = MLService._predict("eye", batch)
+        if predicted is None:
+            # No validated model: no risk level, confidence or referral advice
+            for i in valid:
+                results[i] = {
+                    "anemia_risk": "unknown",
+                    "model_unavailable": True,
+                    "confidence": None,
+                    "recommendations": [],
+                }
+            return results
+
+        risk, confidence = predicted
+        for j, i in enumerate(valid):
+            results[i] = {
+                "anemia_risk": str(risk[j]),
+                "model_unavailable": False,
+                "confidence": MLService._confidence(confidence, j),
+                "recommendations": list(EYE_RECOMMENDATIONS.get(str(risk[j]), [])),
+            }
+        return results
+
+    @staticmethod
+    def analyze_gum_batch(images: List[ImageSource]) -> List[Dict[str, Any]]:
+        """Analyze many gum images for nutritional assessment in one stacked batch"""
+        results: List[Dict[str, Any]] = [
+            {"error": "Could not decode image", "gum_health": "unknown"} for _ in images
+        ]
+        batch, valid = MLService.preprocess_batch(images)
+        if not valid:
+            return results
+
+        predicted = MLService._predict("gum", batch)
+        if predicted is None:
+            for i in valid:
+                results[i] = {
+                    "gum_health": "unknown",
+                    "model_unavailable": True,
+                    "nutritional_indicators": [],
+                    "confidence": None,
+                }
+            return results
+
+        health, confidence = predicted
+        for j, i in enumerate(valid):
+            results[i] = {
+                "gum_health": str(health[j]),
+                "model_unavailable": False,
+                "nutritional_indicators": list(GUM_INDICATORS.get(str(health[j]), [])),
+                "confidence": MLService._confidence(confidence, j),
+            }
+        return results
+
+    @staticmethod
+    def analyze_stored(kind: str, images: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Store images in the content-addressed store and analyze them, reusing
+        cached results for content already analyzed with the current model version.
+        Items are raw bytes or streamed uploads (objects with `path` and `sha256`,
+        see core.uploads.StoredUpload); uploads are analyzed from disk and moved
+        into the store. Each result carries the image `sha256` and whether it
+        came from the cache.
+        """
+        from services.image_store import get_image_store
+
+        analyzers = {"eye": MLService.analyze_eye_batch, "gum": MLService.analyze_gum_batch}
+        store = get_image_store()
+        version = MLService.model_version(kind)
+
+        hashes = [getattr(item, "sha256", None) or store.hash(item) for item in images]
+        results: Dict[str, Dict[str, Any]] = {}
+        cached = set()
+        pending: Dict[str, Any] = {}
+        for sha, item in zip(hashes, images):
+            if sha in results or sha in pending:
+                continue
+            hit = store.get_analysis(sha, kind, version)
+            if hit is not None:
+                results[sha] = hit
+                cached.add(sha)
+            else:
+                pending[sha] = item
+
+        if pending:
+            sources = [getattr(item, "path", item) for item in pending.values()]
+            fresh = analyzers[kind](sources)
+            for (sha, item), result in zip(pending.items(), fresh):
+                if "error" not in result:
+                    if hasattr(item, "path"):
+                        store.put_file(item.path, sha)
+                    else:
+                        store.put(item, sha)
+                    store.set_analysis(sha, kind, version, result)
+                results[sha] = result
+
+        return [
+            {**results[sha], "sha256": sha, "cached": sha in cached, "model_version": version}
+            for sha in hashes
+        ]
+
     @staticmethod
     def analyze_eye_image(image_bytes: bytes) -> Dict[str, Any]:
         """Analyze eye image for anemia detection"""
         try:
-            # Convert bytes to OpenCV image
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            # TODO: Implement anemia detection algorithm
-            
-            return {
-                "anemia_risk": "low",
-                "confidence": 0.85,
-                "recommendations": ["Continue monitoring"]
-            }
-            
+            return MLService.analyze_eye_batch([image_bytes])[0]
+
         except Exception as e:
             return {
                 "error": str(e),
                 "anemia_risk": "unknown"
             }
-    
+
     @staticmethod
     def analyze_gum_image(image_bytes: bytes) -> Dict[str, Any]:
         """Analyze gum image for nutritional assessment"""
         try:
-            # TODO: Implement gum analysis
-            
-            return {
-                "gum_health": "normal",
-                "nutritional_indicators": [],
-                "confidence": 0.80
-            }
-            
+            return MLService.analyze_gum_batch([image_bytes])[0]
+
         except Exception as e:
             return {
                 "error": str(e),
                 "gum_health": "unknown"
             }
-    
+
     @staticmethod
-    def predict_growth_trend(historical_data: List[Dict]) -> Dict[str, Any]:
-        """Predict growth trends based on historical data"""
-        # TODO: Implement growth prediction model
-        
-        return {
+    def predict_growth_trend(historical_data: List[Dict], sex: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Predict growth trends based on historical data.
+        Each item: {"age_months": float, "weight": kg, "height": cm}; `sex` is 'M'/'F'.
+        Uses the same fit as the nightly batch forecaster (services.growth_forecast),
+        so there is no prediction past the 0-60 month WHO reference.
+        """
+        from core.config import settings
+        from services.growth_forecast import GrowthForecastService
+
+        no_prediction = {
             "predicted_weight": 0.0,
             "predicted_height": 0.0,
             "trend": "stable",
-            "confidence": 0.75
+            "confidence": 0.0
+        }
+        points = sorted(historical_data, key=lambda d: d["age_months"])
+        if not points:
+            return no_prediction
+
+        batch = GrowthForecastService.pack_series(
+            np.zeros(len(points), dtype=np.int64),
+            np.array([d["age_months"] for d in points], dtype=np.float64),
+            np.array([d["weight"] for d in points], dtype=np.float64),
+            np.array([d["height"] for d in points], dtype=np.float64),
+            settings.FORECAST_MAX_POINTS,
+            sex=np.full(len(points), sex, dtype=object),
+        )
+        result = GrowthForecastService.forecast(batch, settings.FORECAST_RECENCY_MONTHS)
+        if not len(result["child_ids"]):
+            return no_prediction
+        return {
+            "predicted_weight": float(result["weight"][0]),
+            "predicted_height": float(result["height"][0]),
+            "trend": result["trend"][0],
+            "confidence": float(result["confidence"][0])
         }
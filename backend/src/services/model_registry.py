@@ -0,0 +1,159 @@
+# ML model registry
+"""
+Loads the ML models in settings.MODEL_DIR once per process tree and hands out
+warm instances to the services.
+
+- `.npy` files are memory-mapped read-only (np.load(mmap_mode="r")).
+- `.joblib` / `.pkl` files (scikit-learn estimators) are loaded with
+  joblib.load(mmap_mode="r"), so their large arrays are memory-mapped too.
+
+Each worker fills the registry from the app lifespan. Memory-mapped pages
+live in the OS page cache, so the model arrays are shared by every worker.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODEL_EXTENSIONS = (".npy", ".joblib", ".pkl")
+
+
+def _rss_bytes() -> Dict[str, int]:
+    """Resident and shared memory of this process (Linux /proc; zeros elsewhere)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            _, resident, shared = (int(v) for v in fh.read().split()[:3])
+        page = os.sysconf("SC_PAGE_SIZE")
+        return {"rss": resident * page, "shared": shared * page}
+    except (OSError, ValueError):
+        return {"rss": 0, "shared": 0}
+
+
+def _file_version(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+@dataclass
+class LoadedModel:
+    name: str
+    path: Path
+    version: str
+    model: Any
+    load_seconds: float
+
+
+@dataclass
+class StartupReport:
+    pid: int
+    loaded_in_pid: Optional[int] = None
+    total_seconds: float = 0.0
+    rss_before: int = 0
+    rss_after: int = 0
+    models: List[Dict[str, Any]] = field(default_factory=list)
+    errors: List[Dict[str, str]] = field(default_factory=list)
+
+
+class ModelRegistry:
+
+    def __init__(self, model_dir: Path):
+        self.model_dir = Path(model_dir)
+        self._models: Dict[str, LoadedModel] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._report = StartupReport(pid=os.getpid())
+
+    @staticmethod
+    def _load_file(path: Path) -> Any:
+        if path.suffix == ".npy":
+            return np.load(path, mmap_mode="r")
+        import joblib  # installed with scikit-learn
+
+        return joblib.load(path, mmap_mode="r")
+
+    def load_all(self) -> StartupReport:
+        """Load every model in model_dir (idempotent)."""
+        with self._lock:
+            if self._loaded:
+                return self._report
+
+            report = self._report
+            report.loaded_in_pid = os.getpid()
+            report.rss_before = _rss_bytes()["rss"]
+            t0 = time.perf_counter()
+
+            paths = sorted(p for p in self.model_dir.glob("*") if p.suffix in MODEL_EXTENSIONS) \
+                if self.model_dir.is_dir() else []
+            for path in paths:
+                start = time.perf_counter()
+                try:
+                    model = self._load_file(path)
+                except Exception as e:
+                    logger.error("No se pudo cargar el modelo %s: %s", path.name, e)
+                    report.errors.append({"model": path.stem, "error": str(e)})
+                    continue
+                loaded = LoadedModel(
+                    name=path.stem,
+                    path=path,
+                    version=f"{path.stem}-{_file_version(path)}",
+                    model=model,
+                    load_seconds=time.perf_counter() - start,
+                )
+                self._models[loaded.name] = loaded
+                report.models.append({
+                    "name": loaded.name,
+                    "version": loaded.version,
+                    "file_bytes": path.stat().st_size,
+                    "load_seconds": round(loaded.load_seconds, 4),
+                })
+
+            report.total_seconds = round(time.perf_counter() - t0, 4)
+            report.rss_after = _rss_bytes()["rss"]
+            self._loaded = True
+            return report
+
+    def get(self, name: str) -> Optional[LoadedModel]:
+        """Warm model by name (None if there is no such model)."""
+        if not self._loaded:
+            self.load_all()
+        return self._models.get(name)
+
+    def report(self) -> Dict[str, Any]:
+        """Startup report plus the current memory of the calling worker."""
+        r = self._report
+        return {
+            "pid": os.getpid(),
+            "loaded_in_pid": r.loaded_in_pid,
+            "cold_start_seconds": r.total_seconds,
+            "load_rss_delta_bytes": max(r.rss_after - r.rss_before, 0),
+            "worker_memory_bytes": _rss_bytes(),
+            "models": r.models,
+            "errors": r.errors,
+        }
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Shared registry rooted at settings.MODEL_DIR."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                from core.config import settings
+
+                _registry = ModelRegistry(Path(settings.MODEL_DIR))
+    return _registry
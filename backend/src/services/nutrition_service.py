@@ -1,7 +1,65 @@
 # Nutritional assessment service
+import numpy as np
 from typing import Dict, List, Any
 from datetime import datetime
 
+# WHO Child Growth Standards (2006), 0-60 months, by sex. Each row is
+# (-2 SD, median, +2 SD) at the age in REFERENCE_AGES, taken from the WHO
+# weight-for-age and length/height-for-age z-score tables; values in between
+# are interpolated linearly. Length (recumbent) up to 24 months, height after.
+# Weight is skewed, so z-scores use the SD on the side of the median where the
+# value falls: (median - (-2 SD)) / 2 below it, ((+2 SD) - median) / 2 above.
+REFERENCE_AGES = np.array([0, 1, 2, 3, 4, 5, 6, 9, 12, 15, 18, 21, 24, 30, 36, 42, 48, 54, 60], dtype=np.float64)
+MAX_REFERENCE_AGE = float(REFERENCE_AGES[-1])
+
+WHO_REFERENCE = {
+    "weight": {
+        "M": [
+            (2.5, 3.3, 4.4), (3.4, 4.5, 5.8), (4.3, 5.6, 7.1), (5.0, 6.4, 8.0), (5.6, 7.0, 8.7),
+            (6.0, 7.5, 9.3), (6.4, 7.9, 9.8), (7.1, 8.9, 11.0), (7.7, 9.6, 12.0), (8.3, 10.3, 12.8),
+            (8.8, 10.9, 13.7), (9.2, 11.5, 14.5), (9.7, 12.2, 15.3), (10.5, 13.3, 16.9), (11.3, 14.3, 18.3),
+            (12.0, 15.3, 19.7), (12.7, 16.3, 21.2), (13.4, 17.3, 22.7), (14.1, 18.3, 24.2),
+        ],
+        "F": [
+            (2.4, 3.2, 4.2), (3.2, 4.2, 5.5), (3.9, 5.1, 6.6), (4.5, 5.8, 7.5), (5.0, 6.4, 8.2),
+            (5.4, 6.9, 8.8), (5.7, 7.3, 9.3), (6.6, 8.2, 10.5), (7.0, 8.9, 11.5), (7.6, 9.6, 12.4),
+            (8.1, 10.2, 13.2), (8.6, 10.9, 14.0), (9.0, 11.5, 14.8), (10.0, 12.7, 16.5), (10.8, 13.9, 18.1),
+            (11.6, 15.0, 19.8), (12.3, 16.1, 21.5), (13.0, 17.2, 23.2), (13.7, 18.2, 24.9),
+        ],
+    },
+    "height": {
+        "M": [
+            (46.1, 49.9, 53.7), (50.8, 54.7, 58.6), (54.4, 58.4, 62.4), (57.3, 61.4, 65.5), (59.7, 63.9, 68.0),
+            (61.7, 65.9, 70.1), (63.3, 67.6, 71.9), (67.5, 72.0, 76.5), (71.0, 75.7, 80.5), (74.1, 79.1, 84.2),
+            (76.9, 82.3, 87.7), (79.4, 85.1, 90.9), (81.7, 87.8, 93.9), (85.1, 91.9, 98.7), (88.7, 96.1, 103.5),
+            (91.9, 99.9, 107.8), (94.9, 103.3, 111.7), (97.8, 106.7, 115.5), (100.7, 110.0, 119.2),
+        ],
+        "F": [
+            (45.4, 49.1, 52.9), (49.8, 53.7, 57.6), (53.0, 57.1, 61.1), (55.6, 59.8, 64.0), (57.8, 62.1, 66.4),
+            (59.6, 64.0, 68.5), (61.2, 65.7, 70.3), (65.3, 70.1, 75.0), (68.9, 74.0, 79.2), (72.0, 77.5, 83.0),
+            (74.9, 80.7, 86.5), (77.5, 83.7, 89.8), (80.0, 86.4, 92.9), (83.6, 90.7, 97.7), (87.4, 95.1, 102.7),
+            (90.9, 99.0, 107.2), (94.1, 102.7, 111.3), (97.1, 106.2, 115.2), (99.9, 109.4, 118.9),
+        ],
+    },
+}
+_TABLES = {
+    indicator: {sex: np.asarray(rows, dtype=np.float64).T for sex, rows in by_sex.items()}
+    for indicator, by_sex in WHO_REFERENCE.items()
+}
+
+
+def _interp(table: np.ndarray, age: np.ndarray) -> np.ndarray:
+    """(3, ...) array of (-2 SD, median, +2 SD) at `age`; NaN outside 0-60 months."""
+    out = np.stack([np.interp(age, REFERENCE_AGES, row) for row in table])
+    out[:, (age < 0) | (age > MAX_REFERENCE_AGE)] = np.nan
+    return out
+
+
+def _sex_codes(sex) -> np.ndarray:
+    """First letter, upper-cased: 'M'/'F' ('masculino', 'f'...); None and others match neither."""
+    return np.char.upper(np.asarray(sex, dtype="U1"))
+
+
 class NutritionService:
     
     @staticmethod
@@ -10,6 +68,45 @@ class NutritionService:
         height_m = height / 100  # Convert cm to meters
         return weight / (height_m ** 2)
     
+    @staticmethod
+    def reference_points(indicator: str, age_months, sex=None) -> np.ndarray:
+        """
+        (-2 SD, median, +2 SD) for `indicator` at `age_months` (scalar or array),
+        stacked on the first axis. `sex` is 'M'/'F' (scalar or an array that
+        broadcasts against the ages); unknown sex uses the mean of both tables.
+        NaN outside 0-60 months.
+        """
+        age = np.asarray(age_months, dtype=np.float64)
+        tables = _TABLES[indicator]
+        boys, girls = _interp(tables["M"], age), _interp(tables["F"], age)
+        codes = _sex_codes(sex)
+        return np.where(codes == "M", boys, np.where(codes == "F", girls, (boys + girls) / 2))
+
+    @staticmethod
+    def in_reference_range(age_months) -> np.ndarray:
+        age = np.asarray(age_months, dtype=np.float64)
+        return (age >= 0) & (age <= MAX_REFERENCE_AGE)
+
+    @staticmethod
+    def reference_median_sd(indicator: str, age_months, sex=None):
+        """Reference median and (symmetric) SD for `indicator` at `age_months`."""
+        minus2, median, plus2 = NutritionService.reference_points(indicator, age_months, sex)
+        return median, (plus2 - minus2) / 4
+
+    @staticmethod
+    def zscore(indicator: str, age_months, value, sex=None):
+        """Z-score of `value` for `indicator` (vectorized; NaN outside the reference)."""
+        minus2, median, plus2 = NutritionService.reference_points(indicator, age_months, sex)
+        diff = np.asarray(value, dtype=np.float64) - median
+        return diff / np.where(diff >= 0, (plus2 - median) / 2, (median - minus2) / 2)
+
+    @staticmethod
+    def from_zscore(indicator: str, age_months, z, sex=None):
+        """Inverse of zscore(): measurement for a given z-score at `age_months`."""
+        minus2, median, plus2 = NutritionService.reference_points(indicator, age_months, sex)
+        z = np.asarray(z, dtype=np.float64)
+        return median + z * np.where(z >= 0, (plus2 - median) / 2, (median - minus2) / 2)
+
     @staticmethod
     def assess_nutritional_status(age_months: int, weight: float, height: float, gender: str) -> Dict[str, Any]:
         """Assess nutritional status based on WHO standards"""
@@ -0,0 +1,87 @@
+"""Configuración común de los tests (ejecutar desde backend/src: python -m pytest tests)."""
+
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# core.config exige DATABASE_URL al importarse: SQLite temporal, nunca la base
+# de desarrollo (el fixture `schema` le aplica las migraciones)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tests.db')}")
+os.environ.setdefault("DEBUG", "false")
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+PASSWORD = "secret123"
+
+
+@pytest.fixture(scope="session")
+def schema():
+    """Aplica las migraciones a la base de los tests (la de db.session)."""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "src" / "db" / "migrations"))
+    config.set_main_option("sqlalchemy.url", os.environ["DATABASE_URL"])
+    command.upgrade(config, "head")
+
+
+@pytest.fixture
+def db(schema):
+    from db.session import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def client(schema):
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def make_user(db):
+    """Crea un usuario con el rol indicado (contraseña PASSWORD) y devuelve su id."""
+    from core.security import hash_password
+    from db.models import Rol, Usuario
+
+    def _make(correo: str, role: str = "nutricionista") -> int:
+        rol = db.query(Rol).filter(Rol.nombre == role).first()
+        if rol is None:
+            rol = Rol(nombre=role)
+            db.add(rol)
+            db.flush()
+        user = Usuario(
+            nombre=correo.split("@")[0],
+            correo=correo,
+            telefono=str(abs(hash(correo)) % 10**9),
+            contrasena=hash_password(PASSWORD),
+            rol_id=rol.id_rol,
+        )
+        db.add(user)
+        db.commit()
+        return user.id_usuario
+
+    return _make
+
+
+@pytest.fixture
+def login(client):
+    """Login por JSON; devuelve la respuesta (access_token, refresh_token...)."""
+
+    def _login(correo: str) -> dict:
+        response = client.post("/api/auth/login", json={"correo": correo, "contrasena": PASSWORD})
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return _login
+
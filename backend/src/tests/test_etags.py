@@ -0,0 +1,74 @@
+"""GET condicional: 304 sin construir el cuerpo y ETag nuevo tras una escritura (core.etags)."""
+
+from starlette.requests import Request
+
+from core.etags import conditional, etag_matches, weak_etag
+
+
+def _request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/api/items/1", "query_string": b"", "headers": headers})
+
+
+def _auth(tokens):
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+class _Counter:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_matching_etag_returns_304_without_building():
+    version = weak_etag(1, "2024-01-01T00:00:00")
+    build, etag = _Counter({"id": 1}), _Counter(version)
+
+    response = conditional(_request(version), build, etag)
+    assert response.status_code == 304
+    assert response.headers["ETag"] == version
+    assert build.calls == 0 and etag.calls == 1
+
+
+def test_version_query_only_for_conditional_requests():
+    version = weak_etag(1, "2024-01-01T00:00:00")
+    build, etag = _Counter({"id": 1}), _Counter(version)
+
+    response = conditional(_request(), build, etag)
+    assert response.status_code == 200 and "ETag" in response.headers
+    assert build.calls == 1 and etag.calls == 0
+
+
+def test_stale_etag_gets_full_response():
+    build, etag = _Counter({"id": 1}), _Counter(weak_etag(1, "2024-02-01T00:00:00"))
+    response = conditional(_request(weak_etag(1, "2024-01-01T00:00:00")), build, etag)
+    assert response.status_code == 200 and build.calls == 1
+
+
+def test_etag_matching_is_weak_and_accepts_lists():
+    assert etag_matches(_request('"abc"'), 'W/"abc"')
+    assert etag_matches(_request('W/"x", W/"abc"'), 'W/"abc"')
+    assert etag_matches(_request("*"), 'W/"abc"')
+    assert not etag_matches(_request('W/"x"'), 'W/"abc"')
+    assert not etag_matches(_request(), 'W/"abc"')
+
+
+def test_user_detail_not_modified_until_put(client, make_user, login):
+    make_user("admin-etag@example.com", role="admin")
+    target = make_user("etiquetado@example.com")
+    admin = login("admin-etag@example.com")
+    url = f"/api/users/{target}"
+
+    first = client.get(url, headers=_auth(admin))
+    tag = first.headers["ETag"]
+    unchanged = client.get(url, headers={**_auth(admin), "If-None-Match": tag})
+    assert unchanged.status_code == 304 and not unchanged.content
+
+    assert client.put(url, json={"nombre": "Editado"}, headers=_auth(admin)).status_code == 200
+    changed = client.get(url, headers={**_auth(admin), "If-None-Match": tag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != tag and changed.json()["nombre"] == "Editado"
@@ -0,0 +1,34 @@
+"""Las consultas calientes usan sus índices tras aplicar las migraciones (db.explain_check)."""
+
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine
+
+from db.explain_check import HOT_QUERIES, check_plans
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+@pytest.fixture(scope="module")
+def plans(tmp_path_factory):
+    url = f"sqlite:///{tmp_path_factory.mktemp('explain') / 'plans.db'}"
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "src" / "db" / "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "head")
+
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            yield check_plans(conn)
+    finally:
+        engine.dispose()
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(plans, name):
+    result = plans[name]
+    assert result["ok"], f"{name} no usa {result['index']}: {result['plan']}"
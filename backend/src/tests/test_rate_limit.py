@@ -0,0 +1,71 @@
+"""Rate limit por IP detrás de un proxy de confianza (core.rate_limit)."""
+
+import asyncio
+
+from core.rate_limit import Limit, MemoryBucketStore, RateLimitMiddleware, RateLimitRule, client_ip, parse_networks
+
+NGINX = "172.28.0.10"
+TRUSTED = parse_networks("127.0.0.1,::1,172.28.0.0/16")
+
+
+async def _ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def _scope(peer, forwarded=None, real_ip=None):
+    headers = []
+    if forwarded:
+        headers.append((b"x-forwarded-for", forwarded.encode()))
+    if real_ip:
+        headers.append((b"x-real-ip", real_ip.encode()))
+    return {"type": "http", "method": "GET", "path": "/api/evaluations/", "headers": headers, "client": (peer, 40000)}
+
+
+def _status(middleware, scope):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return sent[0]["status"]
+
+
+def _middleware(trusted=TRUSTED):
+    rule = RateLimitRule("api", ("/api",), per_ip=Limit(2, 60))
+    return RateLimitMiddleware(_ok_app, [rule], MemoryBucketStore(), trusted_proxies=trusted)
+
+
+def test_forwarded_ips_get_separate_buckets():
+    mw = _middleware()
+    for _ in range(2):
+        assert _status(mw, _scope(NGINX, forwarded="203.0.113.5")) == 200
+    assert _status(mw, _scope(NGINX, forwarded="203.0.113.5")) == 429
+    # Otro cliente detrás del mismo nginx conserva su cupo
+    assert _status(mw, _scope(NGINX, forwarded="198.51.100.7")) == 200
+    assert _status(mw, _scope(NGINX, real_ip="198.51.100.8")) == 200
+
+
+def test_forwarded_headers_ignored_from_untrusted_peer():
+    mw = _middleware()
+    for ip in ("203.0.113.1", "203.0.113.2"):
+        assert _status(mw, _scope("192.0.2.50", forwarded=ip)) == 200
+    # Cambiar X-Forwarded-For no da un bucket nuevo
+    assert _status(mw, _scope("192.0.2.50", forwarded="203.0.113.3")) == 429
+
+
+def test_client_ip_skips_trusted_hops_and_spoofed_prefix():
+    headers = {b"x-forwarded-for": b"10.9.9.9, 203.0.113.5, 172.28.0.3"}
+    # 10.9.9.9 lo escribió el cliente; 172.28.0.3 es otro proxy de confianza
+    assert client_ip(_scope(NGINX), headers, TRUSTED) == "203.0.113.5"
+    assert client_ip(_scope(NGINX), {}, TRUSTED) == NGINX
+    assert client_ip(_scope(NGINX), headers, ()) == NGINX
+
+
+def test_parse_networks_ignores_invalid_entries():
+    networks = parse_networks("127.0.0.1, not-an-ip, 10.0.0.0/8,")
+    assert [str(n) for n in networks] == ["127.0.0.1/32", "10.0.0.0/8"]
@@ -0,0 +1,64 @@
+"""Rotación de refresh tokens y revocación de la familia al reutilizarlos (core.refresh_tokens)."""
+
+import pytest
+from fastapi import HTTPException
+
+from core.refresh_tokens import issue_refresh_token, revoke_refresh_token, rotate_refresh_token
+
+
+def _rotate_fails(db, token):
+    with pytest.raises(HTTPException) as exc:
+        rotate_refresh_token(db, token)
+    assert exc.value.status_code == 401
+
+
+def test_rotation_issues_new_token_with_same_expiry(db, make_user):
+    user_id = make_user("rotacion@example.com")
+    first, expira = issue_refresh_token(db, user_id)
+
+    uid, second, expira2 = rotate_refresh_token(db, first)
+    assert uid == user_id
+    assert second != first
+    # Rotar no alarga la sesión
+    assert expira2 == expira
+
+    uid, third, _ = rotate_refresh_token(db, second)
+    assert uid == user_id and third not in (first, second)
+
+
+def test_reusing_rotated_token_revokes_family(db, make_user):
+    user_id = make_user("reuso@example.com")
+    first, _ = issue_refresh_token(db, user_id)
+    other, _ = issue_refresh_token(db, user_id)  # otra sesión (otra familia)
+    _, second, _ = rotate_refresh_token(db, first)
+
+    _rotate_fails(db, first)
+    # El token vigente de la familia también queda revocado...
+    _rotate_fails(db, second)
+    # ...pero no el resto de sesiones del usuario
+    assert rotate_refresh_token(db, other)[0] == user_id
+
+
+def test_logout_revokes_family(db, make_user):
+    user_id = make_user("logout@example.com")
+    first, _ = issue_refresh_token(db, user_id)
+    _, second, _ = rotate_refresh_token(db, first)
+
+    revoke_refresh_token(db, second)
+    _rotate_fails(db, second)
+    _rotate_fails(db, "no-existe")
+
+
+def test_refresh_endpoint_rotates(client, make_user, login):
+    make_user("endpoint@example.com")
+    tokens = login("endpoint@example.com")
+
+    response = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+
+    reused = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert reused.status_code == 401
+    revoked = client.post("/api/auth/refresh", json={"refresh_token": rotated["refresh_token"]})
+    assert revoked.status_code == 401
@@ -0,0 +1,60 @@
+"""Caché de respuestas: acierto, invalidación tras una escritura y datos frescos (core.response_cache)."""
+
+from starlette.requests import Request
+
+from core.cache import MemoryCache
+from core.response_cache import ResponseCache
+
+
+def _request(path="/api/items/", query=b""):
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query, "headers": []})
+
+
+def _auth(tokens):
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def test_hit_then_invalidate_then_fresh_miss():
+    cache = ResponseCache(MemoryCache("test-entries", 30, 100), MemoryCache("test-tags", 30, 100))
+    data = {"nombre": "antes"}
+    builds = []
+
+    def build():
+        builds.append(1)
+        return dict(data)
+
+    first = cache.cached(_request(), ["item:1"], build)
+    assert first.headers["X-Cache"] == "MISS"
+    second = cache.cached(_request(), ["item:1"], build)
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.body == first.body and len(builds) == 1
+
+    data["nombre"] = "después"
+    cache.invalidate("item:1")
+    third = cache.cached(_request(), ["item:1"], build)
+    assert third.headers["X-Cache"] == "MISS"
+    assert b"despu" in third.body and len(builds) == 2
+
+
+def test_scope_and_query_get_separate_entries():
+    cache = ResponseCache(MemoryCache("test-entries", 30, 100), MemoryCache("test-tags", 30, 100))
+    cache.cached(_request(), ["items"], lambda: {"ok": 1}, scope="user:1:admin")
+    other_user = cache.cached(_request(), ["items"], lambda: {"ok": 2}, scope="user:2:nutricionista")
+    other_query = cache.cached(_request(query=b"limit=5"), ["items"], lambda: {"ok": 3}, scope="user:1:admin")
+    assert other_user.headers["X-Cache"] == "MISS" and other_query.headers["X-Cache"] == "MISS"
+
+
+def test_user_detail_served_fresh_after_update(client, make_user, login):
+    make_user("admin-cache@example.com", role="admin")
+    target = make_user("cacheado@example.com")
+    admin = login("admin-cache@example.com")
+    url = f"/api/users/{target}"
+
+    assert client.get(url, headers=_auth(admin)).headers["X-Cache"] == "MISS"
+    hit = client.get(url, headers=_auth(admin))
+    assert hit.headers["X-Cache"] == "HIT" and hit.json()["nombre"] == "cacheado"
+
+    assert client.put(url, json={"nombre": "Renombrado"}, headers=_auth(admin)).status_code == 200
+    fresh = client.get(url, headers=_auth(admin))
+    assert fresh.headers["X-Cache"] == "MISS"
+    assert fresh.json()["nombre"] == "Renombrado"
@@ -0,0 +1,54 @@
+"""Un cambio de rol o el borrado del usuario revocan sus access tokens (core.revocation, require_roles)."""
+
+import time
+
+from core.revocation import RevocationList
+from core.security import revoke_user_tokens
+from db.models import Rol
+
+
+def _auth(tokens):
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def test_role_change_revokes_previous_tokens(client, db, make_user, login):
+    make_user("admin-rol@example.com", role="admin")
+    target = make_user("degradado@example.com", role="admin")
+    make_user("otro-nutri@example.com", role="nutricionista")  # crea el rol destino
+    admin, old = login("admin-rol@example.com"), login("degradado@example.com")
+    assert client.get("/api/users/", headers=_auth(old)).status_code == 200
+
+    nutricionista = db.query(Rol).filter(Rol.nombre == "nutricionista").one()
+    response = client.put(f"/api/users/{target}", json={"rol_id": nutricionista.id_rol}, headers=_auth(admin))
+    assert response.status_code == 200
+
+    # El token viejo aún dice "admin": revocado, no autorizado con el rol firmado
+    assert client.get("/api/users/", headers=_auth(old)).status_code == 401
+    # Un login nuevo lleva el rol actual
+    assert client.get("/api/users/", headers=_auth(login("degradado@example.com"))).status_code == 403
+    # Los tokens del admin que hizo el cambio siguen valiendo
+    assert client.get("/api/users/", headers=_auth(admin)).status_code == 200
+
+
+def test_delete_revokes_tokens(client, make_user, login):
+    make_user("admin-borra@example.com", role="admin")
+    target = make_user("borrado@example.com", role="admin")
+    admin, old = login("admin-borra@example.com"), login("borrado@example.com")
+    assert client.get("/api/users/", headers=_auth(old)).status_code == 200
+
+    assert client.delete(f"/api/users/{target}", headers=_auth(admin)).status_code == 200
+    assert client.get("/api/users/", headers=_auth(old)).status_code == 401
+
+
+def test_other_worker_sees_revocation_after_sync(db, make_user):
+    user_id = make_user("sync@example.com")
+    issued = time.time()
+    time.sleep(0.01)
+    revoke_user_tokens(db, user_id)
+
+    # Otro worker: lista propia, sincronizada desde la base de datos
+    other = RevocationList(sync_seconds=3600, max_token_age_seconds=3600)
+    other.sync(db)
+    assert other.is_revoked({"uid": user_id, "iat": issued})
+    assert not other.is_revoked({"uid": user_id, "iat": time.time() + 1})
+    assert not other.is_revoked({"uid": user_id + 1000, "iat": issued})
@@ -0,0 +1,13 @@
+#!/usr/bin/env sh
+# Entrypoint del backend: aplica las migraciones de Alembic y lanza el comando
+# (uvicorn por defecto). El esquema ya no se crea al arrancar y con
+# DB_SCHEMA_STRICT la app no arranca sin migrar.
+# RUN_MIGRATIONS=false lo omite (p.ej. si las ejecuta un job aparte).
+set -e
+
+if [ "${RUN_MIGRATIONS:-true}" = "true" ]; then
+    echo "===> alembic upgrade head"
+    alembic -c /app/alembic.ini upgrade head
+fi
+
+exec "$@"